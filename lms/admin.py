@@ -1,7 +1,17 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-from lms.models import Author, Book, BookReview, BorrowRequest, Genre, User
+from lms.models import (
+    Author,
+    Book,
+    BookReview,
+    BorrowRequest,
+    Fine,
+    Genre,
+    InventoryEvent,
+    User,
+    WaitlistEntry,
+)
 
 
 @admin.register(User)
@@ -41,9 +51,15 @@ class BorrowRequestAdmin(admin.ModelAdmin):
         "requested_at",
         "approved_at",
         "returned_at",
+        "due_at",
+        "claimed_by",
     )
     list_filter = ("status", "requested_at")
+    list_select_related = ("book", "user", "claimed_by")
     search_fields = ("user__username", "book__title")
+    # Counting the whole table on every changelist page gets slow; the
+    # librarian queue is served by the borrow-queue endpoint instead.
+    show_full_result_count = False
 
 
 @admin.register(BookReview)
@@ -51,3 +67,24 @@ class BookReviewAdmin(admin.ModelAdmin):
     list_display = ("user", "book", "rating", "rate")
     list_filter = ("rating", "rate")
     search_fields = ("user__username", "book__title")
+
+
+@admin.register(InventoryEvent)
+class InventoryEventAdmin(admin.ModelAdmin):
+    list_display = ("book", "borrow_request", "delta", "reason", "created_at")
+    list_filter = ("reason",)
+    search_fields = ("book__title",)
+
+
+@admin.register(Fine)
+class FineAdmin(admin.ModelAdmin):
+    list_display = ("user", "borrow_request", "amount", "created_at")
+    list_select_related = ("user", "borrow_request__book")
+    search_fields = ("user__username",)
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ("book", "user", "created_at")
+    list_select_related = ("book", "user")
+    search_fields = ("user__username", "book__title")
@@ -0,0 +1,37 @@
+from django.urls import path
+
+from lms import async_views, urls
+
+# Read-heavy routes served by native async views; every other route is the
+# synchronous one from ``lms.urls``.
+async_urlpatterns = [
+    path("api/books/", async_views.AsyncBookListView.as_view(), name="book-list"),
+    path(
+        "api/books/<int:pk>/",
+        async_views.AsyncBookDetailView.as_view(),
+        name="book-detail",
+    ),
+    path("api/authors/", async_views.AsyncAuthorListView.as_view(), name="author-list"),
+    path("api/genres/", async_views.AsyncGenreListView.as_view(), name="genre-list"),
+    path(
+        "api/borrow/me/",
+        async_views.AsyncBorrowRequestListView.as_view(),
+        name="borrow-list",
+    ),
+    path(
+        "api/books/<int:book_id>/reviews/",
+        async_views.AsyncBookReviewListView.as_view(),
+        name="review-list",
+    ),
+    path(
+        "api/reviews/<int:pk>/",
+        async_views.AsyncBookReviewDetailView.as_view(),
+        name="review-detail",
+    ),
+]
+
+_replaced = {pattern.name for pattern in async_urlpatterns}
+
+urlpatterns = async_urlpatterns + [
+    pattern for pattern in urls.urlpatterns if pattern.name not in _replaced
+]
@@ -0,0 +1,182 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+from lms import caching, routers
+from lms.views import (
+    AuthorListCreateView,
+    BookDetailView,
+    BookListCreateView,
+    BookReviewDetailView,
+    BookReviewListCreateView,
+    BorrowRequestListView,
+    CatalogCacheMixin,
+    ConditionalGetMixin,
+    GenreListCreateView,
+)
+
+
+class AsyncReadView(View):
+    """
+    Serve GET and HEAD of a DRF ``api_view`` natively on the async stack.
+
+    Requests go through the API view's own authentication, permissions,
+    throttles, filters, conditional GET, cache, pagination and serializers;
+    only the database access is swapped for the async ORM. Other methods are
+    handed to the synchronous view in a worker thread.
+    """
+
+    api_view = None
+    sync_view = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.query_budget = getattr(cls.api_view, "query_budget", None)
+        cls.query_budget_exempt = getattr(cls.api_view, "query_budget_exempt", ())
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(sync_view=cls.api_view.as_view(), **initkwargs)
+        # Exempt like APIView does; the csrf_exempt decorator would turn the
+        # coroutine view into a sync one.
+        view.csrf_exempt = True
+        return view
+
+    async def delegate(self, request, *args, **kwargs):
+        return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+    post = put = patch = delete = options = delegate
+
+    async def get(self, request, *args, **kwargs):
+        view = self.api_view()
+        view.args = args
+        view.kwargs = kwargs
+        request = view.initialize_request(request, *args, **kwargs)
+        view.request = request
+        view.headers = view.default_response_headers
+        try:
+            await self.authenticate(request)
+            # Throttles and permissions may query the database.
+            await sync_to_async(view.initial)(request, *args, **kwargs)
+            response = await self.respond(view, request)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        view.response = view.finalize_response(request, response, *args, **kwargs)
+        return view.response
+
+    async def authenticate(self, request):
+        """
+        Run the request's authenticators, awaiting ``aauthenticate`` if any.
+        """
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, "aauthenticate", None)
+            if authenticate is None:
+                authenticate = sync_to_async(authenticator.authenticate)
+            try:
+                user_auth_tuple = await authenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
+
+    async def respond(self, view, request):
+        if not isinstance(view, ConditionalGetMixin):
+            return await self.cached(view, request)
+        if view.is_detail():
+            queryset = await sync_to_async(view.get_validator_queryset)()
+            values = await queryset.order_by().aaggregate(
+                **view.get_validator_aggregates()
+            )
+            state = values["modified"]
+        else:
+            versions = await caching.arequest_versions(
+                request, view.get_validator_scopes()
+            )
+            state = (versions, await sync_to_async(routers.use_replica)())
+        etag, last_modified = view.build_validators(state)
+        if etag is None:
+            return await self.cached(view, request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = await self.cached(view, request)
+        return view.set_validators(response, etag, last_modified)
+
+    async def cached(self, view, request):
+        if not isinstance(view, CatalogCacheMixin):
+            return await self.read(view, request)
+        key = await caching.aresponse_key(request, view.get_cache_scopes())
+        data = await caching.aget_response_data(key)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+        response = await self.read(view, request)
+        if response.status_code == status.HTTP_200_OK:
+            await caching.aset_response_data(key, response.data)
+        response["X-Cache"] = "MISS"
+        return response
+
+    async def read(self, view, request):
+        # Filter backends may validate choices against the database.
+        queryset = await sync_to_async(view.filter_queryset)(view.get_queryset())
+        if hasattr(view, "retrieve"):
+            return await self.retrieve(view, request, queryset)
+        return await self.list(view, request, queryset)
+
+    async def list(self, view, request, queryset):
+        page = None
+        if view.paginator is not None:
+            page = await view.paginator.apaginate_queryset(queryset, request, view)
+        if page is None:
+            objects = [obj async for obj in queryset]
+            return Response(view.get_serializer(objects, many=True).data)
+        return view.get_paginated_response(view.get_serializer(page, many=True).data)
+
+    async def retrieve(self, view, request, queryset):
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            instance = await queryset.aget(
+                **{view.lookup_field: view.kwargs[lookup_url_kwarg]}
+            )
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        view.check_object_permissions(request, instance)
+        return Response(view.get_serializer(instance).data)
+
+
+class AsyncBookListView(AsyncReadView):
+    api_view = BookListCreateView
+
+
+class AsyncBookDetailView(AsyncReadView):
+    api_view = BookDetailView
+
+
+class AsyncAuthorListView(AsyncReadView):
+    api_view = AuthorListCreateView
+
+
+class AsyncGenreListView(AsyncReadView):
+    api_view = GenreListCreateView
+
+
+class AsyncBorrowRequestListView(AsyncReadView):
+    api_view = BorrowRequestListView
+
+
+class AsyncBookReviewListView(AsyncReadView):
+    api_view = BookReviewListCreateView
+
+
+class AsyncBookReviewDetailView(AsyncReadView):
+    api_view = BookReviewDetailView
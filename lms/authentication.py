@@ -0,0 +1,117 @@
+from functools import partial
+
+from django.core.cache import caches
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+CACHE_ALIAS = "users"
+KEY_PREFIX = "lms:user"
+# What authentication and the role permissions read; other fields are
+# deferred and loaded on first access.
+USER_FIELDS = ("id", "username", "role", "is_active")
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def user_key(user_id):
+    return f"{KEY_PREFIX}:{user_id}"
+
+
+def invalidate_user(user_id, using=None):
+    """
+    Drop the cached user now and again when the transaction commits, so a
+    concurrent request cannot re-cache the values being replaced.
+    """
+    key = user_key(user_id)
+    get_cache().delete(key)
+    transaction.on_commit(partial(get_cache().delete, key), using=using)
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    JWT authentication resolving the user from a short-lived local cache.
+
+    Only ``USER_FIELDS`` are cached, so most requests authenticate without a
+    query; user signals drop the entry whenever a user is saved or deleted.
+    ``aauthenticate`` does the same for async views with the async ORM.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # The revocation check compares against the password hash.
+            return super().get_user(validated_token)
+        user_id = self.get_user_id(validated_token)
+        key = user_key(user_id)
+        values = get_cache().get(key)
+        if values is None:
+            values = self.user_queryset(user_id).values_list(*USER_FIELDS).first()
+            if values is not None:
+                get_cache().add(key, values)
+        return self.check_user(self.build_user(values), validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        if api_settings.CHECK_REVOKE_TOKEN:
+            user = await self.user_queryset(user_id).afirst()
+            return self.check_user(user, validated_token)
+        key = user_key(user_id)
+        values = await get_cache().aget(key)
+        if values is None:
+            values = (
+                await self.user_queryset(user_id).values_list(*USER_FIELDS).afirst()
+            )
+            if values is not None:
+                await get_cache().aadd(key, values)
+        return self.check_user(self.build_user(values), validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def user_queryset(self, user_id):
+        return self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+
+    def build_user(self, values):
+        if values is None:
+            return None
+        # from_db() expects values in the model's field order.
+        row = dict(zip(USER_FIELDS, values))
+        names = [
+            field.attname
+            for field in self.user_model._meta.concrete_fields
+            if field.attname in row
+        ]
+        return self.user_model.from_db(
+            router.db_for_read(self.user_model), names, [row[name] for name in names]
+        )
+
+    def check_user(self, user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return user
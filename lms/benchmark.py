@@ -0,0 +1,690 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from lms import sqlite
+from lms.enums import BorrowStatus, UserRole
+from lms.models import (
+    Author,
+    Book,
+    BookReview,
+    BorrowRequest,
+    Genre,
+    User,
+    WaitlistEntry,
+)
+from lms.renderers import MessagePackRenderer, ORJSONRenderer
+
+PERCENTILES = (50, 95, 99)
+# Interleaved by the "mixed:read-write" endpoint; a third of them write.
+MIXED_ENDPOINTS = [
+    "book-detail",
+    "borrow-request",
+    "borrow-list",
+    "review-list",
+    "review-list:create",
+    "book-list",
+]
+
+
+class Endpoint:
+    """
+    A benchmarked request. ``build(context, index)`` returns the path and the
+    keyword arguments passed to the test client for the ``index``-th call.
+    """
+
+    def __init__(self, name, method, build, role=UserRole.STUDENT):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.role = role
+
+    def resolve(self, index):
+        """
+        Return the endpoint serving the ``index``-th call.
+        """
+        return self
+
+
+class MixedEndpoint(Endpoint):
+    """
+    Interleave the calls of several endpoints, e.g. reads with writes.
+    """
+
+    def __init__(self, name, endpoints):
+        super().__init__(name, "mixed", None, role=None)
+        self.endpoints = endpoints
+
+    def resolve(self, index):
+        return self.endpoints[index % len(self.endpoints)]
+
+
+class BenchmarkContext:
+    """
+    Ids and credentials drawn from the benchmark dataset, shared by threads.
+    """
+
+    def __init__(self, users_per_role=50):
+        self.lock = threading.Lock()
+        self.tokens = {
+            role: [
+                str(AccessToken.for_user(user))
+                for user in User.objects.filter(role=role, is_active=True)[
+                    :users_per_role
+                ]
+            ]
+            for role in (UserRole.STUDENT, UserRole.LIBRARIAN)
+        }
+        self.student = User.objects.filter(role=UserRole.STUDENT).first()
+        self.refresh_token = str(RefreshToken.for_user(self.student))
+        self.book_ids = list(Book.objects.values_list("pk", flat=True)[:1000])
+        self.author_ids = list(Author.objects.values_list("pk", flat=True)[:100])
+        self.genre_ids = list(Genre.objects.values_list("pk", flat=True)[:10])
+        self.reviewed_book_ids = (
+            list(BookReview.objects.values_list("book_id", flat=True).distinct()[:1000])
+            or self.book_ids
+        )
+        self.review_ids = list(BookReview.objects.values_list("pk", flat=True)[:1000])
+        self.waitlist_ids = list(
+            WaitlistEntry.objects.values_list("pk", flat=True)[:1000]
+        )
+        self.pools = {
+            status: list(
+                BorrowRequest.objects.filter(status=status).values_list(
+                    "pk", flat=True
+                )[:5000]
+            )
+            for status in (BorrowStatus.PENDING, BorrowStatus.APPROVED)
+        }
+
+    def pick(self, values, index):
+        return values[index % len(values)] if values else 0
+
+    def take(self, status):
+        """
+        Hand out each pending or approved borrow request to one caller only.
+        """
+        with self.lock:
+            pool = self.pools[status]
+            return pool.pop() if pool else 0
+
+    def credentials(self, role, index):
+        tokens = self.tokens.get(role) or []
+        if not tokens:
+            return {}
+        return {"HTTP_AUTHORIZATION": f"Bearer {self.pick(tokens, index)}"}
+
+
+def default_endpoints():
+    """
+    One ``Endpoint`` per route in ``lms/urls.py``, plus a mixed read/write
+    workload over ``MIXED_ENDPOINTS``.
+    """
+
+    def unique():
+        return uuid.uuid4().hex[:12]
+
+    endpoints = [
+        Endpoint(
+            "register",
+            "post",
+            lambda ctx, i: (
+                reverse("register"),
+                {"data": {"username": f"bench-{unique()}", "password": "pw123456!"}},
+            ),
+            role=None,
+        ),
+        Endpoint(
+            "token_obtain_pair",
+            "post",
+            lambda ctx, i: (
+                reverse("token_obtain_pair"),
+                {
+                    "data": {
+                        "username": ctx.student.username,
+                        "password": "password123",
+                    }
+                },
+            ),
+            role=None,
+        ),
+        Endpoint(
+            "token_refresh",
+            "post",
+            lambda ctx, i: (
+                reverse("token_refresh"),
+                {"data": {"refresh": ctx.refresh_token}},
+            ),
+            role=None,
+        ),
+        Endpoint(
+            "book-list",
+            "get",
+            lambda ctx, i: (reverse("book-list"), {"data": {"page": 1 + i % 5}}),
+        ),
+        Endpoint(
+            "book-list:search",
+            "get",
+            lambda ctx, i: (
+                reverse("book-list"),
+                {"data": {"search": ["river", "garden", "author 1", "song"][i % 4]}},
+            ),
+        ),
+        Endpoint(
+            "book-list:keyset",
+            "get",
+            lambda ctx, i: (
+                reverse("book-list"),
+                {"data": {"cursor": "", "ordering": "title", "page_size": 50}},
+            ),
+        ),
+        Endpoint(
+            "book-list:create",
+            "post",
+            lambda ctx, i: (
+                reverse("book-list"),
+                {
+                    "data": {
+                        "title": f"Bench {i}",
+                        "author": ctx.pick(ctx.author_ids, i),
+                        "genres": ctx.genre_ids[:2],
+                        "isbn": unique(),
+                        "available_copies": 1,
+                        "total_copies": 1,
+                    },
+                    "content_type": "application/json",
+                },
+            ),
+            role=UserRole.LIBRARIAN,
+        ),
+        Endpoint(
+            "book-detail",
+            "get",
+            lambda ctx, i: (
+                reverse("book-detail", args=[ctx.pick(ctx.book_ids, i)]),
+                {},
+            ),
+        ),
+        Endpoint(
+            "book-import",
+            "post",
+            lambda ctx, i: (
+                reverse("book-import"),
+                {"data": {"file": _catalog_file(unique())}},
+            ),
+            role=UserRole.LIBRARIAN,
+        ),
+        Endpoint(
+            "book-export",
+            "get",
+            lambda ctx, i: (
+                reverse("book-export"),
+                {"data": {"export_format": ["csv", "jsonl"][i % 2]}},
+            ),
+            role=UserRole.LIBRARIAN,
+        ),
+        Endpoint(
+            "book-availability",
+            "post",
+            lambda ctx, i: (
+                reverse("book-availability"),
+                {"data": {"ids": ctx.book_ids}, "content_type": "application/json"},
+            ),
+        ),
+        Endpoint("author-list", "get", lambda ctx, i: (reverse("author-list"), {})),
+        Endpoint("genre-list", "get", lambda ctx, i: (reverse("genre-list"), {})),
+        Endpoint(
+            "borrow-request",
+            "post",
+            lambda ctx, i: (
+                reverse("borrow-request"),
+                {
+                    "data": {
+                        "book_id": ctx.pick(ctx.book_ids, i),
+                        "user_id": ctx.student.pk,
+                    }
+                },
+            ),
+        ),
+        Endpoint("borrow-list", "get", lambda ctx, i: (reverse("borrow-list"), {})),
+        Endpoint(
+            "borrow-export",
+            "get",
+            lambda ctx, i: (
+                reverse("borrow-export"),
+                {"data": {"status": BorrowStatus.RETURNED}},
+            ),
+            role=UserRole.LIBRARIAN,
+        ),
+        Endpoint("waitlist", "get", lambda ctx, i: (reverse("waitlist"), {})),
+        Endpoint(
+            "waitlist-detail",
+            "get",
+            lambda ctx, i: (
+                reverse("waitlist-detail", args=[ctx.pick(ctx.waitlist_ids, i)]),
+                {},
+            ),
+        ),
+        Endpoint(
+            "borrow-queue",
+            "get",
+            lambda ctx, i: (
+                reverse("borrow-queue"),
+                {"data": {"min_age": ["P1D", "PT1H"][i % 2], "page_size": 50}},
+            ),
+            role=UserRole.LIBRARIAN,
+        ),
+        Endpoint(
+            "borrow-queue-claim",
+            "post",
+            lambda ctx, i: (reverse("borrow-queue-claim"), {"data": {"limit": 10}}),
+            role=UserRole.LIBRARIAN,
+        ),
+        Endpoint(
+            "borrow-approve",
+            "put",
+            lambda ctx, i: (
+                reverse("borrow-approve", args=[ctx.take(BorrowStatus.PENDING)]),
+                {},
+            ),
+            role=UserRole.LIBRARIAN,
+        ),
+        Endpoint(
+            "borrow-reject",
+            "put",
+            lambda ctx, i: (
+                reverse("borrow-reject", args=[ctx.take(BorrowStatus.PENDING)]),
+                {},
+            ),
+            role=UserRole.LIBRARIAN,
+        ),
+        Endpoint(
+            "borrow-return",
+            "put",
+            lambda ctx, i: (
+                reverse("borrow-return", args=[ctx.take(BorrowStatus.APPROVED)]),
+                {},
+            ),
+            role=UserRole.LIBRARIAN,
+        ),
+        Endpoint(
+            "borrow-bulk-action",
+            "post",
+            lambda ctx, i: (
+                reverse("borrow-bulk-action"),
+                {
+                    "data": {
+                        "actions": [
+                            {"id": ctx.take(BorrowStatus.PENDING), "action": "reject"}
+                            for _ in range(10)
+                        ]
+                    },
+                    "content_type": "application/json",
+                },
+            ),
+            role=UserRole.LIBRARIAN,
+        ),
+        Endpoint(
+            "review-list",
+            "get",
+            lambda ctx, i: (
+                reverse("review-list", args=[ctx.pick(ctx.reviewed_book_ids, i)]),
+                {},
+            ),
+        ),
+        Endpoint(
+            "review-list:create",
+            "post",
+            lambda ctx, i: (
+                reverse("review-list", args=[ctx.pick(ctx.book_ids, i)]),
+                {
+                    "data": {
+                        "book": ctx.pick(ctx.book_ids, i),
+                        "rating": 1 + i % 5,
+                        "comment": "Benchmark review",
+                    }
+                },
+            ),
+        ),
+        Endpoint(
+            "review-detail",
+            "get",
+            lambda ctx, i: (
+                reverse("review-detail", args=[ctx.pick(ctx.review_ids, i)]),
+                {},
+            ),
+        ),
+        Endpoint(
+            "schema-swagger-ui",
+            "get",
+            lambda ctx, i: (
+                reverse("schema-swagger-ui"),
+                {"data": {"format": "openapi"}},
+            ),
+            role=None,
+        ),
+        Endpoint(
+            "schema-redoc",
+            "get",
+            lambda ctx, i: (reverse("schema-redoc"), {}),
+            role=None,
+        ),
+    ]
+    by_name = {endpoint.name: endpoint for endpoint in endpoints}
+    endpoints.append(
+        MixedEndpoint("mixed:read-write", [by_name[name] for name in MIXED_ENDPOINTS])
+    )
+    return endpoints
+
+
+def _catalog_file(suffix):
+    content = "\n".join(
+        ["title,author,isbn,total_copies,genres"]
+        + [
+            f"Imported {suffix} {n},Bench Author,{suffix[:11]}{n:02d},2,Fiction"
+            for n in range(10)
+        ]
+    )
+    return SimpleUploadedFile("catalog.csv", content.encode())
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class BenchmarkRunner:
+    """
+    Drive endpoints through Django's test client from worker threads.
+
+    Every endpoint gets ``warmup`` untimed calls, then ``requests`` timed
+    calls spread over ``concurrency`` threads. A separate short pass under
+    ``tracemalloc`` records the peak memory of one request so the tracing
+    overhead does not distort the latency figures.
+    """
+
+    def __init__(self, endpoints, requests=200, concurrency=4, warmup=5, memory=True):
+        self.endpoints = endpoints
+        self.requests = requests
+        self.concurrency = concurrency
+        self.warmup = warmup
+        self.memory = memory
+        self.counter = itertools.count()
+
+    def run(self, context, progress=None):
+        results = {}
+        for endpoint in self.endpoints:
+            results[endpoint.name] = self.run_endpoint(endpoint, context)
+            if progress:
+                progress(endpoint.name, results[endpoint.name])
+        return results
+
+    def run_endpoint(self, endpoint, context):
+        client = Client(raise_request_exception=False)
+        for _ in range(self.warmup):
+            self.call(client, endpoint, context)
+
+        samples = []
+        lock = threading.Lock()
+
+        def worker(count):
+            client = Client(raise_request_exception=False)
+            local = [self.call(client, endpoint, context) for _ in range(count)]
+            connection.close()
+            with lock:
+                samples.extend(local)
+
+        threads = [
+            threading.Thread(target=worker, args=(n,)) for n in self.split_requests()
+        ]
+        sqlite.reset_lock_stats()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        result = self.summarize(endpoint, samples, wall)
+        if self.memory:
+            result["peak_memory_kb"] = self.measure_memory(client, endpoint, context)
+        return result
+
+    def split_requests(self):
+        """
+        Spread the timed requests over ``concurrency`` workers.
+        """
+        return [
+            self.requests // self.concurrency
+            + (1 if n < self.requests % self.concurrency else 0)
+            for n in range(self.concurrency)
+        ]
+
+    def summarize(self, endpoint, samples, wall):
+        latencies = sorted(sample[0] for sample in samples)
+        return {
+            "method": endpoint.method.upper(),
+            "requests": len(samples),
+            "errors": sum(1 for _, status, _ in samples if status >= 400),
+            "status_codes": dict(
+                sorted(Counter(str(status) for _, status, _ in samples).items())
+            ),
+            "throughput_rps": round(len(samples) / wall, 2) if wall else None,
+            "latency_ms": (
+                {
+                    f"p{pct}": round(percentile(latencies, pct) * 1000, 3)
+                    for pct in PERCENTILES
+                }
+                if latencies
+                else {}
+            ),
+            "queries": (
+                round(sum(queries for _, _, queries in samples) / len(samples), 2)
+                if samples
+                else None
+            ),
+            "lock_waits": sqlite.lock_stats(),
+        }
+
+    def call(self, client, endpoint, context):
+        index = next(self.counter)
+        endpoint = endpoint.resolve(index)
+        path, kwargs = endpoint.build(context, index)
+        extra = {}
+        if endpoint.role:
+            extra.update(context.credentials(endpoint.role, index))
+        extra["REMOTE_ADDR"] = client_address(index)
+        started = time.perf_counter()
+        response = getattr(client, endpoint.method)(path, **kwargs, **extra)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        elapsed = time.perf_counter() - started
+        return elapsed, response.status_code, int(response.get("X-Query-Count", 0))
+
+    def measure_memory(self, client, endpoint, context, calls=3):
+        tracemalloc.start()
+        try:
+            peak = 0
+            for _ in range(calls):
+                tracemalloc.reset_peak()
+                self.call(client, endpoint, context)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+        return round(peak / 1024, 1)
+
+
+class AsyncBenchmarkRunner(BenchmarkRunner):
+    """
+    Drive endpoints through Django's async test client, i.e. the ASGI
+    request path, with ``concurrency`` client tasks on one event loop.
+    """
+
+    def run_endpoint(self, endpoint, context):
+        return async_to_sync(self.arun_endpoint)(endpoint, context)
+
+    async def arun_endpoint(self, endpoint, context):
+        client = AsyncClient(raise_request_exception=False)
+        for _ in range(self.warmup):
+            await self.acall(client, endpoint, context)
+
+        async def worker(count):
+            client = AsyncClient(raise_request_exception=False)
+            return [await self.acall(client, endpoint, context) for _ in range(count)]
+
+        sqlite.reset_lock_stats()
+        started = time.perf_counter()
+        batches = await asyncio.gather(*map(worker, self.split_requests()))
+        wall = time.perf_counter() - started
+
+        samples = [sample for batch in batches for sample in batch]
+        result = self.summarize(endpoint, samples, wall)
+        if self.memory:
+            result["peak_memory_kb"] = await self.ameasure_memory(
+                client, endpoint, context
+            )
+        return result
+
+    async def acall(self, client, endpoint, context):
+        index = next(self.counter)
+        endpoint = endpoint.resolve(index)
+        path, kwargs = endpoint.build(context, index)
+        headers = {}
+        if endpoint.role:
+            credentials = context.credentials(endpoint.role, index)
+            if credentials:
+                headers["Authorization"] = credentials["HTTP_AUTHORIZATION"]
+        client.defaults["client"] = [client_address(index), 0]
+        started = time.perf_counter()
+        response = await getattr(client, endpoint.method)(
+            path, **kwargs, headers=headers
+        )
+        if response.streaming:
+            await sync_to_async(list)(response.streaming_content)
+        elapsed = time.perf_counter() - started
+        return elapsed, response.status_code, int(response.get("X-Query-Count", 0))
+
+    async def ameasure_memory(self, client, endpoint, context, calls=3):
+        tracemalloc.start()
+        try:
+            peak = 0
+            for _ in range(calls):
+                tracemalloc.reset_peak()
+                await self.acall(client, endpoint, context)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+        return round(peak / 1024, 1)
+
+
+def client_address(index):
+    # Spread clients over addresses so anonymous throttling does not kick in.
+    return f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Return regressions of ``results`` against ``baseline``.
+
+    An endpoint regresses when its p95 latency grows, or its throughput or
+    query count changes for the worse, by more than ``tolerance``.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        checks = [
+            (
+                "latency_ms.p95",
+                current.get("latency_ms", {}).get("p95"),
+                previous.get("latency_ms", {}).get("p95"),
+                True,
+            ),
+            (
+                "throughput_rps",
+                current.get("throughput_rps"),
+                previous.get("throughput_rps"),
+                False,
+            ),
+            ("queries", current.get("queries"), previous.get("queries"), True),
+        ]
+        for metric, now, before, higher_is_worse in checks:
+            if now is None or not before:
+                continue
+            change = (now - before) / before
+            if (change if higher_is_worse else -change) > tolerance:
+                regressions.append(
+                    {
+                        "endpoint": name,
+                        "metric": metric,
+                        "baseline": before,
+                        "current": now,
+                        "change": round(change, 3),
+                    }
+                )
+    return regressions
+
+
+RENDERER_CLASSES = (JSONRenderer, ORJSONRenderer, MessagePackRenderer)
+
+
+def renderer_payloads(context, page_size=100):
+    """
+    Response data of the book and borrow list pages, for ``compare_renderers``.
+    """
+    client = Client()
+    credentials = context.credentials(UserRole.STUDENT, 0)
+    return {
+        name: client.get(reverse(name), {"page_size": page_size}, **credentials).data
+        for name in ("book-list", "borrow-list")
+    }
+
+
+def compare_renderers(payloads, renderer_classes=RENDERER_CLASSES, rounds=50):
+    """
+    Median encode time and body size of each payload under each available
+    renderer.
+    """
+    results = {}
+    for name, data in payloads.items():
+        results[name] = {}
+        for renderer_class in renderer_classes:
+            if not getattr(renderer_class, "available", True):
+                continue
+            renderer = renderer_class()
+            timings = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                body = renderer.render(data, renderer.media_type, {})
+                timings.append(time.perf_counter() - started)
+            results[name][renderer_class.__name__] = {
+                "media_type": renderer.media_type,
+                "encode_ms": round(percentile(sorted(timings), 50) * 1000, 3),
+                "bytes": len(body),
+            }
+    return results
+
+
+def load_report(path):
+    with open(path) as handle:
+        return json.load(handle)
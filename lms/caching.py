@@ -0,0 +1,178 @@
+import hashlib
+import time
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import connections, router, transaction
+from django.db.models import F
+
+from lms import routers
+from lms.models import CacheVersion
+
+# Response bodies are kept per process; their version counters are shared
+# by every process in CacheVersion rows.
+CACHE_ALIAS = "catalog"
+KEY_PREFIX = "lms:response"
+
+# Version scopes. Book list pages embed authors and genres, so any catalog
+# change bumps BOOKS; a book detail only depends on its own BOOK scope.
+BOOKS = "books"
+AUTHORS = "authors"
+GENRES = "genres"
+# Bumped when the read replica is refreshed (lms.replica); every response
+# depends on it, as reads may have been served by the previous snapshot.
+REPLICA = "replica"
+
+
+def book_scope(book_id):
+    return f"book:{book_id}"
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _initial_version():
+    # Versions start from the clock, so a key computed from the counter of a
+    # deleted row (e.g. in a flushed database) is never reused.
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    """
+    Return the current version of each scope, creating missing counters.
+    """
+    scopes = list(scopes)
+    counters = CacheVersion.objects.filter(scope__in=scopes)
+    found = dict(counters.values_list("scope", "version"))
+    missing = [scope for scope in scopes if scope not in found]
+    if missing:
+        found.update(_create_versions(missing))
+    return [found[scope] for scope in scopes]
+
+
+async def aget_versions(scopes):
+    """
+    ``get_versions`` for async views, using the async ORM.
+    """
+    scopes = list(scopes)
+    counters = CacheVersion.objects.filter(scope__in=scopes)
+    found = {
+        scope: version
+        async for scope, version in counters.values_list("scope", "version")
+    }
+    missing = [scope for scope in scopes if scope not in found]
+    if missing:
+        found.update(await sync_to_async(_create_versions)(missing))
+    return [found[scope] for scope in scopes]
+
+
+def _create_versions(scopes):
+    # One upsert returning the stored version, whether this call or a
+    # concurrent one created the counter.
+    connection = connections[router.db_for_write(CacheVersion)]
+    quote = connection.ops.quote_name
+    table = quote(CacheVersion._meta.db_table)
+    rows = ", ".join(["(%s, %s)"] * len(scopes))
+    sql = (
+        f"INSERT INTO {table} (scope, version) VALUES {rows} "
+        f"ON CONFLICT (scope) DO UPDATE SET version = {table}.version "
+        "RETURNING scope, version"
+    )
+    params = [value for scope in scopes for value in (scope, _initial_version())]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return dict(cursor.fetchall())
+
+
+def request_versions(request, scopes):
+    """
+    ``get_versions`` read once per request, so that its validators and its
+    cache key share one query.
+    """
+    memo = request.__dict__.setdefault("_cache_versions", {})
+    key = tuple(scopes)
+    if key not in memo:
+        memo[key] = get_versions(key)
+    return memo[key]
+
+
+async def arequest_versions(request, scopes):
+    memo = request.__dict__.setdefault("_cache_versions", {})
+    key = tuple(scopes)
+    if key not in memo:
+        memo[key] = await aget_versions(key)
+    return memo[key]
+
+
+def _bump(scopes):
+    # Counters missing here have no cached responses to invalidate.
+    CacheVersion.objects.filter(scope__in=scopes).update(version=F("version") + 1)
+
+
+def bump(*scopes, using=None):
+    """
+    Invalidate every cached response that depends on ``scopes``.
+
+    Counters are bumped immediately and again when the surrounding
+    transaction commits, so a response rebuilt from uncommitted-away data
+    by a concurrent request is not served after the commit.
+    """
+    scopes = list(dict.fromkeys(scopes))
+    if not scopes:
+        return
+    _bump(scopes)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(partial(_bump, scopes), using=using)
+
+
+def invalidate_books(book_ids, using=None):
+    """
+    Invalidate the book lists and the detail responses of ``book_ids``.
+    """
+    bump(BOOKS, *(book_scope(book_id) for book_id in book_ids), using=using)
+
+
+def response_key(request, scopes):
+    """
+    Build a cache key from the request URL and the versions of ``scopes``.
+
+    Query parameters are sorted so that equivalent filter, search, ordering
+    and page combinations share an entry. Responses read from the replica
+    are kept apart from those read from the primary, so a user who just
+    wrote is not served another user's snapshot.
+    """
+    versions = request_versions(request, [*scopes, REPLICA])
+    return _build_key(request, versions, routers.use_replica())
+
+
+async def aresponse_key(request, scopes):
+    versions = await arequest_versions(request, [*scopes, REPLICA])
+    return _build_key(request, versions, await sync_to_async(routers.use_replica)())
+
+
+def _build_key(request, versions, replica):
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    raw = repr((request.get_host(), request.path, params, versions, replica))
+    return f"{KEY_PREFIX}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def get_response_data(key):
+    return get_cache().get(key)
+
+
+async def aget_response_data(key):
+    return await get_cache().aget(key)
+
+
+def set_response_data(key, data):
+    get_cache().set(key, data)
+
+
+async def aset_response_data(key, data):
+    await get_cache().aset(key, data)
@@ -0,0 +1,434 @@
+import random
+from bisect import bisect_left
+from datetime import timedelta
+from datetime import timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from lms import caching, ratings, search
+from lms.enums import BorrowStatus, UserRole
+from lms.inventory import LOAN_PERIOD
+from lms.models import Author, Book, BookReview, BorrowRequest, Genre, User
+
+GENRE_NAMES = [
+    "Fiction",
+    "Poetry",
+    "Non-Fiction",
+    "Historical",
+    "Mythology",
+    "Science",
+    "Philosophy",
+    "Biography",
+    "Fantasy",
+    "Mystery",
+    "Romance",
+    "Travel",
+]
+TITLE_WORDS = [
+    "River",
+    "Monsoon",
+    "Garden",
+    "Shadow",
+    "Kingdom",
+    "Letters",
+    "Silence",
+    "Journey",
+    "Empire",
+    "Songs",
+    "Stars",
+    "Village",
+    "City",
+    "Memory",
+    "Fire",
+    "Dawn",
+]
+REVIEW_COMMENTS = [
+    "A beautifully written book!",
+    "Really enjoyed the storyline.",
+    "Could have been more engaging.",
+    "A classic masterpiece!",
+    "Highly recommended for all readers.",
+]
+# Borrow history is mostly completed loans.
+STATUS_WEIGHTS = [
+    (BorrowStatus.RETURNED, 70),
+    (BorrowStatus.APPROVED, 10),
+    (BorrowStatus.PENDING, 10),
+    (BorrowStatus.REJECTED, 10),
+]
+RATING_WEIGHTS = [(1, 5), (2, 8), (3, 17), (4, 35), (5, 35)]
+
+
+class SkewedChooser:
+    """
+    Pick items with Zipf-like popularity: the item of rank ``r`` is chosen
+    with a weight of ``1 / r ** skew``. Ranks are shuffled over the items so
+    popularity does not follow insertion order.
+    """
+
+    def __init__(self, rng, items, skew):
+        self.rng = rng
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(
+            accumulate(1 / (rank**skew) for rank in range(1, len(self.items) + 1))
+        )
+        self.total = self.cum_weights[-1] if self.cum_weights else 0
+
+    def choice(self):
+        return self.items[bisect_left(self.cum_weights, self.rng.random() * self.total)]
+
+
+class WeightedChooser:
+    """
+    Pick values from ``(value, weight)`` pairs.
+    """
+
+    def __init__(self, rng, weighted):
+        self.rng = rng
+        self.values = [value for value, _ in weighted]
+        self.cum_weights = list(accumulate(weight for _, weight in weighted))
+        self.total = self.cum_weights[-1]
+
+    def choice(self):
+        return self.values[
+            bisect_left(self.cum_weights, self.rng.random() * self.total)
+        ]
+
+
+class DatasetGenerator:
+    """
+    Generate a deterministic synthetic dataset of arbitrary size.
+
+    Rows are written with batched ``executemany`` inserts that use
+    explicit primary keys, so related rows can reference each other without
+    reading anything back. Book popularity and borrower activity follow a
+    Zipf-like ``skew``; available copies are kept consistent with the
+    generated approved loans.
+    """
+
+    def __init__(
+        self,
+        users=100,
+        authors=50,
+        genres=12,
+        books=500,
+        borrows=2000,
+        reviews=1000,
+        seed=0,
+        skew=1.0,
+        batch_size=10000,
+        progress=None,
+    ):
+        self.counts = {
+            "users": users,
+            "authors": authors,
+            "genres": genres,
+            "books": books,
+            "borrows": borrows,
+            "reviews": reviews,
+        }
+        self.rng = random.Random(seed)
+        self.skew = skew
+        self.batch_size = batch_size
+        self.progress = progress
+        # SQLite stores datetimes as naive UTC text: format them directly
+        # rather than through the per-value adapter, which dominates runtime.
+        self.naive_datetimes = connection.vendor == "sqlite"
+        self.now = timezone.now()
+        if self.naive_datetimes and timezone.is_aware(self.now):
+            self.now = timezone.make_naive(self.now, dt_timezone.utc)
+
+    def run(self):
+        with transaction.atomic():
+            user_ids = self.generate_users()
+            author_ids = self.generate_authors()
+            genre_ids = self.generate_genres()
+            book_ids, copies = self.generate_books(author_ids, genre_ids)
+            students = [user_id for user_id, is_student in user_ids if is_student]
+            if book_ids and students:
+                self.generate_borrows(students, book_ids, copies)
+                self.generate_reviews(students, book_ids)
+            self.reset_sequences()
+            search.rebuild()
+            caching.bump(caching.BOOKS, caching.AUTHORS, caching.GENRES)
+        return self.counts
+
+    def generate_users(self):
+        count = self.counts["users"]
+        password = make_password("password123")
+        start = self.next_id(User)
+        # Roughly one librarian for every fifty students, at least one.
+        librarians = max(1, count // 50) if count else 0
+        users = [(start + i, i >= librarians) for i in range(count)]
+        self.insert(
+            User,
+            [
+                "id",
+                "password",
+                "is_superuser",
+                "username",
+                "first_name",
+                "last_name",
+                "email",
+                "is_staff",
+                "is_active",
+                "date_joined",
+                "role",
+            ],
+            (
+                (
+                    user_id,
+                    password,
+                    False,
+                    f"user{user_id}",
+                    "",
+                    "",
+                    f"user{user_id}@example.com",
+                    False,
+                    True,
+                    self.datetime(self.now),
+                    UserRole.STUDENT if is_student else UserRole.LIBRARIAN,
+                )
+                for user_id, is_student in users
+            ),
+        )
+        return users
+
+    def generate_authors(self):
+        start = self.next_id(Author)
+        ids = range(start, start + self.counts["authors"])
+        now = self.datetime(self.now)
+        self.insert(
+            Author,
+            ["id", "name", "bio", "updated_at"],
+            ((i, f"Author {i}", f"Biography of author {i}", now) for i in ids),
+        )
+        return list(ids)
+
+    def generate_genres(self):
+        start = self.next_id(Genre)
+        ids = range(start, start + self.counts["genres"])
+        names = [f"{GENRE_NAMES[n % len(GENRE_NAMES)]} {i}" for n, i in enumerate(ids)]
+        now = self.datetime(self.now)
+        self.insert(
+            Genre,
+            ["id", "name", "updated_at"],
+            ((i, name, now) for i, name in zip(ids, names)),
+        )
+        return list(ids)
+
+    def generate_books(self, author_ids, genre_ids):
+        if not author_ids:
+            self.counts["books"] = 0
+            return [], {}
+        start = self.next_id(Book)
+        ids = list(range(start, start + self.counts["books"]))
+        authors = SkewedChooser(self.rng, author_ids, self.skew)
+        copies = {book_id: self.rng.randint(1, 10) for book_id in ids}
+        now = self.datetime(self.now)
+        no_reviews = [0] * len(ratings.AGGREGATE_FIELDS)
+        self.insert(
+            Book,
+            [
+                "id",
+                "title",
+                "author_id",
+                "isbn",
+                "available_copies",
+                "total_copies",
+                "updated_at",
+                *ratings.AGGREGATE_FIELDS,
+            ],
+            (
+                (
+                    book_id,
+                    " ".join(self.rng.sample(TITLE_WORDS, 3)),
+                    authors.choice(),
+                    f"9{book_id:012d}",
+                    copies[book_id],
+                    copies[book_id],
+                    now,
+                    *no_reviews,
+                )
+                for book_id in ids
+            ),
+        )
+        if genre_ids:
+            self.insert(
+                Book.genres.through,
+                ["book_id", "genre_id"],
+                (
+                    (book_id, genre_id)
+                    for book_id in ids
+                    for genre_id in self.rng.sample(
+                        genre_ids, min(len(genre_ids), self.rng.randint(1, 3))
+                    )
+                ),
+            )
+        return ids, copies
+
+    def generate_borrows(self, students, book_ids, copies):
+        books = SkewedChooser(self.rng, book_ids, self.skew)
+        borrowers = SkewedChooser(self.rng, students, self.skew)
+        statuses = WeightedChooser(self.rng, STATUS_WEIGHTS)
+        on_loan = dict.fromkeys(book_ids, 0)
+        random = self.rng.random
+        year = 365 * 24 * 60
+
+        def rows():
+            for _ in range(self.counts["borrows"]):
+                book_id = books.choice()
+                status = statuses.choice()
+                if status == BorrowStatus.APPROVED:
+                    if on_loan[book_id] >= copies[book_id]:
+                        status = BorrowStatus.RETURNED
+                    else:
+                        on_loan[book_id] += 1
+                requested_at = self.now - timedelta(minutes=60 + int(random() * year))
+                approved_at = due_at = returned_at = None
+                if status in (BorrowStatus.APPROVED, BorrowStatus.RETURNED):
+                    approved_at = requested_at + timedelta(hours=1 + int(random() * 48))
+                    due_at = approved_at + LOAN_PERIOD
+                if status == BorrowStatus.RETURNED:
+                    returned_at = approved_at + timedelta(days=1 + int(random() * 30))
+                yield (
+                    book_id,
+                    borrowers.choice(),
+                    status,
+                    self.datetime(requested_at),
+                    self.datetime(approved_at),
+                    self.datetime(due_at),
+                    self.datetime(returned_at),
+                )
+
+        self.insert(
+            BorrowRequest,
+            [
+                "book_id",
+                "user_id",
+                "status",
+                "requested_at",
+                "approved_at",
+                "due_at",
+                "returned_at",
+            ],
+            rows(),
+        )
+        loaned = [(count, book_id) for book_id, count in on_loan.items() if count]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {Book._meta.db_table} "
+                "SET available_copies = total_copies - %s WHERE id = %s",
+                loaned,
+            )
+
+    def generate_reviews(self, students, book_ids):
+        books = SkewedChooser(self.rng, book_ids, self.skew)
+        reviewers = SkewedChooser(self.rng, students, self.skew)
+        stars = WeightedChooser(self.rng, RATING_WEIGHTS)
+        comments = WeightedChooser(
+            self.rng, [(comment, 1) for comment in REVIEW_COMMENTS]
+        )
+        histograms = {}
+        random = self.rng.random
+        year = 365 * 24 * 60
+
+        def rows():
+            for _ in range(self.counts["reviews"]):
+                created_at = self.datetime(
+                    self.now - timedelta(minutes=1 + int(random() * year))
+                )
+                book_id = books.choice()
+                rating = stars.choice()
+                histogram = histograms.setdefault(
+                    book_id, dict.fromkeys(ratings.STARS, 0)
+                )
+                histogram[rating] += 1
+                yield (
+                    reviewers.choice(),
+                    book_id,
+                    rating,
+                    comments.choice(),
+                    created_at,
+                    created_at,
+                    created_at,
+                )
+
+        self.insert(
+            BookReview,
+            [
+                "user_id",
+                "book_id",
+                "rating",
+                "comment",
+                "rate",
+                "created_at",
+                "updated_at",
+            ],
+            rows(),
+        )
+        aggregates = []
+        for book_id, histogram in histograms.items():
+            values = ratings.compute(histogram)
+            aggregates.append(
+                [values[name] for name in ratings.AGGREGATE_FIELDS] + [book_id]
+            )
+        columns = ", ".join(f"{name} = %s" for name in ratings.AGGREGATE_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {Book._meta.db_table} SET {columns} WHERE id = %s",
+                aggregates,
+            )
+
+    def insert(self, model, columns, rows):
+        """
+        Insert an iterable of row tuples in ``batch_size`` chunks.
+        """
+        table = model._meta.db_table
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            connection.ops.quote_name(table),
+            ", ".join(connection.ops.quote_name(column) for column in columns),
+            ", ".join(["%s"] * len(columns)),
+        )
+        written = 0
+        batch = []
+        with connection.cursor() as cursor:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    cursor.executemany(sql, batch)
+                    written += len(batch)
+                    batch = []
+                    self.report(table, written)
+            if batch:
+                cursor.executemany(sql, batch)
+                written += len(batch)
+                self.report(table, written)
+
+    def report(self, table, written):
+        if self.progress:
+            self.progress(table, written)
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+    def datetime(self, value):
+        if value is None:
+            return None
+        if self.naive_datetimes:
+            return str(value)
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Author, Genre, Book, BorrowRequest, BookReview]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -11,3 +11,9 @@ class BorrowStatus(models.TextChoices):
     APPROVED = "APPROVED", "Approved"
     REJECTED = "REJECTED", "Rejected"
     RETURNED = "RETURNED", "Returned"
+
+
+class InventoryReason(models.TextChoices):
+    CHECKOUT = "CHECKOUT", "Checkout"
+    CHECKIN = "CHECKIN", "Checkin"
+    ADJUSTMENT = "ADJUSTMENT", "Adjustment"
@@ -0,0 +1,162 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from lms.models import Book, BorrowRequest
+
+FORMATS = ("csv", "jsonl")
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+CHUNK_SIZE = 2000
+
+BORROW_COLUMNS = [
+    "id",
+    "status",
+    "requested_at",
+    "approved_at",
+    "returned_at",
+    "book_id",
+    "book_title",
+    "isbn",
+    "user_id",
+    "username",
+]
+# Same columns as the catalog importer reads, so exports can be re-imported.
+BOOK_COLUMNS = [
+    "title",
+    "author",
+    "isbn",
+    "available_copies",
+    "total_copies",
+    "genres",
+    "author_bio",
+]
+
+
+def filter_borrows(queryset, since=None, until=None, status=None, user=None):
+    """
+    Restrict borrow requests to a requested date range (inclusive dates),
+    a status and a user id.
+    """
+    if since:
+        queryset = queryset.filter(requested_at__gte=_start_of_day(since))
+    if until:
+        queryset = queryset.filter(
+            requested_at__lt=_start_of_day(until + timedelta(days=1))
+        )
+    if status:
+        queryset = queryset.filter(status=status)
+    if user:
+        queryset = queryset.filter(user_id=user)
+    return queryset
+
+
+def _start_of_day(day):
+    value = datetime.combine(day, time.min)
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def chunked(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield ``.values()`` rows of ``queryset`` in primary key order, fetching
+    ``chunk_size`` rows per query with a keyset on the primary key.
+    """
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).order_by("pk")[:chunk_size])
+        if not rows:
+            return
+        last_pk = rows[-1]["id"]
+        yield rows
+
+
+def borrow_rows(queryset=None, chunk_size=CHUNK_SIZE):
+    """
+    Lazily yield flat borrow history rows with book and user columns joined.
+    """
+    if queryset is None:
+        queryset = BorrowRequest.objects.all()
+    queryset = queryset.values(
+        "id",
+        "status",
+        "requested_at",
+        "approved_at",
+        "returned_at",
+        "book_id",
+        "user_id",
+        book_title=F("book__title"),
+        isbn=F("book__isbn"),
+        username=F("user__username"),
+    )
+    for rows in chunked(queryset, chunk_size):
+        yield from rows
+
+
+def book_rows(queryset=None, chunk_size=CHUNK_SIZE):
+    """
+    Lazily yield catalog rows, fetching genres with one query per chunk.
+    """
+    if queryset is None:
+        queryset = Book.objects.all()
+    queryset = queryset.values(
+        "id",
+        "title",
+        "isbn",
+        "available_copies",
+        "total_copies",
+        author_name=F("author__name"),
+        author_bio=F("author__bio"),
+    )
+    Through = Book.genres.through
+    for rows in chunked(queryset, chunk_size):
+        genres = {}
+        for book_id, name in (
+            Through.objects.filter(book_id__in=[row["id"] for row in rows])
+            .order_by("genre__name")
+            .values_list("book_id", "genre__name")
+        ):
+            genres.setdefault(book_id, []).append(name)
+        for row in rows:
+            row["author"] = row.pop("author_name")
+            row["genres"] = genres.get(row["id"], [])
+            yield row
+
+
+class _Echo:
+    """
+    File-like object whose ``write`` returns the value, for ``csv.writer``.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return "|".join(value)
+    return "" if value is None else value
+
+
+def render(rows, columns, fmt):
+    """
+    Lazily encode rows as CSV (with a header) or JSON lines.
+    """
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([_cell(row[column]) for column in columns])
+        return
+    for row in rows:
+        record = {column: row[column] for column in columns}
+        yield json.dumps(record, default=_json_default) + "\n"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
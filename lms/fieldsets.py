@@ -0,0 +1,93 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def parse(value):
+    """
+    Parse ``"id,book.title,book.author"`` into the tree
+    ``{"id": {}, "book": {"title": {}, "author": {}}}``.
+    """
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for name in path.strip().split("."):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def from_request(request):
+    """
+    Return the ``(fields, expand)`` trees of a request, ``None`` for each
+    parameter that is absent.
+    """
+    params = getattr(request, "query_params", {})
+    return tuple(
+        parse(params[name]) if name in params else None
+        for name in (FIELDS_PARAM, EXPAND_PARAM)
+    )
+
+
+def is_selective(request):
+    return any(tree is not None for tree in from_request(request))
+
+
+def optimize(queryset, serializer, extra=()):
+    """
+    Restrict ``queryset`` to what ``serializer`` renders.
+
+    Only the rendered columns (and the ``extra`` ones that exist) are
+    fetched; nested foreign keys are joined and nested many-to-many
+    relations prefetched, each restricted the same way. Relations that are
+    not nested only cost their primary keys.
+    """
+    model = queryset.model
+    only, select, prefetch = _plan(serializer, model)
+    only += [name for name in extra if _get_field(model, name) is not None]
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if select:
+        queryset = queryset.select_related(*select)
+    return queryset.prefetch_related(*prefetch).only(*only)
+
+
+def _get_field(model, name):
+    if name == "pk":
+        return model._meta.pk
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _plan(serializer, model, prefix=""):
+    only, select, prefetch = [], [], []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*":
+            continue
+        model_field = _get_field(model, field.source.split(".")[0])
+        if model_field is None or model_field.one_to_many:
+            continue
+        path = prefix + model_field.name
+        nested = getattr(field, "child", field)
+        if model_field.many_to_many:
+            related = model_field.related_model._default_manager.all()
+            if isinstance(nested, serializers.BaseSerializer):
+                related = optimize(related, nested)
+            else:
+                related = related.only("pk")
+            prefetch.append(Prefetch(path, queryset=related))
+            continue
+        only.append(path)
+        if model_field.is_relation and isinstance(nested, serializers.BaseSerializer):
+            select.append(path)
+            nested_only, nested_select, nested_prefetch = _plan(
+                nested, model_field.related_model, path + "__"
+            )
+            only += nested_only
+            select += nested_select
+            prefetch += nested_prefetch
+    return only, select, prefetch
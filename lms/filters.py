@@ -0,0 +1,56 @@
+from django.utils import timezone
+from django_filters import rest_framework as django_filters
+from rest_framework import filters
+
+from lms import queue, search
+from lms.enums import BorrowStatus
+from lms.models import BorrowRequest
+
+
+class BookSearchFilter(filters.SearchFilter):
+    """
+    Search filter backed by the FTS5 book index, ranked by relevance.
+
+    Matches title, ISBN, author name, genre names and author bio by prefix.
+    Falls back to the ``LIKE`` based ``SearchFilter`` on other databases.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not search.is_enabled(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+        return search.search(queryset, terms)
+
+
+class BorrowQueueFilter(django_filters.FilterSet):
+    """
+    Filter the librarian queue by status (pending unless given), book,
+    active claims and age, e.g. ``?min_age=P2D`` for requests waiting two
+    days or more.
+    """
+
+    status = django_filters.ChoiceFilter(choices=BorrowStatus.choices)
+    claimed = django_filters.BooleanFilter(method="filter_claimed")
+    min_age = django_filters.DurationFilter(method="filter_min_age")
+    max_age = django_filters.DurationFilter(method="filter_max_age")
+
+    class Meta:
+        model = BorrowRequest
+        fields = ["status", "book"]
+
+    def __init__(self, data=None, *args, **kwargs):
+        if data is not None and not data.get("status"):
+            data = data.copy()
+            data["status"] = BorrowStatus.PENDING
+        super().__init__(data, *args, **kwargs)
+
+    def filter_claimed(self, queryset, name, value):
+        if value:
+            return queryset.filter(queue.active_claims())
+        return queryset.exclude(queue.active_claims())
+
+    def filter_min_age(self, queryset, name, value):
+        return queryset.filter(requested_at__lte=timezone.now() - value)
+
+    def filter_max_age(self, queryset, name, value):
+        return queryset.filter(requested_at__gte=timezone.now() - value)
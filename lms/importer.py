@@ -0,0 +1,307 @@
+import codecs
+import csv
+import json
+import time
+
+from django.db import transaction
+
+from lms import caching, search
+from lms.enums import InventoryReason
+from lms.models import Author, Book, Genre, InventoryEvent
+
+FORMATS = ("csv", "jsonl")
+REQUIRED_FIELDS = ("title", "author", "isbn", "total_copies")
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportStats:
+    """
+    Running totals for a catalog import.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def detect_format(filename):
+    """
+    Guess the catalog format from a file name, defaulting to CSV.
+    """
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def read_rows(lines, fmt):
+    """
+    Lazily yield ``(line_number, record)`` pairs from text lines.
+
+    ``genres`` may be a list (JSONL) or a ``|`` separated string (CSV).
+    Lines that cannot be decoded yield an ``Exception`` instead of a dict.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as exc:
+            yield line_number, exc
+            continue
+        yield line_number, record
+
+
+def decode_lines(binary_lines, encoding="utf-8-sig"):
+    """
+    Incrementally decode an iterable of byte lines, e.g. an uploaded file.
+    """
+    return codecs.iterdecode(binary_lines, encoding)
+
+
+def check_encoding(binary_lines, encoding="utf-8-sig"):
+    """
+    Raise ``ValueError`` naming the first of ``binary_lines`` that does not
+    decode, so a file is rejected before any of its rows are imported.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    line_number = 0
+    try:
+        for line_number, line in enumerate(binary_lines, start=1):
+            decoder.decode(line)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError as exc:
+        raise ValueError(f"line {line_number} is not valid UTF-8 ({exc.reason})")
+
+
+class CatalogImporter:
+    """
+    Stream catalog rows into the database in fixed-size batches.
+
+    Authors and genres are resolved through in-memory name maps (created in
+    bulk when missing), books are upserted on ``isbn`` with one bulk insert
+    per batch, and the genre links of every imported book are replaced by
+    the ones in the file. Existing books keep the copies they have on loan
+    (see ``reconcile``). Memory use depends on the batch size and the
+    number of distinct authors and genres, not on the file size.
+    """
+
+    def __init__(self, batch_size=1000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.authors = {}
+        self.genres = {}
+
+    def run(self, records):
+        stats = ImportStats()
+        batch = {}
+        for line, record in records:
+            stats.rows += 1
+            if isinstance(record, Exception):
+                stats.add_error(line, str(record))
+                continue
+            try:
+                row = self.clean(record)
+            except ValueError as exc:
+                stats.add_error(line, str(exc))
+                continue
+            row["line"] = line
+            batch[row["isbn"]] = row
+            if len(batch) >= self.batch_size:
+                self.flush(batch, stats)
+                batch = {}
+        if batch:
+            self.flush(batch, stats)
+        return stats
+
+    def clean(self, record):
+        missing = [
+            field for field in REQUIRED_FIELDS if record.get(field) in (None, "")
+        ]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
+        available = record.get("available_copies")
+        try:
+            total = int(record["total_copies"])
+            available = total if available in (None, "") else int(available)
+        except (TypeError, ValueError):
+            raise ValueError("copies must be integers")
+        if total < 0 or not 0 <= available <= total:
+            raise ValueError("available_copies must be between 0 and total_copies")
+        isbn = str(record["isbn"]).strip()
+        for model, field, value in (
+            (Book, "isbn", isbn),
+            (Book, "title", record["title"]),
+            (Author, "name", record["author"]),
+        ):
+            if len(str(value)) > model._meta.get_field(field).max_length:
+                raise ValueError(f"{field} is too long")
+        genres = record.get("genres") or []
+        if isinstance(genres, str):
+            genres = genres.split("|")
+        return {
+            "title": str(record["title"]).strip(),
+            "author": str(record["author"]).strip(),
+            "author_bio": record.get("author_bio") or None,
+            "isbn": isbn,
+            "available_copies": available,
+            "total_copies": total,
+            "genres": sorted(
+                {str(name).strip() for name in genres if str(name).strip()}
+            ),
+        }
+
+    def flush(self, batch, stats):
+        with transaction.atomic():
+            rows, events = self.reconcile(batch, stats)
+            isbns = [row["isbn"] for row in rows]
+            self.resolve_authors(rows)
+            self.resolve_genres(rows)
+            Book.objects.bulk_create(
+                [
+                    Book(
+                        title=row["title"],
+                        author_id=self.authors[row["author"]],
+                        isbn=row["isbn"],
+                        available_copies=row["available_copies"],
+                        total_copies=row["total_copies"],
+                    )
+                    for row in rows
+                ],
+                update_conflicts=True,
+                unique_fields=["isbn"],
+                update_fields=[
+                    "title",
+                    "author",
+                    "available_copies",
+                    "total_copies",
+                    "updated_at",
+                ],
+            )
+            InventoryEvent.objects.bulk_create(events)
+            book_ids = dict(
+                Book.objects.filter(isbn__in=isbns).values_list("isbn", "id")
+            )
+            Through = Book.genres.through
+            Through.objects.filter(book_id__in=book_ids.values()).delete()
+            Through.objects.bulk_create(
+                [
+                    Through(book_id=book_ids[row["isbn"]], genre_id=self.genres[name])
+                    for row in rows
+                    for name in row["genres"]
+                ]
+            )
+            search.index_books(book_ids.values())
+            # Bulk writes skip the model signals that invalidate the cache.
+            caching.invalidate_books(book_ids.values())
+            caching.bump(caching.AUTHORS, caching.GENRES)
+        created = sum(row["created"] for row in rows)
+        stats.created += created
+        stats.updated += len(rows) - created
+        if self.progress:
+            self.progress(stats)
+
+    def reconcile(self, batch, stats):
+        """
+        Return the rows of ``batch`` to write and the inventory events of
+        the books they update.
+
+        Copies on loan stay on loan: an existing book gets its new total
+        minus the copies currently lent out, whatever availability the file
+        states, and the change is recorded as an adjustment. Rows whose new
+        total is below the copies on loan are skipped.
+        """
+        current = {
+            isbn: (book_id, available, total)
+            for book_id, isbn, available, total in Book.objects.filter(
+                isbn__in=batch
+            ).values_list("id", "isbn", "available_copies", "total_copies")
+        }
+        rows, events = [], []
+        for row in batch.values():
+            row["created"] = row["isbn"] not in current
+            if not row["created"]:
+                book_id, available, total = current[row["isbn"]]
+                on_loan = total - available
+                if row["total_copies"] < on_loan:
+                    stats.add_error(
+                        row["line"], f"total_copies is below the {on_loan} on loan"
+                    )
+                    continue
+                row["available_copies"] = row["total_copies"] - on_loan
+                if row["available_copies"] != available:
+                    events.append(
+                        InventoryEvent(
+                            book_id=book_id,
+                            delta=row["available_copies"] - available,
+                            reason=InventoryReason.ADJUSTMENT,
+                        )
+                    )
+            rows.append(row)
+        return rows, events
+
+    def resolve_authors(self, rows):
+        missing = {
+            row["author"]: row for row in rows if row["author"] not in self.authors
+        }
+        if not missing:
+            return
+        for author_id, name in (
+            Author.objects.filter(name__in=missing)
+            .order_by("pk")
+            .values_list("id", "name")
+        ):
+            self.authors.setdefault(name, author_id)
+        created = Author.objects.bulk_create(
+            [
+                Author(name=name, bio=row["author_bio"])
+                for name, row in missing.items()
+                if name not in self.authors
+            ]
+        )
+        self.authors.update((author.name, author.pk) for author in created)
+
+    def resolve_genres(self, rows):
+        missing = {
+            name for row in rows for name in row["genres"] if name not in self.genres
+        }
+        if not missing:
+            return
+        Genre.objects.bulk_create(
+            [Genre(name=name) for name in missing], ignore_conflicts=True
+        )
+        self.genres.update(
+            Genre.objects.filter(name__in=missing).values_list("name", "id")
+        )
@@ -0,0 +1,311 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from lms import caching
+from lms.enums import BorrowStatus, InventoryReason
+from lms.models import Book, BorrowRequest, InventoryEvent, WaitlistEntry
+
+
+class InventoryError(Exception):
+    """
+    Base class for errors raised by the inventory engine.
+    """
+
+
+class InvalidTransition(InventoryError):
+    """
+    The borrow request is not in a state that allows the action.
+    """
+
+
+class NoCopiesAvailable(InventoryError):
+    """
+    The book has no copy left to lend, or all copies are already shelved.
+    """
+
+
+BATCH_SIZE = 500
+# Loans are due this long after approval.
+LOAN_PERIOD = timedelta(days=14)
+# Books per availability lookup; well under SQLite's 32766 query parameters.
+MAX_AVAILABILITY_LOOKUP = 5000
+AVAILABILITY_FIELDS = ["id", "isbn", "available_copies", "total_copies"]
+
+
+# action: (required status, new status, timestamp field, copies delta, reason)
+TRANSITIONS = {
+    "approve": (
+        BorrowStatus.PENDING,
+        BorrowStatus.APPROVED,
+        "approved_at",
+        -1,
+        InventoryReason.CHECKOUT,
+    ),
+    "reject": (BorrowStatus.PENDING, BorrowStatus.REJECTED, None, 0, None),
+    "return": (
+        BorrowStatus.APPROVED,
+        BorrowStatus.RETURNED,
+        "returned_at",
+        1,
+        InventoryReason.CHECKIN,
+    ),
+}
+
+
+def availability(ids=(), isbns=()):
+    """
+    Return the copy counts of the books with any of ``ids`` or ``isbns`` as
+    flat dicts, fetched in one query on the primary key and ISBN indexes.
+    """
+    return list(
+        Book.objects.filter(Q(pk__in=ids) | Q(isbn__in=isbns))
+        .order_by()
+        .values(*AVAILABILITY_FIELDS)
+    )
+
+
+def adjust_copies(book_id, delta, reason, borrow_request_id=None):
+    """
+    Atomically add ``delta`` to a book's available copies and record it.
+
+    The update is a single conditional ``UPDATE`` that never takes
+    ``available_copies`` below zero or above ``total_copies``; when it
+    would, nothing is written and ``NoCopiesAvailable`` is raised.
+    """
+    books = Book.objects.filter(pk=book_id)
+    if delta < 0:
+        books = books.filter(available_copies__gte=-delta)
+    else:
+        books = books.filter(available_copies__lte=F("total_copies") - delta)
+    with transaction.atomic(savepoint=False):
+        if not books.update(
+            available_copies=F("available_copies") + delta, updated_at=timezone.now()
+        ):
+            raise NoCopiesAvailable(f"Cannot change available copies by {delta:+d}")
+        InventoryEvent.objects.create(
+            book_id=book_id,
+            borrow_request_id=borrow_request_id,
+            delta=delta,
+            reason=reason,
+        )
+        # Queryset updates skip the model signals that invalidate the cache.
+        caching.invalidate_books([book_id])
+
+
+def apply_action(borrow_request, action):
+    """
+    Apply ``approve``, ``reject`` or ``return`` to a borrow request.
+
+    The status change is a compare-and-set on the current status, so two
+    librarians acting on the same request cannot both succeed, and the
+    matching inventory change is committed in the same transaction. The
+    in-memory ``borrow_request`` is updated to reflect the new state.
+    """
+    try:
+        source, target, stamp_field, delta, reason = TRANSITIONS[action]
+    except KeyError:
+        raise InvalidTransition(f"Unknown action {action!r}")
+
+    changes = _changes(target, stamp_field, timezone.now())
+    with transaction.atomic():
+        updated = BorrowRequest.objects.filter(
+            pk=borrow_request.pk, status=source
+        ).update(**changes)
+        if not updated:
+            raise InvalidTransition(f"Cannot {action} a request that is not {source}")
+        if delta:
+            adjust_copies(borrow_request.book_id, delta, reason, borrow_request.pk)
+        if delta > 0:
+            promote_waitlist({borrow_request.book_id: delta})
+
+    for field, value in changes.items():
+        setattr(borrow_request, field, value)
+    return borrow_request
+
+
+def apply_actions(items):
+    """
+    Apply many ``(borrow_request_id, action)`` pairs in one transaction.
+
+    The transaction takes the write lock before it reads (row locks where
+    the database has them; ``lms.sqlite`` begins transactions IMMEDIATE), so
+    concurrent batches queue instead of failing on a stale read. Current
+    statuses and copy counts are read once and outcomes are decided in
+    memory, in request order. Accepted changes are then written with one
+    ``UPDATE`` per action, one ``UPDATE`` covering every affected book and a
+    bulk insert of inventory events. Returns one result dict per item; items
+    that cannot be applied are reported without affecting the others. Each
+    borrow request may appear at most once.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        borrows = {}
+        for batch in _batches(borrow_id for borrow_id, _ in items):
+            borrows.update(
+                (row["id"], row)
+                for row in BorrowRequest.objects.select_for_update()
+                .filter(pk__in=batch)
+                .values("id", "status", "book_id")
+            )
+        copies = {}
+        for batch in _batches({row["book_id"] for row in borrows.values()}):
+            copies.update(
+                (book_id, [available, total])
+                for book_id, available, total in Book.objects.select_for_update()
+                .filter(pk__in=batch)
+                .values_list("id", "available_copies", "total_copies")
+            )
+
+        results = [
+            _decide(borrows.get(borrow_id), borrow_id, action, copies)
+            for borrow_id, action in items
+        ]
+        accepted = {}
+        for result in results:
+            if result["ok"]:
+                accepted.setdefault(result["action"], []).append(borrows[result["id"]])
+        _write(accepted, now)
+    return results
+
+
+def _decide(row, borrow_id, action, copies):
+    result = {"id": borrow_id, "action": action, "ok": False}
+    if row is None:
+        return {**result, "detail": "Not found"}
+    result["status"] = row["status"]
+    if action not in TRANSITIONS:
+        return {**result, "detail": "Unknown action"}
+    source, target, _, delta, _ = TRANSITIONS[action]
+    if row["status"] != source:
+        return {**result, "detail": "Invalid action or status"}
+    book = copies[row["book_id"]]
+    if not 0 <= book[0] + delta <= book[1]:
+        return {**result, "detail": "No copies available"}
+    book[0] += delta
+    return {**result, "ok": True, "status": target}
+
+
+def _write(accepted, now):
+    deltas = {}
+    events = []
+    for action, rows in accepted.items():
+        source, target, stamp_field, delta, reason = TRANSITIONS[action]
+        changes = _changes(target, stamp_field, now)
+        for batch in _batches(row["id"] for row in rows):
+            updated = BorrowRequest.objects.filter(pk__in=batch, status=source).update(
+                **changes
+            )
+            if updated != len(batch):
+                raise InvalidTransition("Borrow requests changed concurrently")
+        if not delta:
+            continue
+        for row in rows:
+            deltas[row["book_id"]] = deltas.get(row["book_id"], 0) + delta
+            events.append(
+                InventoryEvent(
+                    book_id=row["book_id"],
+                    borrow_request_id=row["id"],
+                    delta=delta,
+                    reason=reason,
+                )
+            )
+
+    deltas = {book_id: delta for book_id, delta in deltas.items() if delta}
+    for batch in _batches(deltas):
+        Book.objects.filter(pk__in=batch).update(
+            available_copies=F("available_copies")
+            + Case(
+                *[When(pk=book_id, then=Value(deltas[book_id])) for book_id in batch],
+                output_field=IntegerField(),
+            ),
+            updated_at=now,
+        )
+    InventoryEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+    caching.invalidate_books(deltas)
+
+    promote_waitlist(
+        {book_id: delta for book_id, delta in deltas.items() if delta > 0}, now
+    )
+
+
+def promote_waitlist(copies, now=None):
+    """
+    Lend freed copies to the users at the head of the waitlists, oldest
+    entry first, and return their approved borrow requests.
+
+    ``copies`` maps book ids to the number of copies that may be lent. The
+    heads of every book are read in one query and served set-wise: one
+    delete of their entries, one insert of borrow requests, one ``UPDATE``
+    of the books' copies and one insert of inventory events per batch.
+
+    Call it in the transaction that freed the copies, after they were added
+    back: that transaction holds the write lock, so no entry is served twice
+    and no copy is lent twice.
+    """
+    now = now or timezone.now()
+    changes = _changes(BorrowStatus.APPROVED, "approved_at", now)
+    promoted = []
+    for batch in _batches(book_id for book_id, count in copies.items() if count > 0):
+        heads = [
+            (pk, book_id, user_id)
+            for pk, book_id, user_id, rank in WaitlistEntry.objects.filter(
+                book_id__in=batch
+            )
+            .annotate(
+                rank=Window(RowNumber(), partition_by=F("book_id"), order_by="pk")
+            )
+            .filter(rank__lte=max(copies[book_id] for book_id in batch))
+            .values_list("pk", "book_id", "user_id", "rank")
+            if rank <= copies[book_id]
+        ]
+        if not heads:
+            continue
+        with transaction.atomic(savepoint=False):
+            WaitlistEntry.objects.filter(pk__in=[pk for pk, _, _ in heads]).delete()
+            borrows = BorrowRequest.objects.bulk_create(
+                BorrowRequest(book_id=book_id, user_id=user_id, **changes)
+                for _, book_id, user_id in heads
+            )
+            lent = {}
+            for borrow in borrows:
+                lent[borrow.book_id] = lent.get(borrow.book_id, 0) + 1
+            Book.objects.filter(pk__in=lent).update(
+                available_copies=F("available_copies")
+                - Case(
+                    *[When(pk=book_id, then=Value(n)) for book_id, n in lent.items()],
+                    output_field=IntegerField(),
+                ),
+                updated_at=now,
+            )
+            InventoryEvent.objects.bulk_create(
+                InventoryEvent(
+                    book_id=borrow.book_id,
+                    borrow_request_id=borrow.pk,
+                    delta=-1,
+                    reason=InventoryReason.CHECKOUT,
+                )
+                for borrow in borrows
+            )
+            # Queryset updates skip the model signals that invalidate the cache.
+            caching.invalidate_books(lent)
+        promoted += borrows
+    return promoted
+
+
+def _changes(target, stamp_field, now):
+    changes = {"status": target}
+    if stamp_field:
+        changes[stamp_field] = now
+    if target == BorrowStatus.APPROVED:
+        changes["due_at"] = now + LOAN_PERIOD
+    return changes
+
+
+def _batches(values):
+    values = list(values)
+    for start in range(0, len(values), BATCH_SIZE):
+        yield values[start : start + BATCH_SIZE]
@@ -0,0 +1,166 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from lms import sqlite
+from lms.benchmark import (
+    AsyncBenchmarkRunner,
+    BenchmarkContext,
+    BenchmarkRunner,
+    compare,
+    compare_renderers,
+    default_endpoints,
+    load_report,
+    renderer_payloads,
+)
+from lms.datagen import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks every API endpoint against a generated dataset in a "
+        "throwaway test database and reports latency percentiles as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--authors", type=int, default=200)
+        parser.add_argument("--books", type=int, default=5000)
+        parser.add_argument("--borrows", type=int, default=50000)
+        parser.add_argument("--reviews", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Timed requests per endpoint."
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=4, help="Concurrent client threads."
+        )
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            dest="endpoints",
+            help="Only run the named endpoint (repeatable).",
+        )
+        parser.add_argument(
+            "--asgi",
+            action="store_true",
+            help="Send requests through the ASGI stack and its async views.",
+        )
+        parser.add_argument(
+            "--rollback-journal",
+            action="store_true",
+            help=(
+                "Use SQLite's stock rollback journal and per-request connections "
+                "instead of the lms.sqlite profile, for comparison."
+            ),
+        )
+        parser.add_argument(
+            "--no-memory",
+            action="store_false",
+            dest="memory",
+            help="Skip the tracemalloc peak memory pass.",
+        )
+        parser.add_argument(
+            "--renderers",
+            action="store_true",
+            help="Also compare encode time and body size of the response renderers.",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument("--baseline", help="Compare against a stored JSON report.")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Relative change treated as a regression (default: 0.2).",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Exit with an error when a regression is found.",
+        )
+
+    def handle(self, *args, **options):
+        endpoints = default_endpoints()
+        if options["endpoints"]:
+            unknown = set(options["endpoints"]) - {e.name for e in endpoints}
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+            endpoints = [e for e in endpoints if e.name in options["endpoints"]]
+
+        if options["rollback_journal"]:
+            for alias in connections:
+                self.use_rollback_journal(connections[alias].settings_dict)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            urlconf = "server.async_urls" if options["asgi"] else settings.ROOT_URLCONF
+            with override_settings(DEBUG=False, ROOT_URLCONF=urlconf):
+                report = self.run_benchmark(endpoints, options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        if options["baseline"]:
+            report["regressions"] = compare(
+                report["endpoints"],
+                load_report(options["baseline"])["endpoints"],
+                options["tolerance"],
+            )
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        regressions = report.get("regressions") or []
+        for regression in regressions:
+            self.stderr.write(
+                "Regression: {endpoint} {metric} {baseline} -> {current}".format(
+                    **regression
+                )
+            )
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} performance regression(s)")
+
+    def use_rollback_journal(self, settings_dict):
+        if settings_dict["ENGINE"] != sqlite.ENGINE:
+            return
+        settings_dict["OPTIONS"]["pragmas"] = sqlite.ROLLBACK_PRAGMAS
+        settings_dict["CONN_MAX_AGE"] = 0
+
+    def run_benchmark(self, endpoints, options):
+        dataset = {
+            name: options[name]
+            for name in ("users", "authors", "books", "borrows", "reviews")
+        }
+        self.stderr.write(f"Generating dataset: {dataset}")
+        DatasetGenerator(**dataset, seed=options["seed"]).run()
+        runner_class = AsyncBenchmarkRunner if options["asgi"] else BenchmarkRunner
+        runner = runner_class(
+            endpoints,
+            requests=options["requests"],
+            concurrency=options["concurrency"],
+            memory=options["memory"],
+        )
+        context = BenchmarkContext()
+        results = runner.run(
+            context,
+            progress=lambda name, result: self.stderr.write(
+                f"{name}: {result['throughput_rps']} req/s, "
+                f"p95 {result['latency_ms'].get('p95')} ms"
+            ),
+        )
+        report = {
+            "dataset": dataset,
+            "server": "asgi" if options["asgi"] else "wsgi",
+            "journal": "rollback" if options["rollback_journal"] else "wal",
+            "lock_waits": sqlite.LOCK_WAIT_RULE,
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            "endpoints": results,
+        }
+        if options["renderers"]:
+            report["renderers"] = compare_renderers(renderer_payloads(context))
+        return report
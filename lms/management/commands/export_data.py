@@ -0,0 +1,65 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lms import exporter
+from lms.enums import BorrowStatus
+from lms.models import BorrowRequest
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams the book catalog or the borrow history as CSV or JSONL, "
+        "reading the database in fixed-size chunks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=["books", "borrows"])
+        parser.add_argument("--format", choices=exporter.FORMATS, default="jsonl")
+        parser.add_argument(
+            "--output", help="File to write to (default: standard output)."
+        )
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            help="Only borrows requested on or after this date (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--until",
+            type=date.fromisoformat,
+            help="Only borrows requested on or before this date (YYYY-MM-DD).",
+        )
+        parser.add_argument("--status", choices=BorrowStatus.values)
+        parser.add_argument("--user", type=int, help="Only borrows of this user id.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=exporter.CHUNK_SIZE,
+            help="Rows fetched per query (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        if options["dataset"] == "books":
+            rows = exporter.book_rows(chunk_size=options["chunk_size"])
+            columns = exporter.BOOK_COLUMNS
+        else:
+            queryset = exporter.filter_borrows(
+                BorrowRequest.objects.all(),
+                since=options["since"],
+                until=options["until"],
+                status=options["status"],
+                user=options["user"],
+            )
+            rows = exporter.borrow_rows(queryset, chunk_size=options["chunk_size"])
+            columns = exporter.BORROW_COLUMNS
+        chunks = exporter.render(rows, columns, options["format"])
+
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        try:
+            with open(options["output"], "w", encoding="utf-8", newline="") as out:
+                out.writelines(chunks)
+        except OSError as exc:
+            raise CommandError(exc)
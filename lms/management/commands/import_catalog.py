@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lms.importer import (
+    FORMATS,
+    CatalogImporter,
+    check_encoding,
+    detect_format,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams a CSV or JSONL catalog file into the database, upserting books on ISBN"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the catalog file.")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="File format (default: guessed from the file extension).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of books written per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or detect_format(options["path"])
+        importer = CatalogImporter(
+            batch_size=options["batch_size"], progress=self.report_progress
+        )
+        try:
+            with open(options["path"], "rb") as binary_lines:
+                check_encoding(binary_lines)
+            with open(options["path"], encoding="utf-8-sig", newline="") as lines:
+                stats = importer.run(read_rows(lines, fmt))
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        for error in stats.errors:
+            self.stdout.write(
+                self.style.WARNING(f"Line {error['line']}: {error['error']}")
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {stats.rows} rows: {stats.created} created, "
+                f"{stats.updated} updated, {stats.skipped} skipped "
+                f"in {stats.elapsed:.1f}s ({stats.rows_per_second:.0f} rows/s)"
+            )
+        )
+
+    def report_progress(self, stats):
+        self.stdout.write(
+            f"{stats.rows} rows processed ({stats.rows_per_second:.0f} rows/s)"
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from lms import overdue
+
+
+class Command(BaseCommand):
+    help = (
+        "Marks loans that fell due since the previous run as overdue and "
+        "records their fines; meant to be run periodically, e.g. from cron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=overdue.CHUNK_SIZE,
+            help="Loans read and written per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        marked = overdue.mark_overdue(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Marked {marked} overdue loans"))
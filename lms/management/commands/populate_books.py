@@ -4,6 +4,7 @@ from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from lms.datagen import DatasetGenerator
 from lms.models import Author, Book, BookReview, BorrowRequest, Genre
 
 first_names = [
@@ -44,7 +45,36 @@ authors_data = [
 class Command(BaseCommand):
     help = "Populates the database with dummy data for users, authors, genres, books, borrow requests, and reviews"
 
+    def add_arguments(self, parser):
+        group = parser.add_argument_group(
+            "synthetic dataset",
+            "Passing any row count generates a deterministic dataset of that "
+            "size with batched inserts instead of the small demo data.",
+        )
+        for name in ("users", "authors", "genres", "books", "borrows", "reviews"):
+            group.add_argument(
+                f"--{name}", type=int, help=f"Number of {name} to generate."
+            )
+        group.add_argument("--seed", type=int, default=0, help="Random seed.")
+        group.add_argument(
+            "--skew",
+            type=float,
+            default=1.0,
+            help="Zipf exponent for book popularity and borrower activity "
+            "(0 for uniform).",
+        )
+        group.add_argument(
+            "--batch-size", type=int, default=10000, help="Rows per insert batch."
+        )
+
     def handle(self, *args, **kwargs):
+        counts = {
+            name: kwargs.get(name)
+            for name in ("users", "authors", "genres", "books", "borrows", "reviews")
+        }
+        if any(count is not None for count in counts.values()):
+            return self.generate(counts, kwargs)
+
         User = get_user_model()
 
         users = []
@@ -200,3 +230,31 @@ class Command(BaseCommand):
                 )
 
         self.stdout.write(self.style.SUCCESS("Successfully populated dummy data!"))
+
+    def generate(self, counts, options):
+        defaults = {
+            "users": 100,
+            "authors": 50,
+            "genres": 12,
+            "books": 500,
+            "borrows": 0,
+            "reviews": 0,
+        }
+        counts = {
+            name: defaults[name] if count is None else count
+            for name, count in counts.items()
+        }
+        generator = DatasetGenerator(
+            **counts,
+            seed=options["seed"],
+            skew=options["skew"],
+            batch_size=options["batch_size"],
+            progress=lambda table, written: self.stdout.write(
+                f"{table}: {written} rows"
+            ),
+        )
+        start = timezone.now()
+        generator.run()
+        elapsed = (timezone.now() - start).total_seconds()
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Generated {summary} in {elapsed:.1f}s"))
@@ -0,0 +1,13 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms import throttling
+
+
+class Command(BaseCommand):
+    help = "Deletes expired throttle counters from the throttle database"
+
+    def handle(self, *args, **options):
+        deleted = throttling.prune(time.time())
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} throttle counters"))
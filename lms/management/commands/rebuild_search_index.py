@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from lms import caching, search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the FTS5 full-text search index for the book catalog"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to rebuild the index on.",
+        )
+
+    def handle(self, *args, **options):
+        database = options["database"]
+        if not search.is_enabled(database):
+            self.stdout.write(
+                self.style.WARNING("Full-text search is only available on SQLite.")
+            )
+            return
+        indexed = search.rebuild(using=database)
+        caching.bump(caching.BOOKS, using=database)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} books"))
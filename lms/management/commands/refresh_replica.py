@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lms import replica
+
+
+class Command(BaseCommand):
+    help = "Copies the default SQLite database over the read replica"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep refreshing every INTERVAL seconds instead of once.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            try:
+                replica.refresh()
+            except replica.ReplicaError as exc:
+                raise CommandError(str(exc))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stdout.write(
+                self.style.SUCCESS(f"Refreshed the replica in {elapsed_ms:.1f} ms")
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from lms import ratings
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized review aggregates of every book"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=ratings.BATCH_SIZE,
+            help="Books checked per query (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        repaired = ratings.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Repaired {repaired} books"))
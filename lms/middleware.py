@@ -0,0 +1,223 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from lms.routers import SAFE_METHODS, current_request, mark_written, replica_enabled
+
+logger = logging.getLogger("lms.query_budget")
+
+# Counter of the async request being processed in the current context.
+current_counter = ContextVar("current_counter", default=None)
+
+
+def all_connections():
+    """
+    Return the connections of the current thread, once each even when
+    several aliases share one (such as a replica mirroring a test database).
+    """
+    return list({id(conn): conn for conn in connections.all()}.values())
+
+
+class QueryCounter:
+    """
+    Database execute wrapper that counts queries and accumulates their time.
+    """
+
+    def __init__(self, scoped=False):
+        self.scoped = scoped
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.scoped and current_counter.get() is not self:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.queries.append(sql)
+
+    def capture(self):
+        """
+        Return a context manager installing this counter on every connection.
+        """
+        stack = ExitStack()
+        for connection in all_connections():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    def attach(self):
+        """
+        Install this counter on every connection of the current thread.
+
+        Unlike ``capture``, counters may be attached and detached in any
+        order, so concurrent async requests can share a worker thread.
+        """
+        for connection in all_connections():
+            connection.execute_wrappers.append(self)
+
+    def detach(self):
+        for connection in all_connections():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised for a request over its view's budget under ``QUERY_BUDGET_STRICT``.
+    """
+
+
+def get_view_class(view_func):
+    return getattr(view_func, "view_class", None) or getattr(view_func, "cls", None)
+
+
+def get_query_budget(view_func, method=None):
+    """
+    Return the ``query_budget`` declared on the view class behind ``view_func``.
+
+    A budget is either an int applying to every method or a dict keyed by
+    HTTP method. Pass ``method`` to look up the budget for a single method.
+    """
+    budget = getattr(get_view_class(view_func), "query_budget", None)
+    if method is not None and isinstance(budget, dict):
+        return budget.get(method.upper())
+    return budget
+
+
+def is_query_budget_exempt(view_func, method):
+    """
+    Return whether the view behind ``view_func`` lists ``method`` in its
+    ``query_budget_exempt``, for methods whose query count grows with the
+    request or that query after the response leaves the middleware.
+    """
+    exempt = getattr(get_view_class(view_func), "query_budget_exempt", ())
+    return method.upper() in exempt
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware reporting per-request query counts and DB time.
+
+    The figures are exposed as ``X-Query-Count`` / ``X-Query-Time-Ms`` headers
+    and logged on the ``lms.query_budget`` logger. Requests exceeding the
+    ``query_budget`` declared on their view are logged as warnings, or raise
+    ``QueryBudgetExceeded`` when ``QUERY_BUDGET_STRICT`` is set.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        with counter.capture():
+            response = self.get_response(request)
+        return self.report(request, response, counter)
+
+    async def __acall__(self, request):
+        # Async views query through ``sync_to_async``, on a worker thread
+        # whose connections may serve other requests concurrently: attach the
+        # counter there and only count queries made from this request's
+        # context, which ``sync_to_async`` carries over to the thread.
+        counter = QueryCounter(scoped=True)
+        current_counter.set(counter)
+        await sync_to_async(counter.attach)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(counter.detach)()
+        return self.report(request, response, counter)
+
+    def report(self, request, response, counter):
+        match = getattr(request, "resolver_match", None)
+        budget = get_query_budget(match.func, request.method) if match else None
+        duration_ms = round(counter.duration * 1000, 3)
+
+        response["X-Query-Count"] = str(counter.count)
+        response["X-Query-Time-Ms"] = str(duration_ms)
+        if budget is not None:
+            response["X-Query-Budget"] = str(budget)
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "queries": counter.count,
+            "db_time_ms": duration_ms,
+            "budget": budget,
+        }
+        if budget is not None and counter.count > budget:
+            logger.warning(json.dumps(record))
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(
+                    f"{request.method} {request.path} ran {counter.count} "
+                    f"queries, over its budget of {budget}:\n"
+                    + "\n".join(counter.queries)
+                )
+        else:
+            logger.info(json.dumps(record))
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Expose the request to ``ReplicaRouter`` and keep the reads of a user on
+    the primary for a while after they make an unsafe-method request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        if self.wrote(request):
+            mark_written(request.user.pk)
+        return response
+
+    async def __acall__(self, request):
+        token = current_request.set(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        if self.wrote(request):
+            await sync_to_async(mark_written)(request.user.pk)
+        return response
+
+    def wrote(self, request):
+        # DRF views set the authenticated user on the underlying request.
+        user = getattr(request, "user", None)
+        return (
+            request.method not in SAFE_METHODS
+            and user is not None
+            and user.is_authenticated
+            and replica_enabled()
+        )
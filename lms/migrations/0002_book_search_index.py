@@ -0,0 +1,54 @@
+from django.db import migrations
+
+CREATE_SEARCH_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS lms_book_search USING fts5(
+    title, isbn, author, genres, bio,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3 4'
+)
+"""
+
+POPULATE_SEARCH_TABLE = """
+INSERT INTO lms_book_search (rowid, title, isbn, author, genres, bio)
+SELECT
+    book.id,
+    book.title,
+    book.isbn,
+    author.name,
+    COALESCE(
+        (
+            SELECT group_concat(genre.name, ' ')
+            FROM lms_book_genres AS book_genre
+            INNER JOIN lms_genre AS genre ON genre.id = book_genre.genre_id
+            WHERE book_genre.book_id = book.id
+        ),
+        ''
+    ),
+    COALESCE(author.bio, '')
+FROM lms_book AS book
+INNER JOIN lms_author AS author ON author.id = book.author_id
+"""
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(CREATE_SEARCH_TABLE)
+    schema_editor.execute(POPULATE_SEARCH_TABLE)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS lms_book_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
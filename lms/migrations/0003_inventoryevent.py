@@ -0,0 +1,59 @@
+# Generated by Django 4.2.23 on 2026-10-18 02:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0002_book_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventoryEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("delta", models.IntegerField()),
+                (
+                    "reason",
+                    models.CharField(
+                        choices=[
+                            ("CHECKOUT", "Checkout"),
+                            ("CHECKIN", "Checkin"),
+                            ("ADJUSTMENT", "Adjustment"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inventory_events",
+                        to="lms.book",
+                    ),
+                ),
+                (
+                    "borrow_request",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="inventory_events",
+                        to="lms.borrowrequest",
+                    ),
+                ),
+            ],
+        ),
+    ]
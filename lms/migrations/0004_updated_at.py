@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0003_inventoryevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="author",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="bookreview",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="genre",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
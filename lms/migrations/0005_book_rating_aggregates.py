@@ -0,0 +1,81 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:11
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+STARS = range(1, 6)
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    Book = apps.get_model("lms", "Book")
+    BookReview = apps.get_model("lms", "BookReview")
+    db_alias = schema_editor.connection.alias
+    rows = (
+        BookReview.objects.using(db_alias)
+        .values("book_id")
+        .annotate(
+            **{
+                f"rating_{star}_count": Count("pk", filter=Q(rating=star))
+                for star in STARS
+            }
+        )
+        .order_by()
+    )
+    books = []
+    for row in rows:
+        book = Book(pk=row.pop("book_id"), **row)
+        book.review_count = sum(row.values())
+        total = sum(star * row[f"rating_{star}_count"] for star in STARS)
+        book.average_rating = total / book.review_count
+        books.append(book)
+    Book.objects.using(db_alias).bulk_update(
+        books,
+        ["average_rating", "review_count", *(f"rating_{star}_count" for star in STARS)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0004_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="average_rating",
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rating_1_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rating_2_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rating_3_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rating_4_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rating_5_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="review_count",
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
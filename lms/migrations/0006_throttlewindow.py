@@ -0,0 +1,26 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0005_book_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ThrottleWindow",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("period", models.BigIntegerField()),
+                ("current_count", models.PositiveIntegerField(default=0)),
+                ("previous_count", models.PositiveIntegerField(default=0)),
+                ("expires_at", models.BigIntegerField()),
+            ],
+        ),
+    ]
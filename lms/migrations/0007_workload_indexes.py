@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0006_throttlewindow"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["available_copies", "title"], name="book_available_title_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bookreview",
+            index=models.Index(
+                fields=["book", "created_at"], name="review_book_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowrequest",
+            index=models.Index(
+                fields=["user", "status", "requested_at"], name="borrow_user_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowrequest",
+            index=models.Index(
+                fields=["status", "requested_at"], name="borrow_status_requested_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.23 on 2026-10-18 04:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0007_workload_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="borrowrequest",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="borrowrequest",
+            name="claimed_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="claimed_borrow_requests",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
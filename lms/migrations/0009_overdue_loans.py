@@ -0,0 +1,76 @@
+# Generated by Django 4.2.23 on 2026-10-18 04:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0008_borrowrequest_claims"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Fine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=8)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="JobCheckpoint",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("position", models.DateTimeField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="borrowrequest",
+            name="due_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="borrowrequest",
+            name="overdue_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="borrowrequest",
+            index=models.Index(
+                fields=["status", "due_at"], name="borrow_status_due_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="fine",
+            name="borrow_request",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="fine",
+                to="lms.borrowrequest",
+            ),
+        ),
+        migrations.AddField(
+            model_name="fine",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="fines",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.23 on 2026-10-18 04:50
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import F
+
+# lms.inventory.LOAN_PERIOD when due dates were introduced.
+LOAN_PERIOD = timedelta(days=14)
+
+
+def backfill_due_at(apps, schema_editor):
+    """
+    Give loans approved before due dates existed the due date they would
+    have been approved with, so the overdue scan sees them.
+    """
+    BorrowRequest = apps.get_model("lms", "BorrowRequest")
+    BorrowRequest.objects.using(schema_editor.connection.alias).filter(
+        due_at__isnull=True, approved_at__isnull=False
+    ).update(due_at=F("approved_at") + LOAN_PERIOD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0010_waitlist"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_due_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-18 05:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0011_backfill_due_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheVersion",
+            fields=[
+                (
+                    "scope",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("version", models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.23 on 2026-10-18 05:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0012_cacheversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PrimaryPin",
+            fields=[
+                ("user_id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("expires_at", models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-18 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0013_primarypin"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="book",
+            name="book_available_title_idx",
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["available_copies", "id"], name="book_available_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowrequest",
+            index=models.Index(
+                fields=["user", "requested_at"], name="borrow_user_requested_idx"
+            ),
+        ),
+    ]
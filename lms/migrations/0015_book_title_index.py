@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-18 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0014_ordering_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(fields=["title", "id"], name="book_title_id_idx"),
+        ),
+    ]
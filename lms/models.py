@@ -2,7 +2,8 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
 
-from lms.enums import BorrowStatus, UserRole
+from lms.enums import BorrowStatus, InventoryReason, UserRole
+from lms.querysets import BookQuerySet, BookReviewQuerySet, BorrowRequestQuerySet
 
 
 class User(AbstractUser):
@@ -14,6 +15,7 @@ class User(AbstractUser):
 class Author(models.Model):
     name = models.CharField(max_length=100)
     bio = models.TextField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -21,6 +23,7 @@ class Author(models.Model):
 
 class Genre(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -33,6 +36,27 @@ class Book(models.Model):
     isbn = models.CharField(max_length=13, unique=True)
     available_copies = models.PositiveIntegerField()
     total_copies = models.PositiveIntegerField()
+    # Review aggregates, maintained incrementally by lms.ratings.
+    average_rating = models.FloatField(default=0, db_index=True)
+    review_count = models.PositiveIntegerField(default=0, db_index=True)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BookQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Ordering by title and by availability, with the pk tiebreaker
+            # keyset pages use.
+            models.Index(fields=["title", "id"], name="book_title_id_idx"),
+            models.Index(
+                fields=["available_copies", "id"], name="book_available_id_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -51,11 +75,74 @@ class BorrowRequest(models.Model):
     requested_at = models.DateTimeField(auto_now_add=True)
     approved_at = models.DateTimeField(null=True, blank=True)
     returned_at = models.DateTimeField(null=True, blank=True)
+    # Librarian working on the pending request (lms.queue), until the claim
+    # expires.
+    claimed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="claimed_borrow_requests",
+    )
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Set on approval; lms.overdue marks loans still out after it.
+    due_at = models.DateTimeField(null=True, blank=True)
+    overdue_at = models.DateTimeField(null=True, blank=True)
+
+    objects = BorrowRequestQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # A user's own requests by status, newest first.
+            models.Index(
+                fields=["user", "status", "requested_at"],
+                name="borrow_user_status_idx",
+            ),
+            # A user's own requests of every status, newest first.
+            models.Index(
+                fields=["user", "requested_at"], name="borrow_user_requested_idx"
+            ),
+            # The librarian queue and exports: one status, oldest or newest first.
+            models.Index(
+                fields=["status", "requested_at"], name="borrow_status_requested_idx"
+            ),
+            # The overdue scan: loans falling due within a time range.
+            models.Index(fields=["status", "due_at"], name="borrow_status_due_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username}: {self.book.title} - {self.status}"
 
 
+class WaitlistEntry(models.Model):
+    """
+    Place of a user in the first-come, first-served queue for a book with no
+    copies left; ``lms.inventory`` lends returned copies to the oldest entry.
+    """
+
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="waitlist_entries"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="waitlist_entries"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["book", "user"], name="waitlist_book_user_unique"
+            ),
+        ]
+        indexes = [
+            # The queue of a book in arrival order: head lookups and positions.
+            models.Index(fields=["book", "id"], name="waitlist_book_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.book.title}"
+
+
 class BookReview(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reviews")
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="reviews")
@@ -63,6 +150,108 @@ class BookReview(models.Model):
     comment = models.TextField()
     rate = models.DateTimeField(auto_now_add=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BookReviewQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["book", "created_at"], name="review_book_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username}: {self.book.title} - {self.rating}"
+
+
+class InventoryEvent(models.Model):
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="inventory_events"
+    )
+    borrow_request = models.ForeignKey(
+        BorrowRequest,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="inventory_events",
+    )
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=10, choices=InventoryReason.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.book.title}: {self.delta:+d} ({self.reason})"
+
+
+class Fine(models.Model):
+    borrow_request = models.OneToOneField(
+        BorrowRequest, on_delete=models.CASCADE, related_name="fine"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="fines")
+    amount = models.DecimalField(max_digits=8, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.amount}"
+
+
+class JobCheckpoint(models.Model):
+    """
+    High-water mark of a batch job, so each run resumes where the last one
+    stopped instead of rescanning everything.
+    """
+
+    name = models.CharField(max_length=100, primary_key=True)
+    position = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
+
+
+class ThrottleWindow(models.Model):
+    """
+    Sliding-window request counter of one throttle key.
+
+    Only the counts of the current and the previous fixed window are kept,
+    so every key costs one row. Stored in the ``throttle`` database;
+    ``expires_at`` (epoch seconds) tells when the row can be pruned.
+    """
+
+    key = models.CharField(max_length=255, primary_key=True)
+    period = models.BigIntegerField()
+    current_count = models.PositiveIntegerField(default=0)
+    previous_count = models.PositiveIntegerField(default=0)
+    expires_at = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.key}: {self.current_count} ({self.period})"
+
+
+class CacheVersion(models.Model):
+    """
+    Version counter of one response cache scope (lms.caching).
+
+    Stored in the ``throttle`` database, shared by every worker process, and
+    bumped with a single ``UPDATE`` so concurrent bumps are never lost.
+    """
+
+    scope = models.CharField(max_length=255, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.scope}: {self.version}"
+
+
+class PrimaryPin(models.Model):
+    """
+    Keeps the reads of a user who just wrote on the primary (lms.routers).
+
+    Stored in the ``throttle`` database, shared by every worker process;
+    one row per user, the pin holding until ``expires_at`` (epoch seconds).
+    """
+
+    user_id = models.BigIntegerField(primary_key=True)
+    expires_at = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.user_id}: {self.expires_at}"
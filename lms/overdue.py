@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from lms.enums import BorrowStatus
+from lms.models import BorrowRequest, Fine, JobCheckpoint
+
+JOB_NAME = "overdue"
+CHUNK_SIZE = 500
+FINE_AMOUNT = Decimal("5.00")
+
+
+def due_loans(since, until):
+    """
+    Approved loans falling due between ``since`` (if any) and ``until``,
+    inclusive, in ``(due_at, pk)`` order.
+    """
+    queryset = BorrowRequest.objects.filter(
+        status=BorrowStatus.APPROVED, due_at__lte=until
+    )
+    if since is not None:
+        queryset = queryset.filter(due_at__gte=since)
+    return queryset.order_by("due_at", "pk")
+
+
+def get_position():
+    return (
+        JobCheckpoint.objects.filter(name=JOB_NAME)
+        .values_list("position", flat=True)
+        .first()
+    )
+
+
+def set_position(position):
+    JobCheckpoint.objects.update_or_create(
+        name=JOB_NAME, defaults={"position": position}
+    )
+
+
+def mark_overdue(now=None, chunk_size=CHUNK_SIZE):
+    """
+    Mark loans that fell due since the previous run as overdue, fine their
+    borrowers and return how many loans were marked.
+
+    Loans are read from the ``(status, due_at)`` index ``chunk_size`` rows
+    at a time, seeking past the last row seen. Each chunk is written in its
+    own short transaction together with the advanced high-water mark, so an
+    interrupted run resumes where it stopped. Marking is idempotent: loans
+    already marked, or returned in the meantime, are left alone.
+    """
+    now = now or timezone.now()
+    loans = due_loans(get_position(), now).values_list("pk", "user_id", "due_at")
+    marked = 0
+    last = None
+    while True:
+        chunk = loans
+        if last is not None:
+            pk, _, due_at = last
+            chunk = chunk.filter(Q(due_at__gt=due_at) | Q(due_at=due_at, pk__gt=pk))
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            break
+        last = rows[-1]
+        marked += _mark(rows, now)
+    set_position(now)
+    return marked
+
+
+def _mark(rows, now):
+    users = {pk: user_id for pk, user_id, _ in rows}
+    with transaction.atomic():
+        marked = list(
+            BorrowRequest.objects.select_for_update()
+            .filter(pk__in=users, status=BorrowStatus.APPROVED, overdue_at__isnull=True)
+            .values_list("pk", flat=True)
+        )
+        BorrowRequest.objects.filter(pk__in=marked).update(overdue_at=now)
+        Fine.objects.bulk_create(
+            [
+                Fine(borrow_request_id=pk, user_id=users[pk], amount=FINE_AMOUNT)
+                for pk in marked
+            ]
+        )
+        set_position(rows[-1][2])
+    return len(marked)
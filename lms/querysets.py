@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class BookQuerySet(models.QuerySet):
+    def for_serialization(self):
+        """
+        Fetch the author with a join and all genres in a single extra query.
+        """
+        return self.select_related("author").prefetch_related("genres")
+
+
+class BorrowRequestQuerySet(models.QuerySet):
+    def for_serialization(self):
+        """
+        Join the book, its author and the user; prefetch the book genres.
+        """
+        return self.select_related("book__author", "user").prefetch_related(
+            "book__genres"
+        )
+
+
+class BookReviewQuerySet(models.QuerySet):
+    def for_serialization(self):
+        """
+        Join the reviewing user.
+        """
+        return self.select_related("user")
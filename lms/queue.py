@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from lms.enums import BorrowStatus
+from lms.models import BorrowRequest
+
+# A claim not acted upon within this time returns the request to the queue.
+CLAIM_TIMEOUT = timedelta(minutes=15)
+MAX_CLAIM = 100
+
+
+def compact(queryset=None):
+    """
+    Borrow requests with only the columns of the compact queue rows.
+    """
+    if queryset is None:
+        queryset = BorrowRequest.objects.all()
+    return queryset.select_related("book", "user").only(
+        "status",
+        "requested_at",
+        "claimed_by_id",
+        "claimed_at",
+        "book__title",
+        "user__username",
+    )
+
+
+def active_claims(now=None):
+    """
+    Condition matching requests claimed less than ``CLAIM_TIMEOUT`` ago.
+    """
+    now = now or timezone.now()
+    return Q(claimed_by__isnull=False, claimed_at__gt=now - CLAIM_TIMEOUT)
+
+
+def claim(user, limit, queryset=None, now=None):
+    """
+    Claim up to ``limit`` of the oldest unclaimed pending requests for
+    ``user`` and return them, oldest first.
+
+    Requests whose claim expired count as unclaimed. A single ``UPDATE``
+    picks and marks the rows, so librarians claiming at the same time
+    always get disjoint batches; databases with row locks skip the rows
+    another claim is marking instead of waiting for it.
+    """
+    now = now or timezone.now()
+    candidates = (
+        compact(queryset)
+        .filter(status=BorrowStatus.PENDING)
+        .exclude(active_claims(now))
+        .order_by("requested_at", "pk")
+        .select_for_update(skip_locked=True)
+        .values("pk")[:limit]
+    )
+    with transaction.atomic():
+        BorrowRequest.objects.filter(pk__in=candidates).update(
+            claimed_by=user, claimed_at=now
+        )
+        # The claim time tells this batch from the user's earlier claims.
+        return list(
+            compact()
+            .filter(claimed_by=user, claimed_at=now)
+            .order_by("requested_at", "pk")
+        )
@@ -0,0 +1,129 @@
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
+
+from lms import caching
+from lms.models import Book, BookReview
+
+STARS = range(1, 6)
+BATCH_SIZE = 1000
+
+
+def star_field(star):
+    return f"rating_{star}_count"
+
+
+AGGREGATE_FIELDS = ["average_rating", "review_count"] + [
+    star_field(star) for star in STARS
+]
+
+
+def apply_change(book_id, added=None, removed=None):
+    """
+    Add the star rating ``added`` to and/or remove ``removed`` from a book's
+    aggregates with one ``UPDATE`` of plain column arithmetic.
+
+    The new average is derived from the updated histogram in the same
+    statement, so no review rows are read.
+    """
+    deltas = dict.fromkeys(STARS, 0)
+    if added is not None:
+        deltas[added] += 1
+    if removed is not None:
+        deltas[removed] -= 1
+    if not any(deltas.values()):
+        return
+    stars = {star: F(star_field(star)) + deltas[star] for star in STARS}
+    count = F("review_count") + sum(deltas.values())
+    total = sum((star * stars[star] for star in STARS), Value(0))
+    Book.objects.filter(pk=book_id).update(
+        review_count=count,
+        average_rating=Coalesce(
+            Cast(total, FloatField()) / NullIf(count, 0), Value(0.0)
+        ),
+        updated_at=timezone.now(),
+        **{star_field(star): stars[star] for star in STARS if deltas[star]},
+    )
+    # Queryset updates skip the model signals that invalidate the cache.
+    caching.invalidate_books([book_id])
+
+
+def review_created(review):
+    apply_change(review.book_id, added=review.rating)
+
+
+def review_updated(review, old_book_id, old_rating):
+    if review.book_id == old_book_id:
+        apply_change(review.book_id, added=review.rating, removed=old_rating)
+    else:
+        apply_change(old_book_id, removed=old_rating)
+        apply_change(review.book_id, added=review.rating)
+
+
+def review_deleted(review):
+    apply_change(review.book_id, removed=review.rating)
+
+
+def compute(histogram):
+    """
+    Return the aggregate field values for a ``{star: count}`` histogram.
+    """
+    count = sum(histogram.values())
+    total = sum(star * histogram[star] for star in STARS)
+    return {
+        "average_rating": total / count if count else 0.0,
+        "review_count": count,
+        **{star_field(star): histogram[star] for star in STARS},
+    }
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """
+    Recompute the aggregates of every book from its reviews in bulk.
+
+    Books are processed in primary key batches with one grouped query per
+    batch, and only books whose stored values drifted are written. Returns
+    the number of repaired books.
+    """
+    repaired = 0
+    last_pk = 0
+    while True:
+        books = list(
+            Book.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("pk", *AGGREGATE_FIELDS)[:batch_size]
+        )
+        if not books:
+            return repaired
+        last_pk = books[-1].pk
+        histograms = {
+            row.pop("book_id"): row
+            for row in BookReview.objects.filter(book__in=books)
+            .values("book_id")
+            .annotate(
+                **{
+                    star_field(star): Count("pk", filter=Q(rating=star))
+                    for star in STARS
+                }
+            )
+            .order_by()
+        }
+        drifted = []
+        now = timezone.now()
+        for book in books:
+            histogram = histograms.get(book.pk, {})
+            values = compute(
+                {star: histogram.get(star_field(star), 0) for star in STARS}
+            )
+            if all(getattr(book, name) == value for name, value in values.items()):
+                continue
+            for name, value in values.items():
+                setattr(book, name, value)
+            book.updated_at = now
+            drifted.append(book)
+        if drifted:
+            with transaction.atomic():
+                Book.objects.bulk_update(drifted, AGGREGATE_FIELDS + ["updated_at"])
+                caching.invalidate_books(book.pk for book in drifted)
+            repaired += len(drifted)
@@ -0,0 +1,108 @@
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.utils.encoders import JSONEncoder
+
+# Both libraries are optional: JSON falls back to the stdlib encoder and
+# MessagePack is not offered without msgpack.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+)
+
+
+def _default(value):
+    # Types serializers leave behind (Decimal, datetime, UUID, lazy strings)
+    # are encoded the way DRF's JSON encoder does.
+    return JSONEncoder().default(value)
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """
+    JSON renderer encoding with orjson, several times faster than the stdlib
+    encoder on list pages. Indented output falls back to the stdlib.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        body = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        # Like JSONRenderer, keep the output a strict subset of JavaScript.
+        return body.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class ORJSONParser(parsers.JSONParser):
+    """
+    JSON parser decoding with orjson when it is installed.
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    Compact binary rendering for service-to-service calls
+    (``Accept: application/msgpack``).
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+    available = msgpack is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_default)
+
+
+class MessagePackParser(parsers.BaseParser):
+    media_type = "application/msgpack"
+    renderer_class = MessagePackRenderer
+    available = msgpack is not None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read())
+        except ValueError as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
+
+
+class ContentNegotiation(DefaultContentNegotiation):
+    """
+    Content negotiation leaving out renderers and parsers whose library is
+    not installed, so clients get 406 or 415 instead of a server error.
+    """
+
+    def select_parser(self, request, parsers):
+        return super().select_parser(request, _available(parsers))
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return super().select_renderer(request, _available(renderers), format_suffix)
+
+
+def _available(classes):
+    return [item for item in classes if getattr(item, "available", True)]
@@ -0,0 +1,28 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from lms import caching
+from lms.routers import REPLICA_DATABASE
+
+
+class ReplicaError(Exception):
+    pass
+
+
+def refresh(using=REPLICA_DATABASE, source=DEFAULT_DB_ALIAS):
+    """
+    Overwrite the SQLite replica ``using`` with a snapshot of ``source``.
+
+    The online backup API copies every page in one step under a read lock,
+    so writes to the primary carry on and the replica switches to the new
+    snapshot atomically for its readers. Cached catalog responses built
+    from the previous snapshot are invalidated afterwards.
+    """
+    primary, replica = connections[source], connections[using]
+    if primary.vendor != "sqlite" or replica.vendor != "sqlite":
+        raise ReplicaError("Only SQLite replicas can be refreshed by copying.")
+    if primary.settings_dict["NAME"] == replica.settings_dict["NAME"]:
+        raise ReplicaError(f"{using!r} is the same database as {source!r}.")
+    primary.ensure_connection()
+    replica.ensure_connection()
+    primary.connection.backup(replica.connection)
+    caching.bump(caching.REPLICA)
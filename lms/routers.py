@@ -0,0 +1,142 @@
+import os
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from lms.models import PrimaryPin
+
+THROTTLE_DATABASE = "throttle"
+THROTTLE_MODELS = {"throttlewindow", "cacheversion", "primarypin"}
+
+REPLICA_DATABASE = "replica"
+REPLICA_MODELS = {"author", "book", "genre", "bookreview"}
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# How long a user's reads stay on the primary after they write. Keep it
+# above the replica refresh interval plus the time a refresh takes.
+STICKY_SECONDS = 30
+
+# Request being processed in the current context, set by ReplicaMiddleware.
+current_request = ContextVar("current_request", default=None)
+
+# Names of replica databases known to hold the catalog tables.
+_ready_replicas = set()
+
+
+class ThrottleRouter:
+    """
+    Keep throttle counters and cache versions in their own database, shared
+    by every worker process without contending with the catalog's write lock.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.model_name in THROTTLE_MODELS:
+            return THROTTLE_DATABASE
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == THROTTLE_DATABASE:
+            return model_name in THROTTLE_MODELS
+        if model_name in THROTTLE_MODELS:
+            return False
+        return None
+
+
+def replica_enabled():
+    return getattr(settings, "READ_REPLICA", False) and (
+        REPLICA_DATABASE in settings.DATABASES
+    )
+
+
+def mark_written(user_id):
+    """
+    Pin the reads of ``user_id`` to the primary for ``STICKY_SECONDS``.
+
+    The pin is a row of the throttle database, so it holds for every worker
+    process, whichever one serves the user's next read.
+    """
+    expires_at = int(time.time()) + STICKY_SECONDS
+    PrimaryPin.objects.bulk_create(
+        [PrimaryPin(user_id=user_id, expires_at=expires_at)],
+        update_conflicts=True,
+        unique_fields=["user_id"],
+        update_fields=["expires_at"],
+    )
+
+
+def is_pinned(user_id):
+    return PrimaryPin.objects.filter(
+        user_id=user_id, expires_at__gt=int(time.time())
+    ).exists()
+
+
+def replica_ready(using=REPLICA_DATABASE):
+    """
+    Whether the replica ``using`` holds the catalog tables.
+
+    A fresh install has no replica file, or an empty one, until
+    ``manage.py refresh_replica`` first copies the primary over it.
+    """
+    connection = connections[using]
+    name = connection.settings_dict["NAME"]
+    if name in _ready_replicas:
+        return True
+    if connection.vendor == "sqlite" and not connection.is_in_memory_db():
+        if not os.path.exists(name):
+            return False
+    tables = set(connection.introspection.table_names())
+    if not {f"lms_{model_name}" for model_name in REPLICA_MODELS} <= tables:
+        return False
+    _ready_replicas.add(name)
+    return True
+
+
+def use_replica():
+    """
+    Whether reads of the current request may be served by the replica.
+
+    Only safe-method requests qualify, when ``READ_REPLICA`` is enabled and
+    the replica has been refreshed, and not while their user is within the
+    sticky window after a write. Decided once per request, on its first
+    catalog read, which DRF views make after authentication.
+    """
+    request = current_request.get()
+    if request is None or request.method not in SAFE_METHODS:
+        return False
+    if not replica_enabled():
+        return False
+    if not hasattr(request, "_use_replica"):
+        user = getattr(request, "user", None)
+        request._use_replica = (
+            not (user is not None and user.is_authenticated and is_pinned(user.pk))
+            and replica_ready()
+        )
+    return request._use_replica
+
+
+class ReplicaRouter:
+    """
+    Send catalog and review reads of safe-method requests to the ``replica``
+    database when ``READ_REPLICA`` is enabled and the replica has been
+    refreshed; everything else uses the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.model_name in REPLICA_MODELS and use_replica():
+            return REPLICA_DATABASE
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds a copy of the primary's rows.
+        databases = {"default", REPLICA_DATABASE}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_DATABASE:
+            return False
+        return None
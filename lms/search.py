@@ -0,0 +1,119 @@
+from django.db import connections, router
+
+from lms.models import Book
+
+SEARCH_TABLE = "lms_book_search"
+
+# bm25() weights for the title, isbn, author, genres and bio columns.
+COLUMN_WEIGHTS = (10.0, 5.0, 3.0, 2.0, 1.0)
+
+CREATE_SEARCH_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+    title, isbn, author, genres, bio,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3 4'
+)
+"""
+
+POPULATE_SEARCH_TABLE = f"""
+INSERT INTO {SEARCH_TABLE} (rowid, title, isbn, author, genres, bio)
+SELECT
+    book.id,
+    book.title,
+    book.isbn,
+    author.name,
+    COALESCE(
+        (
+            SELECT group_concat(genre.name, ' ')
+            FROM lms_book_genres AS book_genre
+            INNER JOIN lms_genre AS genre ON genre.id = book_genre.genre_id
+            WHERE book_genre.book_id = book.id
+        ),
+        ''
+    ),
+    COALESCE(author.bio, '')
+FROM lms_book AS book
+INNER JOIN lms_author AS author ON author.id = book.author_id
+"""
+
+BATCH_SIZE = 500
+
+
+def is_enabled(using):
+    """
+    Return whether ``using`` is a SQLite database, where the index lives.
+    """
+    return connections[using].vendor == "sqlite"
+
+
+def build_match_query(terms):
+    """
+    Turn search terms into an FTS5 query matching every term as a prefix.
+    """
+    return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def search(queryset, terms):
+    """
+    Restrict a ``Book`` queryset to index matches, best ranked first.
+    """
+    weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+    return queryset.extra(
+        tables=[SEARCH_TABLE],
+        where=[
+            f"{SEARCH_TABLE}.rowid = {Book._meta.db_table}.id",
+            f"{SEARCH_TABLE} MATCH %s",
+        ],
+        params=[build_match_query(terms)],
+        select={"search_rank": f"bm25({SEARCH_TABLE}, {weights})"},
+        order_by=["search_rank"],
+    )
+
+
+def index_books(book_ids, using=None):
+    """
+    (Re)index the given books, replacing any existing index rows.
+    """
+    using = using or router.db_for_write(Book)
+    if not is_enabled(using):
+        return
+    book_ids = list(book_ids)
+    remove_books(book_ids, using=using)
+    with connections[using].cursor() as cursor:
+        for start in range(0, len(book_ids), BATCH_SIZE):
+            batch = book_ids[start : start + BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"{POPULATE_SEARCH_TABLE} WHERE book.id IN ({placeholders})", batch
+            )
+
+
+def remove_books(book_ids, using=None):
+    """
+    Drop the given books from the index.
+    """
+    using = using or router.db_for_write(Book)
+    if not is_enabled(using):
+        return
+    book_ids = list(book_ids)
+    with connections[using].cursor() as cursor:
+        for start in range(0, len(book_ids), BATCH_SIZE):
+            batch = book_ids[start : start + BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", batch
+            )
+
+
+def rebuild(using=None):
+    """
+    Rebuild the whole index from the ``Book`` table.
+    """
+    using = using or router.db_for_write(Book)
+    if not is_enabled(using):
+        return 0
+    with connections[using].cursor() as cursor:
+        cursor.execute(CREATE_SEARCH_TABLE)
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(POPULATE_SEARCH_TABLE)
+        return cursor.rowcount
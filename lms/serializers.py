@@ -1,9 +1,71 @@
 from rest_framework import serializers
 
-from lms.models import Author, Book, BookReview, BorrowRequest, Genre, User
-
-
-class UserSerializer(serializers.ModelSerializer):
+from lms import exporter, fieldsets
+from lms.enums import BorrowStatus
+from lms.importer import FORMATS, check_encoding
+from lms.inventory import MAX_AVAILABILITY_LOOKUP, TRANSITIONS
+from lms.models import (
+    Author,
+    Book,
+    BookReview,
+    BorrowRequest,
+    Genre,
+    User,
+    WaitlistEntry,
+)
+from lms.queue import MAX_CLAIM
+from lms.ratings import AGGREGATE_FIELDS
+
+
+class FieldSelectionMixin:
+    """
+    Render only the fields named in ``?fields=`` and nest only the relations
+    named in ``?expand=``; other relations render as primary keys.
+
+    Both take comma separated, dotted paths into nested serializers, e.g.
+    ``?fields=id,book.title&expand=book``, and default to everything. Input
+    validation is not affected.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if fields is None and expand is None and request is not None:
+            fields, expand = fieldsets.from_request(request)
+        self.selected_fields = fields
+        self.expanded = expand
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.selected_fields is not None and not hasattr(self, "initial_data"):
+            fields = {
+                name: field
+                for name, field in fields.items()
+                if field.write_only or name in self.selected_fields
+            }
+        for name, field in fields.items():
+            nested = getattr(field, "child", field)
+            if field.write_only or not isinstance(nested, serializers.BaseSerializer):
+                continue
+            if self.expanded is not None and name not in self.expanded:
+                fields[name] = self.collapse(name, field)
+            elif isinstance(nested, FieldSelectionMixin):
+                if self.selected_fields is not None:
+                    nested.selected_fields = self.selected_fields[name] or None
+                if self.expanded is not None:
+                    nested.expanded = self.expanded[name]
+        return fields
+
+    def collapse(self, name, field):
+        kwargs = {"read_only": True}
+        if field.source != name:
+            kwargs["source"] = field.source
+        if isinstance(field, serializers.ListSerializer):
+            kwargs["many"] = True
+        return serializers.PrimaryKeyRelatedField(**kwargs)
+
+
+class UserSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "email", "role", "password"]
@@ -14,19 +76,19 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     class Meta:
         model = Author
         fields = "__all__"
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = "__all__"
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     author = AuthorSerializer()
     genres = GenreSerializer(many=True)
 
@@ -39,9 +101,10 @@ class BookCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = "__all__"
+        read_only_fields = AGGREGATE_FIELDS
 
 
-class BorrowRequestSerializer(serializers.ModelSerializer):
+class BorrowRequestSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     book = BookSerializer(read_only=True)
     user = UserSerializer(read_only=True)
     book_id = serializers.PrimaryKeyRelatedField(
@@ -54,11 +117,125 @@ class BorrowRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = BorrowRequest
         fields = "__all__"
+        read_only_fields = ["claimed_by", "claimed_at", "due_at", "overdue_at"]
+
+
+class BorrowQueueSerializer(serializers.ModelSerializer):
+    """
+    Compact borrow request row of the librarian queue.
+    """
+
+    book_title = serializers.CharField(source="book.title", read_only=True)
+    username = serializers.CharField(source="user.username", read_only=True)
+
+    class Meta:
+        model = BorrowRequest
+        fields = [
+            "id",
+            "status",
+            "requested_at",
+            "book",
+            "book_title",
+            "user",
+            "username",
+            "claimed_by",
+            "claimed_at",
+        ]
+        read_only_fields = fields
+
+
+class BorrowClaimSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_CLAIM, default=10)
+    book = serializers.IntegerField(required=False)
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    """
+    Waitlist entry with its 1-based position in the book's queue.
+    """
+
+    position = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ["id", "book", "created_at", "position"]
+        read_only_fields = ["book"]
 
 
-class BookReviewSerializer(serializers.ModelSerializer):
+class BookReviewSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
     class Meta:
         model = BookReview
         fields = "__all__"
+
+
+class BorrowActionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=list(TRANSITIONS))
+
+
+class BulkBorrowActionSerializer(serializers.Serializer):
+    actions = serializers.ListField(
+        child=BorrowActionSerializer(), allow_empty=False, max_length=5000
+    )
+
+    def validate_actions(self, value):
+        ids = [item["id"] for item in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                "Each borrow request may only appear once."
+            )
+        return value
+
+
+class AvailabilityLookupSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, default=list
+    )
+    isbns = serializers.ListField(
+        child=serializers.CharField(max_length=13), required=False, default=list
+    )
+
+    def validate(self, attrs):
+        count = len(attrs["ids"]) + len(attrs["isbns"])
+        if not count:
+            raise serializers.ValidationError("Provide ids or isbns.")
+        if count > MAX_AVAILABILITY_LOOKUP:
+            raise serializers.ValidationError(
+                f"At most {MAX_AVAILABILITY_LOOKUP} books can be looked up at once."
+            )
+        return attrs
+
+
+class CatalogImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+
+    def validate_file(self, value):
+        try:
+            check_encoding(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(f"File {exc}.")
+        value.seek(0)
+        return value
+
+
+class ExportSerializer(serializers.Serializer):
+    export_format = serializers.ChoiceField(choices=exporter.FORMATS, default="jsonl")
+
+
+class BorrowExportSerializer(ExportSerializer):
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=BorrowStatus.choices, required=False)
+    user = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if (
+            attrs.get("since")
+            and attrs.get("until")
+            and attrs["since"] > attrs["until"]
+        ):
+            raise serializers.ValidationError("since must not be after until.")
+        return attrs
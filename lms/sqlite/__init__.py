@@ -0,0 +1,126 @@
+"""
+Production profile for the SQLite databases.
+
+``database()`` builds a ``DATABASES`` entry using the ``lms.sqlite`` engine,
+which applies ``PRAGMAS`` to every new connection and records how long
+statements wait on SQLite's database locks.
+"""
+
+import threading
+
+ENGINE = "lms.sqlite"
+
+# WAL lets readers run alongside the single writer instead of queueing
+# behind it; with WAL, synchronous=NORMAL only fsyncs at checkpoints.
+PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    # Negative sizes are in KiB.
+    "cache_size": -64 * 1024,
+}
+# Stock SQLite settings, for comparison in benchmarks.
+ROLLBACK_PRAGMAS = {"journal_mode": "delete", "synchronous": "full"}
+CONN_MAX_AGE = 600
+# Django opens transactions with a deferred BEGIN. Under WAL, a transaction
+# that reads before it writes then fails with "database is locked" as soon
+# as another writer committed, without waiting out busy_timeout. IMMEDIATE
+# takes the write lock at BEGIN, where waiting for it is safe.
+TRANSACTION_MODE = "IMMEDIATE"
+
+# SQLite does not report the time a statement spent in its busy handler, so
+# statements slower than this on a local database count as lock waits.
+LOCK_WAIT_MS = 20
+LOCK_WAIT_RULE = (
+    f"Estimated: statements taking {LOCK_WAIT_MS} ms or more count as lock "
+    "waits, as SQLite does not report the time spent in its busy handler."
+)
+
+
+def database(name, pragmas=None, transaction_mode=TRANSACTION_MODE, **settings):
+    """
+    Return a ``DATABASES`` entry for the SQLite file ``name``.
+
+    Connections are kept open for ``CONN_MAX_AGE`` seconds and checked before
+    reuse; ``pragmas`` override entries of ``PRAGMAS``. Transactions begin in
+    ``transaction_mode`` (``DEFERRED``, ``IMMEDIATE`` or ``EXCLUSIVE``).
+    """
+    return {
+        "ENGINE": ENGINE,
+        "NAME": name,
+        "CONN_MAX_AGE": CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "pragmas": {**PRAGMAS, **(pragmas or {})},
+            "transaction_mode": transaction_mode,
+        },
+        **settings,
+    }
+
+
+class LockStats:
+    """
+    Thread-safe lock wait counters of one database alias.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.statements = 0
+            self.waits = 0
+            self.wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.timeouts = 0
+
+    def record(self, elapsed_ms):
+        with self.lock:
+            self.statements += 1
+            if elapsed_ms >= LOCK_WAIT_MS:
+                self.waits += 1
+                self.wait_ms += elapsed_ms
+                self.max_wait_ms = max(self.max_wait_ms, elapsed_ms)
+
+    def record_timeout(self):
+        with self.lock:
+            self.timeouts += 1
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "statements": self.statements,
+                "waits": self.waits,
+                "wait_ms": round(self.wait_ms, 3),
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "timeouts": self.timeouts,
+            }
+
+
+_lock_stats = {}
+_lock_stats_lock = threading.Lock()
+
+
+def get_lock_stats(alias):
+    with _lock_stats_lock:
+        if alias not in _lock_stats:
+            _lock_stats[alias] = LockStats()
+        return _lock_stats[alias]
+
+
+def lock_stats():
+    """
+    Return the lock wait counters of every alias using the engine.
+    """
+    with _lock_stats_lock:
+        stats = dict(_lock_stats)
+    return {alias: stats[alias].as_dict() for alias in sorted(stats)}
+
+
+def reset_lock_stats():
+    with _lock_stats_lock:
+        stats = list(_lock_stats.values())
+    for alias_stats in stats:
+        alias_stats.reset()
@@ -0,0 +1,70 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from django.db.backends.sqlite3 import base
+
+from lms.sqlite import get_lock_stats
+
+
+@contextmanager
+def timed(stats):
+    """
+    Record the duration of the wrapped statement, or a lock timeout.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except sqlite3.OperationalError as exc:
+        if "database is locked" in str(exc):
+            stats.record_timeout()
+        raise
+    stats.record((time.perf_counter() - started) * 1000)
+
+
+class CursorWrapper(base.SQLiteCursorWrapper):
+    stats = None
+
+    def execute(self, query, params=None):
+        with timed(self.stats):
+            return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        with timed(self.stats):
+            return super().executemany(query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend applying the ``pragmas`` option to every new connection,
+    beginning transactions in the ``transaction_mode`` option and timing
+    statements into the alias' ``LockStats``.
+    """
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop("pragmas", None)
+        kwargs.pop("transaction_mode", None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict["OPTIONS"].get("pragmas", {}).items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        # Waits for the write lock in the busy handler; timed like any
+        # statement, so the wait shows up in the lock stats.
+        mode = self.settings_dict["OPTIONS"].get("transaction_mode") or "DEFERRED"
+        self.cursor().execute(f"BEGIN {mode}")
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=CursorWrapper)
+        cursor.stats = get_lock_stats(self.alias)
+        return cursor
+
+    def _commit(self):
+        # Under a rollback journal, a commit waits for readers to finish.
+        with timed(get_lock_stats(self.alias)):
+            return super()._commit()
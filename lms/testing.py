@@ -0,0 +1,119 @@
+import re
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from lms.middleware import QueryCounter, get_query_budget
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """
+    Test runner failing every request that exceeds its view's query budget.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_STRICT = True
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin asserting that endpoints stay within their ``query_budget``.
+    """
+
+    def assertConstantQueries(self, path, sizes=(1, 100), **extra):
+        """
+        Assert a paginated GET issues the same number of queries at every size.
+        """
+        # Warm per-process caches, such as the authenticated user's.
+        self.client.get(path, **extra)
+        counts = {}
+        for size in sizes:
+            counter = QueryCounter()
+            with counter.capture():
+                self.client.get(path, {"page_size": size}, **extra)
+            counts[size] = counter.count
+        self.assertEqual(
+            len(set(counts.values())),
+            1,
+            f"Query count of GET {path} depends on page size: {counts}",
+        )
+
+    def assertWithinQueryBudget(self, method, path, data=None, **extra):
+        budget = get_query_budget(resolve(path).func, method)
+        if budget is None:
+            self.fail(f"No query_budget declared for {method.upper()} {path}")
+
+        # Run on-commit callbacks, such as cache invalidation, within the count
+        # as the request's own transaction would.
+        counter = QueryCounter()
+        with counter.capture(), self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method.lower())(path, data, **extra)
+
+        if counter.count > budget:
+            queries = "\n".join(
+                f"{i}. {sql}" for i, sql in enumerate(counter.queries, start=1)
+            )
+            self.fail(
+                f"{method.upper()} {path} ran {counter.count} queries, "
+                f"over its budget of {budget}:\n{queries}"
+            )
+        return response
+
+
+class QueryPlanTestMixin:
+    """
+    TestCase mixin asserting that querysets are answered from indexes.
+    """
+
+    def endpoint_view(self, path, user, params=None):
+        """
+        Return the view at ``path`` set up for a GET by ``user`` with query
+        ``params``.
+        """
+        match = resolve(path)
+        view = match.func.view_class(**match.func.view_initkwargs)
+        request = APIRequestFactory().get(path, params)
+        force_authenticate(request, user)
+        view.args = match.args
+        view.kwargs = match.kwargs
+        view.format_kwarg = None
+        view.request = view.initialize_request(request)
+        return view
+
+    def endpoint_queryset(self, path, user, params=None):
+        """
+        Return the filtered queryset the list or detail view at ``path``
+        would paginate for a GET by ``user`` with query ``params``.
+        """
+        view = self.endpoint_view(path, user, params)
+        return view.filter_queryset(view.get_queryset())
+
+    def endpoint_page_queryset(self, path, user, params):
+        """
+        Return the page the keyset-paginated list at ``path`` would fetch,
+        ordered and sliced by its paginator; ``params`` include ``cursor``.
+        """
+        view = self.endpoint_view(path, user, params)
+        queryset = view.filter_queryset(view.get_queryset())
+        return view.paginator.get_page_queryset(queryset, view.request, view)
+
+    def assertNoFullScan(self, queryset, ordered=False):
+        """
+        Assert ``EXPLAIN QUERY PLAN`` of ``queryset`` reads no table in full.
+
+        Scanning a whole index in order is allowed, as a bounded page of an
+        unfiltered, ordered list does. With ``ordered`` the rows must also
+        come out of an index in the requested order, without a sort.
+        """
+        plan = queryset.explain()
+        failures = [
+            line
+            for line in plan.splitlines()
+            if re.search(r"\bSCAN \S+$", line)
+            or (ordered and re.search(r"USE TEMP B-TREE FOR .*ORDER BY", line))
+        ]
+        if failures:
+            self.fail(f"Query plan of {queryset.query} is not indexed:\n{plan}")
@@ -1,3 +1,2609 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from urllib.parse import parse_qsl, urlsplit
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Count, Q
+from django.test import (
+    AsyncClient,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, resolve, reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from lms import (
+    authentication,
+    caching,
+    exporter,
+    importer,
+    inventory,
+    overdue,
+    queue,
+    ratings,
+    renderers,
+    replica,
+    routers,
+    sqlite,
+    throttling,
+    urls,
+    waitlist,
+)
+from lms.benchmark import (
+    AsyncBenchmarkRunner,
+    BenchmarkContext,
+    BenchmarkRunner,
+    compare,
+    compare_renderers,
+    default_endpoints,
+    renderer_payloads,
+)
+from lms.datagen import DatasetGenerator
+from lms.enums import BorrowStatus, InventoryReason, UserRole
+from lms.middleware import (
+    QueryBudgetExceeded,
+    get_query_budget,
+    is_query_budget_exempt,
+)
+from lms.models import (
+    Author,
+    Book,
+    BookReview,
+    BorrowRequest,
+    Fine,
+    Genre,
+    InventoryEvent,
+    JobCheckpoint,
+    ThrottleWindow,
+    User,
+    WaitlistEntry,
+)
+from lms.testing import QueryBudgetTestMixin, QueryPlanTestMixin
+
+
+def create_catalog(books=12, authors=3, genres=4):
+    """
+    Create a small catalog where every book has an author and two genres.
+    """
+    author_objs = [
+        Author.objects.create(name=f"Author {i}", bio=f"Bio {i}")
+        for i in range(authors)
+    ]
+    genre_objs = [Genre.objects.create(name=f"Genre {i}") for i in range(genres)]
+    book_objs = []
+    for i in range(books):
+        book = Book.objects.create(
+            title=f"Book {i:03d}",
+            author=author_objs[i % authors],
+            isbn=f"{i:013d}",
+            available_copies=3,
+            total_copies=3,
+        )
+        book.genres.set([genre_objs[i % genres], genre_objs[(i + 1) % genres]])
+        book_objs.append(book)
+    return book_objs
+
+
+def run_in_another_process(code):
+    """
+    Run ``code`` in a fresh Python process with Django set up on the test
+    databases, as a second web worker or a management command would.
+
+    Only committed rows are visible to it: call it from a TransactionTestCase.
+    """
+    names = {
+        alias: str(connections[alias].settings_dict["NAME"])
+        for alias in ("default", "throttle")
+    }
+    setup = (
+        "import django\n"
+        "from django.conf import settings\n"
+        f"for alias, name in {names!r}.items():\n"
+        "    settings.DATABASES[alias]['NAME'] = name\n"
+        "django.setup()\n"
+    )
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": "server.settings"}
+    result = subprocess.run(
+        [sys.executable, "-c", setup + code],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout
+
+
+class ReplicaMirrorTestCase(TestCase):
+    """
+    Test case whose requests may read from the replica.
+    """
+
+    databases = {"default", "throttle", "replica"}
+
+    @classmethod
+    def setUpClass(cls):
+        # The replica mirrors the test database; share the connection so its
+        # reads see the rows of each test's transaction.
+        connections[routers.REPLICA_DATABASE] = connections["default"]
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        del connections[routers.REPLICA_DATABASE]
+
+    def setUp(self):
+        caching.get_cache().clear()
+        authentication.get_cache().clear()
+
+
+class APITestCase(ReplicaMirrorTestCase):
+    """
+    Base test case providing a student and a librarian with JWT clients.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.student = User.objects.create_user(
+            username="student", password="password123", role=UserRole.STUDENT
+        )
+        self.librarian = User.objects.create_user(
+            username="librarian", password="password123", role=UserRole.LIBRARIAN
+        )
+        self.client = self.client_for(self.student)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        return client
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.books = create_catalog()
+        for book in self.books:
+            BorrowRequest.objects.create(book=book, user=self.student)
+            BookReview.objects.create(
+                book=self.books[0], user=self.student, rating=4, comment="Good"
+            )
+
+    def test_every_lms_view_declares_a_budget(self):
+        for pattern in urls.urlpatterns:
+            if not isinstance(pattern, URLPattern):
+                continue
+            view_class = getattr(pattern.callback, "view_class", None)
+            if view_class is None or view_class.__module__ != "lms.views":
+                continue
+            for method in ("get", "post", "put", "patch", "delete"):
+                if not hasattr(view_class, method):
+                    continue
+                with self.subTest(view=pattern.name, method=method):
+                    self.assertTrue(
+                        get_query_budget(pattern.callback, method) is not None
+                        or is_query_budget_exempt(pattern.callback, method)
+                    )
+
+    def test_book_list(self):
+        response = self.assertWithinQueryBudget(
+            "get", reverse("book-list"), {"page_size": 100}
+        )
+        self.assertEqual(len(response.data["results"]), len(self.books))
+
+    def test_book_detail(self):
+        self.assertWithinQueryBudget(
+            "get", reverse("book-detail", args=[self.books[0].pk])
+        )
+
+    def test_author_and_genre_lists(self):
+        self.assertWithinQueryBudget("get", reverse("author-list"))
+        self.assertWithinQueryBudget("get", reverse("genre-list"))
+
+    def test_catalog_creates(self):
+        self.client = self.client_for(self.librarian)
+        for name, data in (
+            ("author-list", {"name": "New author"}),
+            ("genre-list", {"name": "New genre"}),
+        ):
+            with self.subTest(name=name):
+                response = self.assertWithinQueryBudget("post", reverse(name), data)
+                self.assertEqual(response.status_code, 201)
+
+    def test_register(self):
+        self.client = APIClient()
+        response = self.assertWithinQueryBudget(
+            "post",
+            reverse("register"),
+            {"username": "new", "password": "password123", "email": "n@example.com"},
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_borrow_list(self):
+        response = self.assertWithinQueryBudget("get", reverse("borrow-list"))
+        self.assertEqual(response.data["count"], len(self.books))
+
+    def test_review_list(self):
+        response = self.assertWithinQueryBudget(
+            "get", reverse("review-list", args=[self.books[0].pk])
+        )
+        self.assertEqual(response.data["count"], len(self.books))
+
+    def test_borrow_approve(self):
+        self.client = self.client_for(self.librarian)
+        borrow = BorrowRequest.objects.filter(status=BorrowStatus.PENDING).first()
+        response = self.assertWithinQueryBudget(
+            "put", reverse("borrow-approve", args=[borrow.pk])
+        )
+        self.assertEqual(response.data["status"], BorrowStatus.APPROVED)
+
+    def test_review_detail(self):
+        ratings.rebuild()
+        review = BookReview.objects.first()
+        path = reverse("review-detail", args=[review.pk])
+        self.assertWithinQueryBudget("get", path)
+        response = self.assertWithinQueryBudget(
+            "patch", path, {"rating": 2}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.assertWithinQueryBudget("delete", path)
+        self.assertEqual(response.status_code, 204)
+
+    def test_book_update(self):
+        self.client = self.client_for(self.librarian)
+        response = self.assertWithinQueryBudget(
+            "patch",
+            reverse("book-detail", args=[self.books[0].pk]),
+            {"title": "Renamed"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_review_and_borrow_create(self):
+        response = self.assertWithinQueryBudget(
+            "post",
+            reverse("review-list", args=[self.books[1].pk]),
+            {"book": self.books[1].pk, "rating": 5, "comment": "Great"},
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.assertWithinQueryBudget(
+            "post",
+            reverse("borrow-request"),
+            {"book_id": self.books[1].pk, "user_id": self.student.pk},
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        for path in [
+            reverse("book-list"),
+            reverse("borrow-list"),
+            reverse("review-list", args=[self.books[0].pk]),
+        ]:
+            with self.subTest(path=path):
+                self.assertConstantQueries(path)
+
+    def test_response_reports_query_count(self):
+        response = self.client.get(reverse("author-list"))
+        self.assertIn("X-Query-Count", response)
+        self.assertIn("X-Query-Time-Ms", response)
+        self.assertEqual(
+            response["X-Query-Budget"],
+            str(get_query_budget(response.wsgi_request.resolver_match.func, "GET")),
+        )
+
+    def test_requests_over_budget_fail_in_strict_mode(self):
+        path = reverse("author-list")
+        view_class = resolve(path).func.view_class
+        with mock.patch.object(view_class, "query_budget", {"GET": 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(path)
+            with override_settings(QUERY_BUDGET_STRICT=False):
+                with self.assertLogs("lms.query_budget", "WARNING"):
+                    self.assertEqual(self.client.get(path).status_code, 200)
+
+    def test_exempt_requests_report_no_budget(self):
+        self.client = self.client_for(self.librarian)
+        response = self.client.get(reverse("book-export"))
+        b"".join(response.streaming_content)
+        self.assertNotIn("X-Query-Budget", response)
+
+
+class KeysetPaginationTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.books = create_catalog(books=25)
+        # Duplicate titles exercise the pk tiebreaker.
+        Book.objects.filter(pk__in=[b.pk for b in self.books[:6]]).update(
+            title="Same title"
+        )
+
+    def walk(self, params):
+        url, seen, pages = reverse("book-list"), [], 0
+        params = {"cursor": "", **params}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            seen.extend(item["id"] for item in response.data["results"])
+            url, params, pages = response.data["next"], None, pages + 1
+        return seen, pages
+
+    def test_walks_every_row_once_in_order(self):
+        for ordering in ["title", "-title", "available_copies", "-available_copies"]:
+            with self.subTest(ordering=ordering):
+                seen, pages = self.walk({"ordering": ordering, "page_size": 4})
+                expected = list(
+                    Book.objects.order_by(
+                        ordering, "-pk" if ordering.startswith("-") else "pk"
+                    ).values_list("pk", flat=True)
+                )
+                self.assertEqual(seen, expected)
+                self.assertEqual(pages, 7)
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get(
+            reverse("book-list"), {"cursor": "", "ordering": "title", "page_size": 5}
+        ).data
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        self.assertEqual(back["results"], first["results"])
+        self.assertIsNone(back["previous"])
+
+    def test_count_is_opt_in(self):
+        response = self.client.get(
+            reverse("book-list"), {"cursor": "", "count": "true"}
+        )
+        self.assertEqual(response.data["count"], 25)
+
+    def test_deep_pages_cost_the_same(self):
+        # Cache the user and create the list's version counters.
+        self.client.get(reverse("book-list"), {"page_size": 1})
+        first = self.client.get(reverse("book-list"), {"cursor": "", "page_size": 2})
+        deep = first
+        for _ in range(5):
+            deep = self.client.get(deep.data["next"])
+        self.assertEqual(first["X-Query-Count"], deep["X-Query-Count"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("book-list"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_pagination_is_unchanged(self):
+        response = self.client.get(reverse("book-list"))
+        self.assertEqual(response.data["count"], 25)
+
+    def test_borrow_and_review_lists(self):
+        BorrowRequest.objects.create(book=self.books[0], user=self.student)
+        BookReview.objects.create(
+            book=self.books[0], user=self.student, rating=5, comment="Great"
+        )
+        for path in [
+            reverse("borrow-list"),
+            reverse("review-list", args=[self.books[0].pk]),
+        ]:
+            with self.subTest(path=path):
+                response = self.assertWithinQueryBudget("get", path, {"cursor": ""})
+                self.assertEqual(len(response.data["results"]), 1)
+                self.assertIsNone(response.data["next"])
+
+
+class BookSearchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.tagore = Author.objects.create(
+            name="Rabindranath Tagore", bio="Nobel laureate from Bengal"
+        )
+        self.narayan = Author.objects.create(name="R.K. Narayan", bio="Malgudi")
+        self.poetry = Genre.objects.create(name="Poetry")
+        self.gitanjali = Book.objects.create(
+            title="Gitanjali",
+            author=self.tagore,
+            isbn="9780140449884",
+            available_copies=1,
+            total_copies=1,
+        )
+        self.gitanjali.genres.add(self.poetry)
+        self.guide = Book.objects.create(
+            title="The Guide",
+            author=self.narayan,
+            isbn="9780143039648",
+            available_copies=1,
+            total_copies=1,
+        )
+
+    def search(self, term):
+        response = self.client.get(reverse("book-list"), {"search": term})
+        return [item["title"] for item in response.data["results"]]
+
+    def test_matches_title_author_genre_bio_and_isbn(self):
+        self.assertEqual(self.search("gitanjali"), ["Gitanjali"])
+        self.assertEqual(self.search("tagore"), ["Gitanjali"])
+        self.assertEqual(self.search("poetry"), ["Gitanjali"])
+        self.assertEqual(self.search("bengal"), ["Gitanjali"])
+        self.assertEqual(self.search("9780143039648"), ["The Guide"])
+
+    def test_prefix_and_multiple_terms(self):
+        self.assertEqual(self.search("gitan"), ["Gitanjali"])
+        self.assertEqual(self.search("guide narayan"), ["The Guide"])
+        self.assertEqual(self.search("guide tagore"), [])
+
+    def test_title_matches_rank_first(self):
+        Book.objects.create(
+            title="Malgudi Days",
+            author=self.tagore,
+            isbn="9780143039655",
+            available_copies=1,
+            total_copies=1,
+        )
+        self.assertEqual(self.search("malgudi"), ["Malgudi Days", "The Guide"])
+
+    def test_index_follows_changes(self):
+        self.tagore.name = "Thakur"
+        self.tagore.save()
+        self.assertEqual(self.search("thakur"), ["Gitanjali"])
+
+        self.poetry.name = "Verse"
+        self.poetry.save()
+        self.assertEqual(self.search("verse"), ["Gitanjali"])
+        self.poetry.books.clear()
+        self.assertEqual(self.search("verse"), [])
+
+        self.guide.title = "The Financial Expert"
+        self.guide.save()
+        self.assertEqual(self.search("financial"), ["The Financial Expert"])
+        self.guide.delete()
+        self.assertEqual(self.search("financial"), [])
+
+    def test_rebuild_command(self):
+        Book.objects.filter(pk=self.guide.pk).update(title="Swami and Friends")
+        self.assertEqual(self.search("swami"), [])
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.search("swami"), ["Swami and Friends"])
+
+    def test_quotes_in_terms_are_escaped(self):
+        self.assertEqual(self.search('"gitanjali'), ["Gitanjali"])
+
+
+class InventoryTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.librarian)
+        self.book = create_catalog(books=1)[0]
+        Book.objects.filter(pk=self.book.pk).update(available_copies=1, total_copies=1)
+        self.first = BorrowRequest.objects.create(book=self.book, user=self.student)
+        self.second = BorrowRequest.objects.create(book=self.book, user=self.student)
+
+    def act(self, borrow, action):
+        return self.client.put(reverse(f"borrow-{action}", args=[borrow.pk]))
+
+    def test_approve_and_return_record_events(self):
+        response = self.act(self.first, "approve")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["book"]["available_copies"], 0)
+        response = self.act(self.first, "return")
+        self.assertEqual(response.data["book"]["available_copies"], 1)
+        self.assertEqual(
+            list(InventoryEvent.objects.order_by("pk").values_list("delta", "reason")),
+            [(-1, InventoryReason.CHECKOUT), (1, InventoryReason.CHECKIN)],
+        )
+
+    def test_refuses_approval_without_copies(self):
+        self.act(self.first, "approve")
+        response = self.act(self.second, "approve")
+        self.assertEqual(response.status_code, 409)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.status, BorrowStatus.PENDING)
+        self.assertEqual(InventoryEvent.objects.count(), 1)
+
+    def test_rejects_invalid_transitions(self):
+        self.assertEqual(self.act(self.first, "return").status_code, 400)
+        self.act(self.first, "approve")
+        self.assertEqual(self.act(self.first, "approve").status_code, 400)
+        self.assertEqual(self.act(self.first, "reject").status_code, 400)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 0)
+
+    def test_never_exceeds_total_copies(self):
+        with self.assertRaises(inventory.NoCopiesAvailable):
+            inventory.adjust_copies(self.book.pk, 1, InventoryReason.ADJUSTMENT)
+
+
+class BookAvailabilityTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.books = create_catalog(books=4)
+        Book.objects.filter(pk=self.books[1].pk).update(available_copies=0)
+
+    def lookup(self, **data):
+        return self.client.post(reverse("book-availability"), data, format="json")
+
+    def test_returns_flat_rows_by_id_and_isbn(self):
+        response = self.lookup(
+            ids=[self.books[0].pk, self.books[1].pk, 999999],
+            isbns=[self.books[1].isbn, self.books[2].isbn, "missing"],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(response.data["results"], key=lambda row: row["id"]),
+            [
+                {
+                    "id": book.pk,
+                    "isbn": book.isbn,
+                    "available_copies": 0 if book == self.books[1] else 3,
+                    "total_copies": 3,
+                }
+                for book in self.books[:3]
+            ],
+        )
+        self.assertEqual(
+            response.data["missing"], {"ids": [999999], "isbns": ["missing"]}
+        )
+
+    def test_one_query_for_thousands_of_books(self):
+        ids = list(range(1, inventory.MAX_AVAILABILITY_LOOKUP))
+        with self.assertNumQueries(1):
+            rows = inventory.availability(ids, [self.books[0].isbn])
+        self.assertEqual(len(rows), len(self.books))
+        self.assertWithinQueryBudget(
+            "post", reverse("book-availability"), {"ids": ids}, format="json"
+        )
+
+    def test_validates_the_lookup(self):
+        self.assertEqual(self.lookup().status_code, 400)
+        too_many = list(range(1, inventory.MAX_AVAILABILITY_LOOKUP + 2))
+        self.assertEqual(self.lookup(ids=too_many).status_code, 400)
+        self.assertEqual(self.lookup(ids=["x"]).status_code, 400)
+
+
+class WaitlistTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.book = create_catalog(books=1)[0]
+        Book.objects.filter(pk=self.book.pk).update(available_copies=1, total_copies=1)
+        self.loan = BorrowRequest.objects.create(book=self.book, user=self.student)
+        inventory.apply_action(self.loan, "approve")
+        self.students = [
+            User.objects.create_user(username=f"waiting{i}", password="pw")
+            for i in range(3)
+        ]
+
+    def request_book(self, user):
+        return self.client_for(user).post(
+            reverse("borrow-request"), {"book_id": self.book.pk, "user_id": user.pk}
+        )
+
+    def test_unavailable_book_queues_the_student(self):
+        responses = [self.request_book(user) for user in self.students]
+        self.assertEqual([r.status_code for r in responses], [202, 202, 202])
+        self.assertEqual([r.data["position"] for r in responses], [1, 2, 3])
+        self.assertFalse(BorrowRequest.objects.exclude(pk=self.loan.pk).exists())
+        again = self.request_book(self.students[0])
+        self.assertEqual(again.data["id"], responses[0].data["id"])
+        self.assertEqual(WaitlistEntry.objects.count(), 3)
+
+    def test_return_lends_the_copy_to_the_head_of_the_queue(self):
+        for user in self.students:
+            self.request_book(user)
+        response = self.client_for(self.librarian).put(
+            reverse("borrow-return", args=[self.loan.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        promoted = BorrowRequest.objects.get(user=self.students[0])
+        self.assertEqual(promoted.status, BorrowStatus.APPROVED)
+        self.assertEqual(promoted.due_at, promoted.approved_at + inventory.LOAN_PERIOD)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 0)
+        self.assertEqual(
+            list(InventoryEvent.objects.order_by("pk").values_list("delta", flat=True)),
+            [-1, 1, -1],
+        )
+        response = self.client_for(self.students[1]).get(reverse("waitlist"))
+        self.assertEqual(response.data["results"][0]["position"], 1)
+
+    def test_bulk_returns_promote_one_waiter_per_copy(self):
+        Book.objects.filter(pk=self.book.pk).update(available_copies=1, total_copies=2)
+        other = BorrowRequest.objects.create(book=self.book, user=self.librarian)
+        inventory.apply_action(other, "approve")
+        for user in self.students:
+            self.request_book(user)
+        self.client_for(self.librarian).post(
+            reverse("borrow-bulk-action"),
+            {
+                "actions": [
+                    {"id": self.loan.pk, "action": "return"},
+                    {"id": other.pk, "action": "return"},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(
+            set(
+                BorrowRequest.objects.filter(status=BorrowStatus.APPROVED).values_list(
+                    "user", flat=True
+                )
+            ),
+            {self.students[0].pk, self.students[1].pk},
+        )
+        self.assertEqual(
+            list(WaitlistEntry.objects.values_list("user", flat=True)),
+            [self.students[2].pk],
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 0)
+
+    def test_bulk_promotion_queries_do_not_grow_with_books(self):
+        counts = []
+        for size in (2, 6):
+            loans = []
+            for i in range(size):
+                book = Book.objects.create(
+                    title=f"Book {size}-{i}",
+                    author=self.book.author,
+                    isbn=f"{size}-{i}",
+                    available_copies=1,
+                    total_copies=1,
+                )
+                loan = BorrowRequest.objects.create(book=book, user=self.librarian)
+                loans.append(inventory.apply_action(loan, "approve"))
+                for user in self.students[:2]:
+                    waitlist.join(user, book.pk)
+            with CaptureQueriesContext(connection) as queries:
+                results = inventory.apply_actions(
+                    [(loan.pk, "return") for loan in loans]
+                )
+            self.assertTrue(all(result["ok"] for result in results))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        # The head of each book's queue got its copy; the next one waits.
+        self.assertEqual(
+            BorrowRequest.objects.filter(
+                user=self.students[0], status=BorrowStatus.APPROVED
+            ).count(),
+            8,
+        )
+        self.assertEqual(WaitlistEntry.objects.filter(user=self.students[1]).count(), 8)
+        self.assertFalse(
+            Book.objects.filter(isbn__contains="-", available_copies__gt=0).exists()
+        )
+
+    def test_promotion_query_budgets(self):
+        Book.objects.filter(pk=self.book.pk).update(available_copies=1, total_copies=2)
+        other = BorrowRequest.objects.create(book=self.book, user=self.librarian)
+        inventory.apply_action(other, "approve")
+        for user in self.students:
+            self.request_book(user)
+        self.client = self.client_for(self.librarian)
+        self.assertWithinQueryBudget("put", reverse("borrow-return", args=[other.pk]))
+        self.assertWithinQueryBudget(
+            "post",
+            reverse("borrow-bulk-action"),
+            {"actions": [{"id": self.loan.pk, "action": "return"}]},
+            format="json",
+        )
+        self.assertEqual(
+            BorrowRequest.objects.filter(
+                user__in=self.students[:2], status=BorrowStatus.APPROVED
+            ).count(),
+            2,
+        )
+
+    def test_joining_after_a_copy_was_freed_borrows_it(self):
+        Book.objects.filter(pk=self.book.pk).update(available_copies=1, total_copies=2)
+        entry, borrow = waitlist.join(self.students[0], self.book.pk)
+        self.assertIsNone(entry)
+        self.assertEqual(borrow.status, BorrowStatus.APPROVED)
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_leaving_moves_the_queue_up(self):
+        entries = [self.request_book(user).data["id"] for user in self.students]
+        client = self.client_for(self.students[2])
+        url = reverse("waitlist-detail", args=[entries[2]])
+        self.assertEqual(client.get(url).data["position"], 3)
+        self.client_for(self.students[0]).delete(
+            reverse("waitlist-detail", args=[entries[0]])
+        )
+        self.assertEqual(client.get(url).data["position"], 2)
+        self.assertEqual(
+            client.delete(reverse("waitlist-detail", args=[entries[1]])).status_code,
+            404,
+        )
+
+    def test_query_budgets(self):
+        for user in self.students:
+            self.request_book(user)
+        self.client = self.client_for(self.students[2])
+        response = self.assertWithinQueryBudget("get", reverse("waitlist"))
+        entry = response.data["results"][0]["id"]
+        self.assertWithinQueryBudget("get", reverse("waitlist-detail", args=[entry]))
+        self.assertWithinQueryBudget("delete", reverse("waitlist-detail", args=[entry]))
+        self.client = self.client_for(self.student)
+        self.assertWithinQueryBudget(
+            "post",
+            reverse("borrow-request"),
+            {"book_id": self.book.pk, "user_id": self.student.pk},
+        )
+
+
+class BulkBorrowActionTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.librarian)
+        self.book, self.other = create_catalog(books=2)
+        Book.objects.filter(pk=self.book.pk).update(available_copies=2, total_copies=2)
+        self.pending = [
+            BorrowRequest.objects.create(book=self.book, user=self.student)
+            for _ in range(3)
+        ]
+        self.approved = BorrowRequest.objects.create(
+            book=self.other, user=self.student, status=BorrowStatus.APPROVED
+        )
+        Book.objects.filter(pk=self.other.pk).update(available_copies=2)
+
+    def post(self, actions):
+        return self.client.post(
+            reverse("borrow-bulk-action"), {"actions": actions}, format="json"
+        )
+
+    def test_applies_each_item_and_reports_results(self):
+        response = self.post(
+            [
+                {"id": self.pending[0].pk, "action": "approve"},
+                {"id": self.pending[1].pk, "action": "approve"},
+                {"id": self.pending[2].pk, "action": "approve"},
+                {"id": self.approved.pk, "action": "return"},
+                {"id": 999999, "action": "reject"},
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(r["ok"], r.get("status")) for r in response.data["results"]],
+            [
+                (True, BorrowStatus.APPROVED),
+                (True, BorrowStatus.APPROVED),
+                (False, BorrowStatus.PENDING),
+                (True, BorrowStatus.RETURNED),
+                (False, None),
+            ],
+        )
+        self.assertEqual(response.data["results"][2]["detail"], "No copies available")
+        self.book.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 0)
+        self.assertEqual(self.other.available_copies, 3)
+        self.assertEqual(InventoryEvent.objects.count(), 3)
+        self.assertIsNotNone(BorrowRequest.objects.get(pk=self.approved.pk).returned_at)
+
+    def test_rejects_and_invalid_transitions(self):
+        response = self.post(
+            [
+                {"id": self.pending[0].pk, "action": "reject"},
+                {"id": self.pending[1].pk, "action": "return"},
+            ]
+        )
+        self.assertEqual([r["ok"] for r in response.data["results"]], [True, False])
+        self.assertEqual(InventoryEvent.objects.count(), 0)
+
+    def test_validates_payload(self):
+        duplicate = [{"id": self.pending[0].pk, "action": "approve"}] * 2
+        self.assertEqual(self.post(duplicate).status_code, 400)
+        self.assertEqual(self.post([{"id": 1, "action": "lose"}]).status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+
+    def test_librarian_only(self):
+        self.client = self.client_for(self.student)
+        response = self.post([{"id": self.pending[0].pk, "action": "approve"}])
+        self.assertEqual(response.status_code, 403)
+
+    def test_query_count_is_independent_of_batch_size(self):
+        Book.objects.filter(pk=self.book.pk).update(
+            available_copies=100, total_copies=100
+        )
+        borrows = BorrowRequest.objects.bulk_create(
+            BorrowRequest(book=self.book, user=self.student) for _ in range(100)
+        )
+        response = self.assertWithinQueryBudget(
+            "post",
+            reverse("borrow-bulk-action"),
+            {"actions": [{"id": b.pk, "action": "approve"} for b in borrows]},
+            format="json",
+        )
+        self.assertTrue(all(r["ok"] for r in response.data["results"]))
+
+
+class BorrowQueueTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.librarian)
+        self.book, self.other = create_catalog(books=2)
+        now = timezone.now()
+        self.pending = []
+        for days in range(6):
+            borrow = BorrowRequest.objects.create(
+                book=self.book if days % 2 else self.other, user=self.student
+            )
+            BorrowRequest.objects.filter(pk=borrow.pk).update(
+                requested_at=now - datetime.timedelta(days=days)
+            )
+            self.pending.append(borrow)
+        self.pending.reverse()  # Oldest first.
+        self.approved = BorrowRequest.objects.create(
+            book=self.book, user=self.student, status=BorrowStatus.APPROVED
+        )
+
+    def ids(self, response):
+        return [row["id"] for row in response.data["results"]]
+
+    def claim(self, client=None, **data):
+        return (client or self.client).post(
+            reverse("borrow-queue-claim"), data, format="json"
+        )
+
+    def test_lists_pending_requests_oldest_first(self):
+        response = self.client.get(reverse("borrow-queue"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ids(response), [b.pk for b in self.pending])
+        self.assertEqual(
+            set(response.data["results"][0]),
+            {
+                "id",
+                "status",
+                "requested_at",
+                "book",
+                "book_title",
+                "user",
+                "username",
+                "claimed_by",
+                "claimed_at",
+            },
+        )
+        self.assertEqual(response.data["results"][0]["username"], "student")
+
+    def test_filters_by_status_book_and_age(self):
+        url = reverse("borrow-queue")
+        response = self.client.get(url, {"status": BorrowStatus.APPROVED})
+        self.assertEqual(self.ids(response), [self.approved.pk])
+        response = self.client.get(url, {"book": self.book.pk})
+        self.assertEqual(
+            self.ids(response), [b.pk for b in self.pending if b.book == self.book]
+        )
+        response = self.client.get(url, {"min_age": "P2D", "max_age": "P4DT1H"})
+        self.assertEqual(self.ids(response), [b.pk for b in self.pending[1:4]])
+
+    def test_keyset_pages_cover_the_queue(self):
+        url = reverse("borrow-queue")
+        response = self.client.get(url, {"page_size": 4, "ordering": "-requested_at"})
+        seen = self.ids(response)
+        response = self.client.get(response.data["next"])
+        seen += self.ids(response)
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(seen, [b.pk for b in reversed(self.pending)])
+
+    def test_claims_disjoint_batches_oldest_first(self):
+        other = User.objects.create_user(
+            username="other", password="pw", role=UserRole.LIBRARIAN
+        )
+        first = self.claim(limit=2)
+        second = self.claim(self.client_for(other), limit=3)
+        self.assertEqual(self.ids(first), [b.pk for b in self.pending[:2]])
+        self.assertEqual(self.ids(second), [b.pk for b in self.pending[2:5]])
+        self.assertEqual(first.data["results"][0]["claimed_by"], self.librarian.pk)
+        response = self.client.get(reverse("borrow-queue"), {"claimed": "false"})
+        self.assertEqual(self.ids(response), [self.pending[5].pk])
+
+    def test_claim_by_book_and_expired_claims(self):
+        response = self.claim(limit=10, book=self.other.pk)
+        self.assertEqual(
+            self.ids(response), [b.pk for b in self.pending if b.book == self.other]
+        )
+        self.assertEqual(self.ids(self.claim(limit=10, book=self.other.pk)), [])
+        BorrowRequest.objects.update(
+            claimed_at=timezone.now() - queue.CLAIM_TIMEOUT - datetime.timedelta(1)
+        )
+        self.assertEqual(len(self.ids(self.claim(limit=10))), len(self.pending))
+
+    def test_validates_limit(self):
+        self.assertEqual(self.claim(limit=0).status_code, 400)
+        self.assertEqual(self.claim(limit=queue.MAX_CLAIM + 1).status_code, 400)
+
+    def test_librarian_only(self):
+        self.client = self.client_for(self.student)
+        self.assertEqual(self.client.get(reverse("borrow-queue")).status_code, 403)
+        self.assertEqual(self.claim(limit=1).status_code, 403)
+
+    def test_query_budgets(self):
+        self.assertWithinQueryBudget(
+            "get", reverse("borrow-queue"), {"book": self.book.pk, "min_age": "P1D"}
+        )
+        self.assertConstantQueries(reverse("borrow-queue"))
+        response = self.assertWithinQueryBudget(
+            "post", reverse("borrow-queue-claim"), {"limit": 3}, format="json"
+        )
+        self.assertEqual(len(response.data["results"]), 3)
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+    databases = {"default", "throttle"}
+    librarians = 6
+
+    def test_concurrent_claims_never_overlap(self):
+        book = create_catalog(books=1)[0]
+        student = User.objects.create_user(username="student", password="pw")
+        BorrowRequest.objects.bulk_create(
+            BorrowRequest(book=book, user=student) for _ in range(40)
+        )
+        users = [
+            User.objects.create_user(username=f"librarian{i}", password="pw")
+            for i in range(self.librarians)
+        ]
+        barrier = threading.Barrier(self.librarians)
+        claimed, errors = {}, []
+
+        def target(user):
+            try:
+                barrier.wait()
+                claimed[user.pk] = [b.pk for b in queue.claim(user, 8)]
+            except Exception as exc:  # surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=target, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        batches = list(claimed.values())
+        ids = [pk for batch in batches for pk in batch]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(sorted(map(len, batches)), [0, 8, 8, 8, 8, 8])
+
+
+class OverdueTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.books = create_catalog(books=3)
+        self.loans = [
+            BorrowRequest.objects.create(
+                book=book,
+                user=self.student,
+                status=BorrowStatus.APPROVED,
+                due_at=self.now - datetime.timedelta(days=i),
+            )
+            for i, book in enumerate(self.books)
+        ]
+
+    def test_migration_backfills_due_dates_of_approved_loans(self):
+        backfill = import_module("lms.migrations.0011_backfill_due_at")
+        approved_at = self.now - datetime.timedelta(days=20)
+        BorrowRequest.objects.filter(pk=self.loans[0].pk).update(
+            approved_at=approved_at, due_at=None
+        )
+        BorrowRequest.objects.filter(pk=self.loans[1].pk).update(due_at=None)
+        backfill.backfill_due_at(django_apps, SimpleNamespace(connection=connection))
+        self.loans[0].refresh_from_db()
+        self.assertEqual(self.loans[0].due_at, approved_at + inventory.LOAN_PERIOD)
+        self.assertEqual(overdue.mark_overdue(self.now), 2)
+
+    def test_approval_sets_the_due_date(self):
+        client = self.client_for(self.librarian)
+        pending = [
+            BorrowRequest.objects.create(book=self.books[0], user=self.student)
+            for _ in range(2)
+        ]
+        response = client.put(reverse("borrow-approve", args=[pending[0].pk]))
+        self.assertIsNotNone(response.data["due_at"])
+        borrow = BorrowRequest.objects.get(pk=pending[0].pk)
+        self.assertEqual(borrow.due_at, borrow.approved_at + inventory.LOAN_PERIOD)
+        client.post(
+            reverse("borrow-bulk-action"),
+            {"actions": [{"id": pending[1].pk, "action": "approve"}]},
+            format="json",
+        )
+        borrow = BorrowRequest.objects.get(pk=pending[1].pk)
+        self.assertEqual(borrow.due_at, borrow.approved_at + inventory.LOAN_PERIOD)
+
+    def test_marks_due_loans_and_records_fines(self):
+        self.loans[2].status = BorrowStatus.RETURNED
+        self.loans[2].save()
+        future = BorrowRequest.objects.create(
+            book=self.books[0],
+            user=self.student,
+            status=BorrowStatus.APPROVED,
+            due_at=self.now + datetime.timedelta(days=1),
+        )
+        self.assertEqual(overdue.mark_overdue(now=self.now), 2)
+        self.assertEqual(
+            set(
+                BorrowRequest.objects.filter(overdue_at=self.now).values_list(
+                    "pk", flat=True
+                )
+            ),
+            {self.loans[0].pk, self.loans[1].pk},
+        )
+        self.assertEqual(
+            set(Fine.objects.values_list("borrow_request_id", "user_id", "amount")),
+            {
+                (self.loans[0].pk, self.student.pk, overdue.FINE_AMOUNT),
+                (self.loans[1].pk, self.student.pk, overdue.FINE_AMOUNT),
+            },
+        )
+        self.assertEqual(overdue.get_position(), self.now)
+
+        later = self.now + datetime.timedelta(days=2)
+        self.assertEqual(overdue.mark_overdue(now=later), 1)
+        future.refresh_from_db()
+        self.assertEqual(future.overdue_at, later)
+        self.assertEqual(Fine.objects.count(), 3)
+
+    def test_scans_only_loans_due_since_the_high_water_mark(self):
+        overdue.set_position(self.now - datetime.timedelta(hours=36))
+        self.assertEqual(overdue.mark_overdue(now=self.now), 2)
+        self.assertIsNone(BorrowRequest.objects.get(pk=self.loans[2].pk).overdue_at)
+
+    def test_chunks_split_loans_due_at_the_same_time(self):
+        BorrowRequest.objects.filter(status=BorrowStatus.APPROVED).update(
+            due_at=self.now
+        )
+        self.assertEqual(overdue.mark_overdue(now=self.now, chunk_size=1), 3)
+        self.assertEqual(Fine.objects.count(), 3)
+        self.assertEqual(overdue.mark_overdue(now=self.now), 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("mark_overdue", "--chunk-size", "2", stdout=out)
+        self.assertIn("Marked 3 overdue loans", out.getvalue())
+        self.assertTrue(JobCheckpoint.objects.filter(name=overdue.JOB_NAME).exists())
+
+
+class ConcurrentInventoryTests(TransactionTestCase):
+    databases = {"default", "throttle", "replica"}
+    copies = 5
+    librarians = 8
+    requests_per_librarian = 4
+
+    def setUp(self):
+        self.book = create_catalog(books=1)[0]
+        Book.objects.filter(pk=self.book.pk).update(
+            available_copies=self.copies, total_copies=self.copies
+        )
+        student = User.objects.create_user(username="student", password="pw")
+        BorrowRequest.objects.bulk_create(
+            BorrowRequest(book=self.book, user=student)
+            for _ in range(self.librarians * self.requests_per_librarian)
+        )
+
+    def run_concurrently(self, work):
+        barrier = threading.Barrier(self.librarians)
+        errors = []
+
+        def target(index):
+            try:
+                barrier.wait()
+                work(index)
+            except Exception as exc:  # surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=target, args=(i,)) for i in range(self.librarians)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def apply(self, borrow, action):
+        for _ in range(50):
+            try:
+                return inventory.apply_action(borrow, action)
+            except inventory.InventoryError:
+                return None
+            except OperationalError:
+                continue  # SQLite "database is locked"; retry the transaction.
+        raise AssertionError("Could not acquire the database write lock")
+
+    def test_invariant_holds_under_concurrent_approvals_and_returns(self):
+        pending = list(BorrowRequest.objects.order_by("pk"))
+
+        # Every librarian races on the same requests, in a different order.
+        def approve_then_return(index):
+            ordered = pending[index:] + pending[:index]
+            for borrow in ordered[: self.requests_per_librarian * 2]:
+                self.apply(BorrowRequest.objects.get(pk=borrow.pk), "approve")
+            for borrow in ordered[: self.requests_per_librarian]:
+                self.apply(BorrowRequest.objects.get(pk=borrow.pk), "return")
+
+        self.run_concurrently(approve_then_return)
+
+        self.book.refresh_from_db()
+        on_loan = BorrowRequest.objects.filter(status=BorrowStatus.APPROVED).count()
+        events = InventoryEvent.objects.filter(book=self.book)
+        self.assertGreaterEqual(self.book.available_copies, 0)
+        self.assertLessEqual(self.book.available_copies, self.book.total_copies)
+        self.assertEqual(self.book.available_copies + on_loan, self.book.total_copies)
+        self.assertEqual(
+            self.copies + sum(events.values_list("delta", flat=True)),
+            self.book.available_copies,
+        )
+
+    def test_bulk_actions_queue_for_the_write_lock(self):
+        # Flushed databases reuse user ids that may still be cached.
+        authentication.get_cache().clear()
+        librarians = [
+            User.objects.create_user(
+                username=f"librarian{i}", password="pw", role=UserRole.LIBRARIAN
+            )
+            for i in range(self.librarians)
+        ]
+        pending = list(
+            BorrowRequest.objects.order_by("pk").values_list("pk", flat=True)
+        )
+        statuses = []
+
+        # No retries: each batch must wait for the lock rather than fail.
+        def bulk_approve(index):
+            client = APIClient()
+            client.credentials(
+                HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(librarians[index])}"
+            )
+            ordered = pending[index:] + pending[:index]
+            response = client.post(
+                reverse("borrow-bulk-action"),
+                {
+                    "actions": [
+                        {"id": pk, "action": "approve"}
+                        for pk in ordered[: self.requests_per_librarian * 2]
+                    ]
+                },
+                format="json",
+            )
+            statuses.append(response.status_code)
+
+        self.run_concurrently(bulk_approve)
+
+        self.assertEqual(statuses, [200] * self.librarians)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 0)
+        self.assertEqual(
+            BorrowRequest.objects.filter(status=BorrowStatus.APPROVED).count(),
+            self.copies,
+        )
+
+
+class CatalogImportTests(APITestCase):
+    csv_data = (
+        "title,author,isbn,available_copies,total_copies,genres,author_bio\n"
+        "Gitanjali,Rabindranath Tagore,9780140449884,2,5,Poetry|Classic,Nobel\n"
+        "The Guide,R.K. Narayan,9780143039648,,3,Fiction,\n"
+        "Broken,R.K. Narayan,,1,1,,\n"
+        "Malgudi Days,R.K. Narayan,9780143039655,4,3,Fiction,\n"
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.librarian)
+
+    def upload(self, name, content):
+        return self.client.post(
+            reverse("book-import"),
+            {"file": SimpleUploadedFile(name, content.encode())},
+            format="multipart",
+        )
+
+    def test_csv_import_creates_books_authors_and_genres(self):
+        response = self.upload("catalog.csv", self.csv_data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["skipped"]), (2, 2))
+        self.assertEqual([error["line"] for error in response.data["errors"]], [4, 5])
+        gitanjali = Book.objects.get(isbn="9780140449884")
+        self.assertEqual(gitanjali.author.bio, "Nobel")
+        self.assertEqual(gitanjali.available_copies, 2)
+        self.assertEqual(
+            sorted(gitanjali.genres.values_list("name", flat=True)),
+            ["Classic", "Poetry"],
+        )
+        self.assertEqual(Book.objects.get(isbn="9780143039648").available_copies, 3)
+        self.assertEqual(Author.objects.count(), 2)
+        search = self.client.get(reverse("book-list"), {"search": "tagore"})
+        self.assertEqual(search.data["count"], 1)
+
+    def test_jsonl_import_upserts_on_isbn(self):
+        self.upload("catalog.csv", self.csv_data)
+        lines = [
+            {
+                "title": "Gitanjali (Revised)",
+                "author": "Rabindranath Tagore",
+                "isbn": "9780140449884",
+                "total_copies": 6,
+                "genres": ["Poetry"],
+            },
+            {
+                "title": "Pinjar",
+                "author": "Amrita Pritam",
+                "isbn": "1",
+                "total_copies": 0,
+            },
+        ]
+        response = self.upload(
+            "catalog.jsonl", "\n".join(json.dumps(line) for line in lines) + "\nnope\n"
+        )
+        self.assertEqual((response.data["created"], response.data["updated"]), (1, 1))
+        self.assertEqual(response.data["skipped"], 1)
+        gitanjali = Book.objects.get(isbn="9780140449884")
+        self.assertEqual(gitanjali.title, "Gitanjali (Revised)")
+        # 3 of the 5 copies are out, so only the new sixth copy adds one.
+        self.assertEqual(gitanjali.available_copies, 3)
+        self.assertEqual(
+            list(gitanjali.inventory_events.values_list("delta", "reason")),
+            [(1, InventoryReason.ADJUSTMENT)],
+        )
+        self.assertEqual(
+            list(gitanjali.genres.values_list("name", flat=True)), ["Poetry"]
+        )
+        self.assertEqual(Author.objects.count(), 3)
+
+    def test_reimport_keeps_active_loans(self):
+        self.upload("catalog.jsonl", self.jsonl("4", 3))
+        book = Book.objects.get(isbn="4")
+        borrows = [
+            BorrowRequest.objects.create(book=book, user=self.student) for _ in range(2)
+        ]
+        for borrow in borrows:
+            inventory.apply_action(borrow, "approve")
+
+        response = self.upload("catalog.jsonl", self.jsonl("4", 3))
+        self.assertEqual(response.data["updated"], 1)
+        book.refresh_from_db()
+        self.assertEqual((book.available_copies, book.total_copies), (1, 3))
+        self.assertFalse(
+            book.inventory_events.filter(reason=InventoryReason.ADJUSTMENT).exists()
+        )
+
+        self.upload("catalog.jsonl", self.jsonl("4", 4))
+        book.refresh_from_db()
+        self.assertEqual((book.available_copies, book.total_copies), (2, 4))
+        self.assertEqual(
+            book.inventory_events.get(reason=InventoryReason.ADJUSTMENT).delta, 1
+        )
+        inventory.apply_action(borrows[0], "return")
+        book.refresh_from_db()
+        self.assertEqual(book.available_copies, 3)
+
+        response = self.upload("catalog.jsonl", self.jsonl("4", 0))
+        self.assertEqual((response.data["updated"], response.data["skipped"]), (0, 1))
+        self.assertIn("on loan", response.data["errors"][0]["error"])
+        book.refresh_from_db()
+        self.assertEqual(book.total_copies, 4)
+
+    def jsonl(self, isbn, total_copies):
+        record = {"title": "T", "author": "A", "isbn": isbn}
+        return json.dumps({**record, "total_copies": total_copies}) + "\n"
+
+    def test_librarian_only(self):
+        self.client = self.client_for(self.student)
+        self.assertEqual(self.upload("catalog.csv", self.csv_data).status_code, 403)
+
+    def test_rejects_files_that_are_not_utf8(self):
+        content = self.csv_data.replace("Gitanjali", "Gitánjali").encode("latin-1")
+        response = self.client.post(
+            reverse("book-import"),
+            {"file": SimpleUploadedFile("catalog.csv", content)},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("line 2 is not valid UTF-8", response.data["file"][0])
+        self.assertFalse(Book.objects.exists())
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as handle:
+            handle.write(content)
+        self.addCleanup(os.unlink, handle.name)
+        with self.assertRaisesMessage(CommandError, "line 2 is not valid UTF-8"):
+            call_command("import_catalog", handle.name, stdout=StringIO())
+
+    def test_management_command_batches_and_reports_progress(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as handle:
+            handle.write(self.csv_data)
+        self.addCleanup(os.unlink, handle.name)
+        out = StringIO()
+        call_command("import_catalog", handle.name, batch_size=1, stdout=out)
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertIn("2 created", out.getvalue())
+        self.assertIn("rows processed", out.getvalue())
+
+
+class PopulateBooksTests(ReplicaMirrorTestCase):
+    def generate(self, **options):
+        options = {
+            "users": 20,
+            "authors": 5,
+            "genres": 4,
+            "books": 30,
+            "borrows": 400,
+            "reviews": 50,
+            "seed": 7,
+            "batch_size": 64,
+            **options,
+        }
+        call_command("populate_books", stdout=StringIO(), **options)
+
+    def test_generates_requested_counts(self):
+        self.generate()
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Author.objects.count(), 5)
+        self.assertEqual(Genre.objects.count(), 4)
+        self.assertEqual(Book.objects.count(), 30)
+        self.assertEqual(BorrowRequest.objects.count(), 400)
+        self.assertEqual(BookReview.objects.count(), 50)
+        self.assertTrue(User.objects.filter(role=UserRole.LIBRARIAN).exists())
+
+    def test_available_copies_match_approved_loans(self):
+        self.generate()
+        for book in Book.objects.all():
+            on_loan = book.boorow_requests.filter(status=BorrowStatus.APPROVED).count()
+            self.assertEqual(book.available_copies, book.total_copies - on_loan)
+
+    def test_loans_have_due_dates_and_can_be_overdue(self):
+        self.generate()
+        loans = BorrowRequest.objects.filter(approved_at__isnull=False)
+        self.assertFalse(loans.filter(due_at__isnull=True).exists())
+        for loan in loans[:20]:
+            self.assertEqual(loan.due_at, loan.approved_at + inventory.LOAN_PERIOD)
+        self.assertGreater(overdue.mark_overdue(timezone.now()), 0)
+
+    def test_seed_is_deterministic_and_skewed(self):
+        self.generate()
+        first = list(
+            BorrowRequest.objects.order_by("pk").values_list("book__isbn", "status")
+        )
+        BorrowRequest.objects.all().delete()
+        Book.objects.all().delete()
+        User.objects.all().delete()
+        Author.objects.all().delete()
+        Genre.objects.all().delete()
+        self.generate()
+        second = list(
+            BorrowRequest.objects.order_by("pk").values_list("book__isbn", "status")
+        )
+        self.assertEqual(
+            [status for _, status in first], [status for _, status in second]
+        )
+        busiest = (
+            BorrowRequest.objects.values("book")
+            .annotate(loans=Count("pk"))
+            .order_by("-loans")
+            .first()["loans"]
+        )
+        self.assertGreater(busiest, 400 / 30 * 2)
+
+    def test_generated_books_are_searchable(self):
+        self.generate(borrows=0, reviews=0)
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(User.objects.first())}"
+        )
+        response = client.get(reverse("book-list"), {"search": "author"})
+        self.assertEqual(response.data["count"], 30)
+
+    def test_demo_data_without_options(self):
+        call_command("populate_books", stdout=StringIO())
+        self.assertEqual(Book.objects.count(), 5)
+
+
+class BenchmarkTests(TransactionTestCase):
+    databases = {"default", "throttle", "replica"}
+
+    def setUp(self):
+        # Flushed databases reuse user ids that may still be cached or
+        # pinned to the primary.
+        authentication.get_cache().clear()
+
+    def test_every_route_has_an_endpoint(self):
+        names = {endpoint.name.split(":")[0] for endpoint in default_endpoints()}
+        routes = {
+            pattern.name
+            for pattern in urls.urlpatterns
+            if isinstance(pattern, URLPattern) and pattern.name
+        }
+        self.assertEqual(routes - names, set())
+
+    def test_runner_reports_latency_queries_and_status(self):
+        DatasetGenerator(users=10, authors=3, books=60, borrows=100, reviews=20).run()
+        endpoints = [
+            endpoint
+            for endpoint in default_endpoints()
+            if endpoint.name in ("book-list", "borrow-approve")
+        ]
+        runner = BenchmarkRunner(endpoints, requests=6, concurrency=2, warmup=1)
+        results = runner.run(BenchmarkContext())
+
+        books = results["book-list"]
+        self.assertEqual(books["requests"], 6)
+        self.assertEqual(books["status_codes"], {"200": 6})
+        self.assertLessEqual(
+            books["queries"],
+            get_query_budget(resolve(reverse("book-list")).func, "GET"),
+        )
+        self.assertEqual(set(books["latency_ms"]), {"p50", "p95", "p99"})
+        self.assertGreater(books["peak_memory_kb"], 0)
+        self.assertEqual(results["borrow-approve"]["requests"], 6)
+
+    def test_mixed_endpoint_interleaves_reads_and_writes(self):
+        DatasetGenerator(users=10, authors=3, books=20, borrows=20, reviews=20).run()
+        mixed = [e for e in default_endpoints() if e.name == "mixed:read-write"]
+        runner = BenchmarkRunner(mixed, requests=12, concurrency=3, warmup=0)
+        result = runner.run(BenchmarkContext())["mixed:read-write"]
+
+        self.assertEqual(result["method"], "MIXED")
+        self.assertEqual(result["status_codes"], {"200": 8, "201": 4})
+        self.assertEqual(
+            set(result["lock_waits"]["default"]),
+            {"statements", "waits", "wait_ms", "max_wait_ms", "timeouts"},
+        )
+        self.assertEqual(result["lock_waits"]["default"]["timeouts"], 0)
+
+    @override_settings(ROOT_URLCONF="server.async_urls")
+    def test_async_runner_goes_through_the_asgi_stack(self):
+        DatasetGenerator(users=10, authors=3, books=20, borrows=50, reviews=20).run()
+        endpoints = [
+            endpoint
+            for endpoint in default_endpoints()
+            if endpoint.name in ("book-detail", "borrow-export")
+        ]
+        runner = AsyncBenchmarkRunner(endpoints, requests=6, concurrency=3, warmup=1)
+        results = runner.run(BenchmarkContext())
+
+        detail = results["book-detail"]
+        self.assertEqual(detail["status_codes"], {"200": 6})
+        self.assertGreater(detail["queries"], 0)
+        self.assertLessEqual(
+            detail["queries"],
+            get_query_budget(resolve(reverse("book-detail", args=[1])).func, "GET"),
+        )
+        self.assertEqual(results["borrow-export"]["status_codes"], {"200": 6})
+
+    def test_compare_flags_regressions_beyond_tolerance(self):
+        baseline = {
+            "book-list": {
+                "latency_ms": {"p95": 10.0},
+                "throughput_rps": 100.0,
+                "queries": 4,
+            }
+        }
+        current = {
+            "book-list": {
+                "latency_ms": {"p95": 11.0},
+                "throughput_rps": 70.0,
+                "queries": 6,
+            }
+        }
+        regressions = compare(current, baseline, tolerance=0.2)
+        self.assertEqual(
+            [regression["metric"] for regression in regressions],
+            ["throughput_rps", "queries"],
+        )
+        self.assertEqual(compare(current, baseline, tolerance=0.6), [])
+
+    def test_compare_renderers_reports_time_and_size(self):
+        DatasetGenerator(users=10, authors=3, books=30, borrows=30, reviews=0).run()
+        results = compare_renderers(renderer_payloads(BenchmarkContext()), rounds=3)
+
+        self.assertEqual(set(results), {"book-list", "borrow-list"})
+        books = results["book-list"]
+        self.assertEqual(
+            books["JSONRenderer"]["bytes"], books["ORJSONRenderer"]["bytes"]
+        )
+        if renderers.msgpack is not None:
+            self.assertLess(
+                books["MessagePackRenderer"]["bytes"], books["JSONRenderer"]["bytes"]
+            )
+        for result in books.values():
+            self.assertGreaterEqual(result["encode_ms"], 0)
+
+
+class FieldSelectionTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.books = create_catalog(books=3)
+        for book in self.books:
+            BorrowRequest.objects.create(book=book, user=self.student)
+            BookReview.objects.create(
+                book=self.books[0], user=self.student, rating=4, comment="Good"
+            )
+
+    def get(self, name, params, args=()):
+        # Warm the authenticated user's cache entry first.
+        self.client.get(reverse("genre-list"))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name, args=args), params)
+        self.assertEqual(response.status_code, 200)
+        return response, [query["sql"] for query in queries]
+
+    def test_fields_select_columns_without_joins(self):
+        response, queries = self.get(
+            "book-list", {"fields": "id,title,available_copies"}
+        )
+        self.assertEqual(
+            set(response.data["results"][0]), {"id", "title", "available_copies"}
+        )
+        sql = "\n".join(queries)
+        self.assertNotIn("lms_author", sql)
+        self.assertNotIn("lms_genre", sql)
+        self.assertNotIn('"isbn"', sql)
+
+    def test_expand_controls_nesting(self):
+        response, queries = self.get("borrow-list", {"expand": ""})
+        row = response.data["results"][0]
+        self.assertEqual(row["book"], self.books[-1].pk)
+        self.assertEqual(row["user"], self.student.pk)
+        self.assertFalse(any("lms_book" in sql for sql in queries[-2:]))
+
+        response, queries = self.get(
+            "borrow-list",
+            {"fields": "id,status,book.title,book.genres", "expand": "book"},
+        )
+        row = response.data["results"][0]
+        self.assertEqual(set(row), {"id", "status", "book"})
+        self.assertEqual(
+            row["book"],
+            {
+                "title": self.books[-1].title,
+                "genres": [g.pk for g in self.books[-1].genres.all()],
+            },
+        )
+        sql = "\n".join(queries)
+        self.assertNotIn("lms_user", sql.split("lms_borrowrequest", 1)[1])
+        self.assertNotIn('"bio"', sql)
+
+    def test_defaults_keep_the_full_representation(self):
+        response, _ = self.get("borrow-list", {})
+        row = response.data["results"][0]
+        self.assertEqual(row["book"]["author"]["name"], "Author 2")
+        self.assertEqual(row["user"]["username"], "student")
+        response, _ = self.get(
+            "review-list", {"fields": "rating,user.username"}, [self.books[0].pk]
+        )
+        self.assertEqual(
+            response.data["results"][0], {"rating": 4, "user": {"username": "student"}}
+        )
+
+    def test_detail_and_keyset_pages(self):
+        response, _ = self.get(
+            "book-detail",
+            {"fields": "title,author", "expand": "author"},
+            [self.books[0].pk],
+        )
+        self.assertEqual(response.data["author"]["name"], "Author 0")
+        self.assertEqual(set(response.data), {"title", "author"})
+        response, queries = self.get(
+            "book-list",
+            {"fields": "id", "cursor": "", "ordering": "title", "page_size": 2},
+        )
+        self.assertEqual(
+            response.data["results"], [{"id": b.pk} for b in self.books[:2]]
+        )
+        self.assertIsNotNone(response.data["next"])
+        self.assertConstantQueries(
+            reverse("book-list"), QUERY_STRING="fields=id&cursor=&ordering=title"
+        )
+
+    def test_writes_ignore_the_selection(self):
+        self.client = self.client_for(self.librarian)
+        response = self.client.put(
+            reverse("borrow-approve", args=[BorrowRequest.objects.first().pk])
+            + "?fields=status"
+        )
+        self.assertEqual(response.data, {"status": BorrowStatus.APPROVED})
+
+
+class RendererTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.books = create_catalog(books=3)
+
+    def test_json_matches_the_stdlib_renderer(self):
+        response = self.client.get(reverse("book-list"))
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(
+            response.content, JSONRenderer().render(response.data, "application/json")
+        )
+
+    def test_json_escapes_javascript_line_separators(self):
+        body = renderers.ORJSONRenderer().render({"title": "a\u2028b\u2029"})
+        self.assertEqual(body, b'{"title":"a\\u2028b\\u2029"}')
+
+    def test_indented_json_falls_back_to_the_stdlib(self):
+        response = self.client.get(
+            reverse("book-list"), HTTP_ACCEPT="application/json; indent=2"
+        )
+        self.assertIn(b'\n  "count"', response.content)
+
+    def test_invalid_json_is_a_bad_request(self):
+        response = self.client.post(
+            reverse("book-availability"), b"{", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @skipUnless(renderers.msgpack, "msgpack is not installed")
+    def test_msgpack_round_trip(self):
+        response = self.client.post(
+            reverse("book-availability"),
+            renderers.msgpack.packb({"ids": [self.books[0].pk]}),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        data = renderers.msgpack.unpackb(response.content)
+        self.assertEqual(data["results"][0]["id"], self.books[0].pk)
+
+        response = self.client.get(
+            reverse("book-detail", args=[self.books[0].pk]),
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(
+            renderers.msgpack.unpackb(response.content),
+            json.loads(JSONRenderer().render(response.data)),
+        )
+
+    @skipUnless(renderers.msgpack, "msgpack is not installed")
+    def test_invalid_msgpack_is_a_bad_request(self):
+        response = self.client.post(
+            reverse("book-availability"), b"\xc1", content_type="application/msgpack"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_unavailable_msgpack_is_not_negotiated(self):
+        with mock.patch.object(renderers.MessagePackRenderer, "available", False):
+            response = self.client.get(
+                reverse("book-list"), HTTP_ACCEPT="application/msgpack"
+            )
+        self.assertEqual(response.status_code, 406)
+        with mock.patch.object(renderers.MessagePackParser, "available", False):
+            response = self.client.post(
+                reverse("book-availability"),
+                b"\x80",
+                content_type="application/msgpack",
+            )
+        self.assertEqual(response.status_code, 415)
+
+
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.books = create_catalog(books=3)
+        self.book = self.books[0]
+        self.detail = reverse("book-detail", args=[self.book.pk])
+
+    def get(self, path, data=None):
+        response = self.client.get(path, data)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertHit(self, path, data=None):
+        self.assertEqual(self.get(path, data)["X-Cache"], "HIT")
+
+    def assertMiss(self, path, data=None):
+        self.assertEqual(self.get(path, data)["X-Cache"], "MISS")
+
+    def test_repeated_reads_are_served_from_cache(self):
+        for name in ("book-list", "author-list", "genre-list"):
+            self.assertMiss(reverse(name))
+            # The validators come from scope versions; the user is cached.
+            with self.assertNumQueries(0):
+                self.assertHit(reverse(name))
+        self.assertMiss(self.detail)
+        self.assertHit(self.detail)
+
+    def test_query_parameters_are_part_of_the_key(self):
+        path = reverse("book-list")
+        self.assertMiss(path, {"ordering": "title", "page": 1})
+        self.assertHit(path, {"page": 1, "ordering": "title"})
+        self.assertMiss(path, {"ordering": "-title", "page": 1})
+        self.assertMiss(path, {"search": "book"})
+
+    def test_borrow_actions_invalidate_the_book_only(self):
+        other = reverse("book-detail", args=[self.books[1].pk])
+        self.get(self.detail)
+        self.get(other)
+        borrow = BorrowRequest.objects.create(book=self.book, user=self.student)
+        self.client_for(self.librarian).put(reverse("borrow-approve", args=[borrow.pk]))
+        response = self.get(self.detail)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            response.data["available_copies"], self.book.available_copies - 1
+        )
+        self.assertHit(other)
+
+        self.get(reverse("book-list"))
+        self.client_for(self.librarian).post(
+            reverse("borrow-bulk-action"),
+            {"actions": [{"id": borrow.pk, "action": "return"}]},
+            format="json",
+        )
+        self.assertMiss(reverse("book-list"))
+        self.assertEqual(
+            self.get(self.detail).data["available_copies"],
+            self.book.available_copies,
+        )
+
+    def test_related_changes_invalidate_books(self):
+        self.get(self.detail)
+        self.get(reverse("author-list"))
+        author = self.book.author
+        author.name = "Renamed"
+        author.save()
+        self.assertEqual(self.get(self.detail).data["author"]["name"], "Renamed")
+        self.assertMiss(reverse("author-list"))
+
+        genre = self.book.genres.first()
+        self.book.genres.remove(genre)
+        self.assertNotIn(
+            genre.pk, [g["id"] for g in self.get(self.detail).data["genres"]]
+        )
+        genre.books.add(self.book)
+        self.assertIn(genre.pk, [g["id"] for g in self.get(self.detail).data["genres"]])
+        genre.delete()
+        self.assertNotIn(
+            genre.pk, [g["id"] for g in self.get(self.detail).data["genres"]]
+        )
+
+    def test_import_invalidates_updated_books(self):
+        self.get(self.detail)
+        self.client_for(self.librarian).post(
+            reverse("book-import"),
+            {
+                "file": SimpleUploadedFile(
+                    "catalog.jsonl",
+                    json.dumps(
+                        {
+                            "title": "Imported",
+                            "author": "New Author",
+                            "isbn": self.book.isbn,
+                            "total_copies": 1,
+                        }
+                    ).encode(),
+                )
+            },
+            format="multipart",
+        )
+        self.assertEqual(self.get(self.detail).data["title"], "Imported")
+        self.assertIn(
+            "New Author",
+            [
+                author["name"]
+                for author in self.get(reverse("author-list")).data["results"]
+            ],
+        )
+
+
+class CacheVersionTests(TransactionTestCase):
+    databases = {"default", "throttle", "replica"}
+
+    def setUp(self):
+        caching.get_cache().clear()
+        authentication.get_cache().clear()
+        self.user = User.objects.create_user(username="student", password="pw")
+        create_catalog(books=2)
+
+    def test_other_processes_invalidate_cached_responses(self):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        path = reverse("book-list")
+        self.assertEqual(client.get(path)["X-Cache"], "MISS")
+        self.assertEqual(client.get(path)["X-Cache"], "HIT")
+        run_in_another_process("from lms import caching; caching.bump(caching.BOOKS)")
+        self.assertEqual(client.get(path)["X-Cache"], "MISS")
+        self.assertEqual(client.get(path)["X-Cache"], "HIT")
+
+    def test_concurrent_bumps_are_not_lost(self):
+        (start,) = caching.get_versions([caching.BOOKS])
+        barrier = threading.Barrier(8)
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(5):
+                    caching.bump(caching.BOOKS)
+            finally:
+                connections["throttle"].close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(caching.get_versions([caching.BOOKS]), [start + 40])
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.book = create_catalog(books=2)[0]
+        self.review = BookReview.objects.create(
+            user=self.student, book=self.book, rating=4, comment="Good"
+        )
+
+    def paths(self):
+        return [
+            reverse("book-list"),
+            reverse("book-detail", args=[self.book.pk]),
+            reverse("author-list"),
+            reverse("genre-list"),
+            reverse("review-list", args=[self.book.pk]),
+            reverse("review-detail", args=[self.review.pk]),
+        ]
+
+    def test_matching_etag_returns_not_modified(self):
+        for path in self.paths():
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            etag = response["ETag"]
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, path)
+            self.assertEqual(response["ETag"], etag)
+            self.assertEqual(response.content, b"")
+
+    def test_not_modified_skips_serialization_queries(self):
+        path = reverse("review-list", args=[self.book.pk])
+        etag = self.client.get(path)["ETag"]
+        with self.assertNumQueries(0):
+            self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        path = reverse("review-detail", args=[self.review.pk])
+        etag = self.client.get(path)["ETag"]
+        with self.assertNumQueries(1):
+            self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+    def test_writes_change_the_etag(self):
+        path = reverse("book-detail", args=[self.book.pk])
+        etags = [self.client.get(path)["ETag"]]
+        borrow = BorrowRequest.objects.create(book=self.book, user=self.student)
+        inventory.apply_action(borrow, "approve")
+        etags.append(self.client.get(path)["ETag"])
+        self.book.author.name = "Renamed"
+        self.book.author.save()
+        etags.append(self.client.get(path)["ETag"])
+        self.book.genres.clear()
+        etags.append(self.client.get(path)["ETag"])
+        self.assertEqual(len(set(etags)), 4)
+
+        list_path = reverse("review-list", args=[self.book.pk])
+        etag = self.client.get(list_path)["ETag"]
+        self.review.comment = "Better"
+        self.review.save()
+        response = self.client.get(list_path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.review.delete()
+        response = self.client.get(list_path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 0)
+
+    def test_query_parameters_change_the_etag(self):
+        path = reverse("book-list")
+        self.assertNotEqual(
+            self.client.get(path, {"ordering": "title"})["ETag"],
+            self.client.get(path, {"ordering": "-title"})["ETag"],
+        )
+
+    def test_if_modified_since_on_detail(self):
+        path = reverse("review-detail", args=[self.review.pk])
+        response = self.client.get(path)
+        last_modified = response["Last-Modified"]
+        response = self.client.get(path, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            path, HTTP_IF_MODIFIED_SINCE="Mon, 01 Jan 2001 00:00:00 GMT"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", self.client.get(reverse("book-list")))
+
+    def test_missing_object_is_not_found(self):
+        response = self.client.get(
+            reverse("book-detail", args=[0]), HTTP_IF_NONE_MATCH="*"
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class RatingAggregateTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.book, self.other = create_catalog(books=2)
+        self.reviews_path = reverse("review-list", args=[self.book.pk])
+
+    def review(self, rating, client=None):
+        response = (client or self.client).post(
+            self.reviews_path,
+            {"book": self.book.pk, "rating": rating, "comment": "..."},
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def aggregates(self, book):
+        book.refresh_from_db()
+        return (
+            book.review_count,
+            round(book.average_rating, 3),
+            [book.rating_1_count, book.rating_2_count, book.rating_3_count]
+            + [book.rating_4_count, book.rating_5_count],
+        )
+
+    def test_create_update_and_delete_adjust_aggregates(self):
+        first = self.review(5)
+        self.review(2, self.client_for(self.librarian))
+        self.assertEqual(self.aggregates(self.book), (2, 3.5, [0, 1, 0, 0, 1]))
+
+        path = reverse("review-detail", args=[first])
+        self.client.patch(path, {"rating": 3})
+        self.assertEqual(self.aggregates(self.book), (2, 2.5, [0, 1, 1, 0, 0]))
+
+        self.client.patch(path, {"book": self.other.pk})
+        self.assertEqual(self.aggregates(self.book), (1, 2.0, [0, 1, 0, 0, 0]))
+        self.assertEqual(self.aggregates(self.other), (1, 3.0, [0, 0, 1, 0, 0]))
+
+        self.client.delete(path)
+        self.assertEqual(self.aggregates(self.other), (0, 0.0, [0, 0, 0, 0, 0]))
+
+    def test_exposed_filterable_and_sortable(self):
+        self.review(4)
+        response = self.client.get(
+            reverse("book-list"),
+            {"ordering": "-average_rating", "average_rating__gte": 1},
+        )
+        self.assertEqual(
+            [book["id"] for book in response.data["results"]], [self.book.pk]
+        )
+        self.assertEqual(response.data["results"][0]["review_count"], 1)
+        self.assertEqual(response.data["results"][0]["rating_4_count"], 1)
+
+        response = self.client.get(reverse("book-list"), {"ordering": "review_count"})
+        self.assertEqual(response.data["results"][0]["id"], self.other.pk)
+
+    def test_aggregates_are_read_only(self):
+        response = self.client_for(self.librarian).patch(
+            reverse("book-detail", args=[self.book.pk]), {"review_count": 10}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.aggregates(self.book)[0], 0)
+
+    def test_repair_command_fixes_drift(self):
+        self.review(5)
+        self.review(1, self.client_for(self.librarian))
+        expected = self.aggregates(self.book)
+        Book.objects.update(review_count=7, average_rating=1, rating_5_count=0)
+        BookReview.objects.create(
+            user=self.student, book=self.other, rating=4, comment="..."
+        )
+        out = StringIO()
+        call_command("repair_ratings", batch_size=1, stdout=out)
+        self.assertIn("Repaired 2 books", out.getvalue())
+        self.assertEqual(self.aggregates(self.book), expected)
+        self.assertEqual(self.aggregates(self.other), (1, 4.0, [0, 0, 0, 1, 0]))
+        out = StringIO()
+        call_command("repair_ratings", stdout=out)
+        self.assertIn("Repaired 0 books", out.getvalue())
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.librarian)
+        self.books = create_catalog(books=3)
+        self.borrows = [
+            BorrowRequest.objects.create(book=book, user=self.student)
+            for book in self.books
+        ]
+        BorrowRequest.objects.filter(pk=self.borrows[0].pk).update(
+            status=BorrowStatus.RETURNED, requested_at="2024-01-10T10:00:00Z"
+        )
+
+    def download(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_catalog_csv_export_can_be_reimported(self):
+        content = self.download("book-export", export_format="csv")
+        lines = content.splitlines()
+        self.assertEqual(lines[0], ",".join(exporter.BOOK_COLUMNS))
+        self.assertEqual(len(lines), 4)
+        Book.objects.update(title="Changed")
+        stats = importer.CatalogImporter().run(
+            importer.read_rows(StringIO(content), "csv")
+        )
+        self.assertEqual((stats.updated, stats.skipped), (3, 0))
+        self.assertEqual(
+            sorted(Book.objects.values_list("title", flat=True)),
+            sorted(book.title for book in self.books),
+        )
+
+    def test_borrow_jsonl_export_filters(self):
+        records = [
+            json.loads(line) for line in self.download("borrow-export").splitlines()
+        ]
+        self.assertEqual([r["id"] for r in records], [b.pk for b in self.borrows])
+        self.assertEqual(records[0]["username"], "student")
+        self.assertEqual(records[0]["isbn"], self.books[0].isbn)
+
+        for params, expected in [
+            ({"status": BorrowStatus.RETURNED}, [self.borrows[0].pk]),
+            ({"since": "2024-01-10", "until": "2024-01-10"}, [self.borrows[0].pk]),
+            ({"until": "2024-01-09"}, []),
+            ({"user": self.librarian.pk}, []),
+        ]:
+            content = self.download("borrow-export", **params)
+            self.assertEqual(
+                [json.loads(line)["id"] for line in content.splitlines()], expected
+            )
+
+    def test_invalid_filters_and_permissions(self):
+        response = self.client.get(
+            reverse("borrow-export"), {"since": "2024-02-01", "until": "2024-01-01"}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse("book-export"), {"export_format": "xml"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client_for(self.student).get(reverse("book-export"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_rows_are_fetched_in_chunks(self):
+        with self.assertNumQueries(3):
+            rows = list(exporter.borrow_rows(chunk_size=2))
+        self.assertEqual(len(rows), 3)
+        # One query per chunk plus one for the genres of each chunk.
+        with self.assertNumQueries(5):
+            self.assertEqual(len(list(exporter.book_rows(chunk_size=2))), 3)
+
+    def test_management_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "borrows.csv")
+            call_command(
+                "export_data",
+                "borrows",
+                format="csv",
+                status=BorrowStatus.PENDING,
+                output=path,
+                chunk_size=1,
+            )
+            with open(path, newline="") as handle:
+                lines = handle.read().splitlines()
+        self.assertEqual(lines[0], ",".join(exporter.BORROW_COLUMNS))
+        self.assertEqual(len(lines), 3)
+
+
+@override_settings(ROOT_URLCONF="server.async_urls")
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.book = create_catalog(books=12)[0]
+        self.review = BookReview.objects.create(
+            user=self.student, book=self.book, rating=4, comment="Good"
+        )
+        BorrowRequest.objects.create(book=self.book, user=self.student)
+        self.genre_id = self.book.genres.first().pk
+        self.async_client = AsyncClient()
+        self.student_headers = self.headers_for(self.student)
+        self.librarian_headers = self.headers_for(self.librarian)
+
+    def headers_for(self, user):
+        return {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+    def aget(self, path, params=None, **headers):
+        return self.async_client.get(
+            path, params, headers={**self.student_headers, **headers}
+        )
+
+    async def test_reads_match_the_sync_views(self):
+        requests = [
+            (reverse("book-list"), {"page": 2, "page_size": 5}),
+            (reverse("book-list"), {"cursor": "", "ordering": "-title"}),
+            (reverse("book-list"), {"author": self.book.author_id, "search": "book"}),
+            (reverse("book-detail", args=[self.book.pk]), {}),
+            (reverse("author-list"), {}),
+            (reverse("genre-list"), {}),
+            (reverse("borrow-list"), {}),
+            (reverse("review-list", args=[self.book.pk]), {}),
+            (reverse("review-detail", args=[self.review.pk]), {}),
+        ]
+        for path, params in requests:
+            response = await self.aget(path, params)
+            self.assertEqual(response.status_code, 200, path)
+            await caching.get_cache().aclear()
+            expected = await sync_to_async(self.client.get)(path, params)
+            self.assertEqual(response.json(), expected.json(), path)
+            self.assertEqual(response.get("ETag"), expected.get("ETag"), path)
+
+    async def test_cache_and_conditional_get(self):
+        path = reverse("book-detail", args=[self.book.pk])
+        first = await self.aget(path)
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertGreater(int(first["X-Query-Count"]), 0)
+        self.assertEqual((await self.aget(path))["X-Cache"], "HIT")
+        response = await self.aget(path, **{"If-None-Match": first["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], first["ETag"])
+
+    async def test_authentication_and_errors(self):
+        path = reverse("book-list")
+        self.assertEqual((await self.async_client.get(path)).status_code, 401)
+        response = await self.aget(path, Authorization="Bearer invalid")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual((await self.aget(path, {"page": 99})).status_code, 404)
+        response = await self.aget(reverse("book-detail", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_writes_are_delegated_to_the_sync_views(self):
+        data = {
+            "title": "Async",
+            "author": self.book.author_id,
+            "genres": [self.genre_id],
+            "isbn": "9999999999999",
+            "available_copies": 1,
+            "total_copies": 1,
+        }
+        path = reverse("book-list")
+        response = await self.async_client.post(
+            path, data, headers=self.student_headers
+        )
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.post(
+            path, data, headers=self.librarian_headers
+        )
+        self.assertEqual(response.status_code, 201)
+        response = await self.aget(path, {"search": "async"})
+        self.assertEqual(response.json()["count"], 1)
+
+
+class CachedUserAuthenticationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = reverse("borrow-export")
+
+    def test_user_is_looked_up_once(self):
+        self.client.get(reverse("genre-list"))
+        # Validated and served from the cache, the list needs no query once
+        # the user is cached.
+        with self.assertNumQueries(0):
+            self.client.get(reverse("genre-list"))
+
+    def test_role_and_active_changes_take_effect(self):
+        client = self.client_for(self.librarian)
+        self.assertEqual(client.get(self.path).status_code, 200)
+        self.librarian.role = UserRole.STUDENT
+        self.librarian.save()
+        self.assertEqual(client.get(self.path).status_code, 403)
+        self.librarian.is_active = False
+        self.librarian.save()
+        self.assertEqual(client.get(self.path).status_code, 401)
+        self.student.delete()
+        self.assertEqual(self.client.get(reverse("genre-list")).status_code, 401)
+
+    def test_cached_user_loads_other_fields_on_access(self):
+        self.client.get(reverse("genre-list"))
+        user = authentication.JWTAuthentication().get_user(
+            AccessToken.for_user(self.student)
+        )
+        self.assertEqual(user, self.student)
+        self.assertEqual(user.role, UserRole.STUDENT)
+        self.assertEqual(user.email, self.student.email)
+        user.first_name = "Changed"
+        user.save()
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.check_password("password123"))
+
+
+class ThrottleTests(APITestCase):
+    def test_sliding_window_weighs_the_previous_window(self):
+        hits = [throttling.hit("k", 10, 100, 1000 + i) for i in range(10)]
+        self.assertEqual(hits, [None] * 10)
+        # Full until this window ends and 10% of the next one has passed.
+        self.assertAlmostEqual(throttling.hit("k", 10, 100, 1050), 60)
+        # Half of the previous window still counts: 5 of 10 are free.
+        hits = [throttling.hit("k", 10, 100, 1150) for _ in range(6)]
+        self.assertEqual(hits[:5], [None] * 5)
+        self.assertIsNotNone(hits[5])
+        self.assertIsNone(throttling.hit("k", 10, 100, 1400))
+        window = ThrottleWindow.objects.get(key="k")
+        self.assertEqual((window.current_count, window.previous_count), (1, 0))
+
+    def test_prune_deletes_expired_counters(self):
+        throttling.hit("old", 10, 100, 1000)
+        throttling.hit("new", 10, 100, 5000)
+        self.assertEqual(throttling.prune(1300), 1)
+        self.assertEqual(
+            list(ThrottleWindow.objects.values_list("key", flat=True)), ["new"]
+        )
+
+    def test_borrow_scope_limits_borrow_requests(self):
+        book = create_catalog(books=1)[0]
+        data = {"book_id": book.pk, "user_id": self.student.pk}
+        for _ in range(5):
+            response = self.client.post(reverse("borrow-request"), data)
+            self.assertEqual(response.status_code, 201)
+        response = self.client.post(reverse("borrow-request"), data)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+        # Other endpoints use the separate, larger user scope.
+        self.assertEqual(self.client.get(reverse("borrow-list")).status_code, 200)
+
+
+class ConcurrentThrottleTests(TransactionTestCase):
+    databases = {"default", "throttle", "replica"}
+
+    def test_concurrent_workers_share_the_limit(self):
+        barrier = threading.Barrier(8)
+        results = []
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(5):
+                    results.append(throttling.hit("shared", 20, 3600, 1000))
+            finally:
+                connections["throttle"].close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 40)
+        self.assertEqual(results.count(None), 20)
+
+
+class QueryPlanTests(QueryPlanTestMixin, APITestCase):
+    """
+    Endpoint querysets must be answered from indexes, not table scans.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.books = create_catalog(books=3)
+        self.borrows = [
+            BorrowRequest.objects.create(book=book, user=self.student)
+            for book in self.books
+        ]
+
+    def test_borrow_list_filters_on_the_user_index(self):
+        path = reverse("borrow-list")
+        self.assertNoFullScan(self.endpoint_queryset(path, self.student), ordered=True)
+        self.assertNoFullScan(
+            self.endpoint_queryset(
+                path, self.student, {"status": BorrowStatus.PENDING}
+            ),
+            ordered=True,
+        )
+
+    def test_borrow_list_is_newest_first_and_filters_by_status(self):
+        BorrowRequest.objects.filter(pk=self.borrows[1].pk).update(
+            status=BorrowStatus.REJECTED
+        )
+        response = self.client.get(reverse("borrow-list"))
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]],
+            [borrow.pk for borrow in reversed(self.borrows)],
+        )
+        response = self.client.get(
+            reverse("borrow-list"), {"status": BorrowStatus.REJECTED}
+        )
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]], [self.borrows[1].pk]
+        )
+
+    def test_availability_lookup_uses_the_key_indexes(self):
+        queryset = Book.objects.filter(
+            Q(pk__in=[self.books[0].pk]) | Q(isbn__in=[self.books[1].isbn])
+        )
+        self.assertNoFullScan(queryset)
+
+    def test_waitlist_positions_are_counted_on_the_queue_index(self):
+        WaitlistEntry.objects.create(book=self.books[0], user=self.librarian)
+        queryset = self.endpoint_queryset(reverse("waitlist"), self.librarian)
+        self.assertNoFullScan(queryset)
+        # Only the index entries ahead in the same queue are counted.
+        self.assertIn(
+            "USING COVERING INDEX waitlist_book_id_idx (book_id=? AND id<?)",
+            queryset.explain(),
+        )
+        self.assertEqual(queryset.get().position, 1)
+
+    def test_overdue_scan_seeks_on_the_due_index(self):
+        queryset = overdue.due_loans(timezone.now(), timezone.now())
+        self.assertNoFullScan(queryset.filter(pk__gt=0), ordered=True)
+
+    def test_borrow_queue_filters_on_the_status_index(self):
+        path = reverse("borrow-queue")
+        for params in (None, {"min_age": "P1D"}, {"status": BorrowStatus.APPROVED}):
+            queryset = self.endpoint_queryset(path, self.librarian, params)
+            # Ordered the way the keyset paginator orders the page.
+            self.assertNoFullScan(queryset.order_by("requested_at", "pk"), ordered=True)
+
+    def test_borrow_export_filters_on_the_status_index(self):
+        queryset = exporter.filter_borrows(
+            BorrowRequest.objects.order_by("requested_at"),
+            since=datetime.date(2026, 1, 1),
+            status=BorrowStatus.PENDING,
+        )
+        self.assertNoFullScan(queryset, ordered=True)
+
+    def test_review_list_is_ordered_by_the_book_index(self):
+        path = reverse("review-list", args=[self.books[0].pk])
+        self.assertNoFullScan(self.endpoint_queryset(path, self.student), ordered=True)
+
+    def test_book_list_orders_by_available_copies_from_an_index(self):
+        for ordering in ("available_copies", "-available_copies"):
+            queryset = self.endpoint_queryset(
+                reverse("book-list"), self.student, {"ordering": ordering}
+            )
+            self.assertNoFullScan(queryset, ordered=True)
+            queryset = self.endpoint_page_queryset(
+                reverse("book-list"),
+                self.student,
+                {"cursor": "", "ordering": ordering},
+            )
+            self.assertNoFullScan(queryset, ordered=True)
+
+    def test_book_keyset_pages_are_ordered_by_indexes(self):
+        path = reverse("book-list")
+        for field in resolve(path).func.view_class.ordering_fields:
+            for ordering in (field, f"-{field}"):
+                with self.subTest(ordering=ordering):
+                    params = {"cursor": "", "ordering": ordering, "page_size": 1}
+                    self.assertNoFullScan(
+                        self.endpoint_page_queryset(path, self.student, params),
+                        ordered=True,
+                    )
+                    # The next page seeks past the first from the same index.
+                    response = self.client.get(path, params)
+                    query = urlsplit(response.data["next"]).query
+                    params = {key: value for key, value in parse_qsl(query)}
+                    self.assertNoFullScan(
+                        self.endpoint_page_queryset(path, self.student, params),
+                        ordered=True,
+                    )
+
+    def test_book_list_filters_use_foreign_key_indexes(self):
+        for params in ({"author": self.books[0].author_id}, {"genres": 1}):
+            queryset = self.endpoint_queryset(
+                reverse("book-list"), self.student, params
+            )
+            self.assertNoFullScan(queryset)
+
+    def test_detail_lookups_use_primary_keys(self):
+        for name, pk in (
+            ("book-detail", self.books[0].pk),
+            ("borrow-approve", self.borrows[0].pk),
+            ("review-detail", 1),
+        ):
+            queryset = self.endpoint_queryset(reverse(name, args=[pk]), self.librarian)
+            self.assertNoFullScan(queryset.filter(pk=pk))
+
+
+class SQLiteProfileTests(TransactionTestCase):
+    databases = {"default", "throttle"}
+
+    def tearDown(self):
+        connection.close()
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_connections_use_the_production_pragmas(self):
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+        # NORMAL
+        self.assertEqual(self.pragma("synchronous"), 1)
+        self.assertEqual(self.pragma("busy_timeout"), sqlite.PRAGMAS["busy_timeout"])
+        self.assertEqual(self.pragma("cache_size"), sqlite.PRAGMAS["cache_size"])
+        self.assertEqual(self.pragma("foreign_keys"), 1)
+
+    def test_lock_stats_count_statements_and_lock_timeouts(self):
+        stats = sqlite.get_lock_stats("default")
+        stats.reset()
+        Genre.objects.create(name="Before")
+        self.assertGreaterEqual(sqlite.lock_stats()["default"]["statements"], 1)
+
+        writer = sqlite3.connect(connection.settings_dict["NAME"])
+        writer.execute("BEGIN IMMEDIATE")
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA busy_timeout = 10")
+            with self.assertRaises(OperationalError):
+                Genre.objects.create(name="Blocked")
+        finally:
+            writer.rollback()
+            writer.close()
+        self.assertEqual(sqlite.lock_stats()["default"]["timeouts"], 1)
+
+    def test_read_then_write_transactions_wait_for_the_write_lock(self):
+        Genre.objects.create(name="Before")
+        writer = sqlite3.connect(
+            connection.settings_dict["NAME"], check_same_thread=False
+        )
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("UPDATE lms_genre SET name = 'Other'")
+        release = threading.Timer(0.2, writer.commit)
+        release.start()
+        try:
+            # A deferred transaction would read a snapshot here and then fail
+            # to write with "database is locked" once the writer commits.
+            with transaction.atomic():
+                self.assertEqual(Genre.objects.get().name, "Other")
+                Genre.objects.update(name="After")
+        finally:
+            release.join()
+            writer.close()
+        self.assertEqual(Genre.objects.get().name, "After")
+
+    def test_slow_statements_count_as_lock_waits(self):
+        stats = sqlite.LockStats()
+        stats.record(1)
+        stats.record(sqlite.LOCK_WAIT_MS * 2)
+        self.assertEqual(
+            stats.as_dict(),
+            {
+                "statements": 2,
+                "waits": 1,
+                "wait_ms": sqlite.LOCK_WAIT_MS * 2,
+                "max_wait_ms": sqlite.LOCK_WAIT_MS * 2,
+                "timeouts": 0,
+            },
+        )
+
+
+@override_settings(READ_REPLICA=True)
+class ReplicaRouterTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.router = routers.ReplicaRouter()
+
+    def route(self, method, model, user=None):
+        request = getattr(RequestFactory(), method)("/")
+        request.user = user or AnonymousUser()
+        token = routers.current_request.set(request)
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            routers.current_request.reset(token)
+
+    def test_safe_requests_read_catalog_models_from_the_replica(self):
+        for model in (Book, Author, Genre, BookReview):
+            self.assertEqual(
+                self.route("get", model, self.student), routers.REPLICA_DATABASE
+            )
+        self.assertEqual(self.route("head", Book), routers.REPLICA_DATABASE)
+        self.assertIsNone(self.route("get", BorrowRequest, self.student))
+        self.assertIsNone(self.route("get", User, self.student))
+        self.assertIsNone(self.route("post", Book, self.student))
+        # Reads outside of a request, e.g. in commands, use the primary.
+        self.assertIsNone(self.router.db_for_read(Book))
+
+    def test_writes_keep_the_users_reads_on_the_primary(self):
+        book = create_catalog(books=1)[0]
+        response = self.client.post(
+            reverse("review-list", args=[book.pk]),
+            {"book": book.pk, "rating": 4, "comment": "Good"},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(self.route("get", Book, self.student))
+        self.assertEqual(
+            self.route("get", Book, self.librarian), routers.REPLICA_DATABASE
+        )
+
+    @override_settings(READ_REPLICA=False)
+    def test_replica_is_opt_in(self):
+        self.assertIsNone(self.route("get", Book, self.student))
+
+    def test_replica_is_never_migrated(self):
+        self.assertFalse(
+            self.router.allow_migrate(routers.REPLICA_DATABASE, "lms", "book")
+        )
+        self.assertIsNone(self.router.allow_migrate("default", "lms", "book"))
+
+    def test_refresh_refuses_to_copy_a_database_onto_itself(self):
+        # The test replica mirrors the test database.
+        with self.assertRaises(replica.ReplicaError):
+            replica.refresh()
+
+
+@override_settings(READ_REPLICA=True)
+class ReplicaDatabaseTests(TransactionTestCase):
+    """
+    Reads through a replica kept in its own SQLite file, as in production.
+    """
+
+    databases = {"default", "throttle", "replica"}
+
+    def setUp(self):
+        caching.get_cache().clear()
+        authentication.get_cache().clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # The test replica mirrors the test database and shares its
+        # settings; point a copy of them at a file of its own.
+        replica_connection = connections[routers.REPLICA_DATABASE]
+        settings_dict = replica_connection.settings_dict
+        replica_connection.close()
+        replica_connection.settings_dict = {
+            **settings_dict,
+            "NAME": os.path.join(directory.name, "replica.sqlite3"),
+        }
+
+        def restore():
+            replica_connection.close()
+            replica_connection.settings_dict = settings_dict
+
+        self.addCleanup(restore)
+        self.student = User.objects.create_user(username="student", password="pw")
+        self.librarian = User.objects.create_user(
+            username="librarian", password="pw", role=UserRole.LIBRARIAN
+        )
+        self.book = create_catalog(books=1)[0]
+
+    def title(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        response = client.get(reverse("book-detail", args=[self.book.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()["title"]
+
+    def test_reads_use_the_primary_until_the_replica_is_refreshed(self):
+        # No replica file yet, then an empty one.
+        self.assertEqual(self.title(self.student), self.book.title)
+        sqlite3.connect(
+            connections[routers.REPLICA_DATABASE].settings_dict["NAME"]
+        ).close()
+        self.book.title = "Renamed"
+        self.book.save()
+        self.assertEqual(self.title(self.student), "Renamed")
+        replica.refresh()
+        Book.objects.filter(pk=self.book.pk).update(title="Not refreshed")
+        self.assertEqual(self.title(self.student), "Renamed")
+
+    def test_reads_stick_to_the_primary_after_a_write_in_another_process(self):
+        replica.refresh()
+        Book.objects.filter(pk=self.book.pk).update(title="Renamed")
+        # Until the next refresh the replica serves the earlier snapshot.
+        self.assertEqual(self.title(self.student), self.book.title)
+        run_in_another_process(
+            f"from lms import routers; routers.mark_written({self.student.pk})"
+        )
+        self.assertEqual(self.title(self.student), "Renamed")
+        self.assertEqual(self.title(self.librarian), self.book.title)
+
+    def test_refresh_invalidates_responses_read_from_the_replica(self):
+        replica.refresh()
+        self.assertEqual(self.title(self.student), self.book.title)
+        Book.objects.filter(pk=self.book.pk).update(title="Renamed")
+        self.assertEqual(self.title(self.student), self.book.title)
+        replica.refresh()
+        self.assertEqual(self.title(self.student), "Renamed")
@@ -0,0 +1,119 @@
+from django.db import connections, router
+from rest_framework import throttling
+
+from lms.models import ThrottleWindow
+
+# Counts carried over to the current fixed window: the previous window's
+# count when the stored window is the one just before, nothing when older.
+ROLLED_PREVIOUS = (
+    "CASE WHEN {table}.period = excluded.period THEN {table}.previous_count "
+    "WHEN {table}.period = excluded.period - 1 THEN {table}.current_count "
+    "ELSE 0 END"
+)
+ROLLED_CURRENT = (
+    "CASE WHEN {table}.period = excluded.period THEN {table}.current_count "
+    "ELSE 0 END"
+)
+HIT_SQL = (
+    "INSERT INTO {table} ({key}, period, current_count, previous_count, expires_at) "
+    "VALUES (%s, %s, 1, 0, %s) "
+    "ON CONFLICT ({key}) DO UPDATE SET "
+    f"previous_count = {ROLLED_PREVIOUS}, "
+    f"current_count = {ROLLED_CURRENT} + 1, "
+    "period = excluded.period, "
+    "expires_at = excluded.expires_at "
+    f"WHERE {ROLLED_PREVIOUS} * %s + {ROLLED_CURRENT} < %s "
+    "RETURNING current_count"
+)
+
+
+def hit(key, limit, duration, now):
+    """
+    Record a request for ``key`` unless it would exceed ``limit`` requests in
+    the sliding ``duration`` seconds ending at ``now``.
+
+    The sliding count is estimated from two fixed windows: the current
+    window's count plus the previous window's count weighted by how much of
+    it the sliding window still overlaps. The check and the increment are a
+    single upsert, so concurrent workers never admit more than ``limit``.
+
+    Returns ``None`` when the request is allowed, otherwise the number of
+    seconds until it would be.
+    """
+    period, offset = divmod(now, duration)
+    period = int(period)
+    overlap = 1 - offset / duration
+    # A counter is of no use once the window after the current one ends.
+    expires_at = int((period + 2) * duration)
+    connection = connections[router.db_for_write(ThrottleWindow)]
+    quote = connection.ops.quote_name
+    sql = HIT_SQL.format(table=quote(ThrottleWindow._meta.db_table), key=quote("key"))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [key, period, expires_at, overlap, limit])
+        if cursor.fetchone() is not None:
+            return None
+    row = (
+        ThrottleWindow.objects.filter(key=key)
+        .values_list("period", "current_count", "previous_count")
+        .first()
+    )
+    return retry_after(row, period, overlap, limit, duration)
+
+
+def retry_after(row, period, overlap, limit, duration):
+    """
+    Seconds until one more request fits under ``limit``.
+    """
+    stored, current, previous = row
+    if stored != period:
+        current, previous = 0, current if stored == period - 1 else 0
+    if current < limit and previous:
+        # The previous window's weight fades out during this window.
+        fits_at = 1 - (limit - 1 - current) / previous
+        return max(0.0, (overlap - fits_at) * duration)
+    # Only once this window becomes the previous one and fades enough.
+    fits_at = 1 - (limit - 1) / current if current else 0
+    return max(0.0, (overlap + fits_at) * duration)
+
+
+def prune(now):
+    """
+    Delete expired counters and return how many were deleted.
+    """
+    deleted, _ = ThrottleWindow.objects.filter(expires_at__lt=now).delete()
+    return deleted
+
+
+class SlidingWindowRateThrottle(throttling.SimpleRateThrottle):
+    """
+    Rate throttle keeping O(1) sliding-window counters in the ``throttle``
+    database, so every worker process enforces the same limit.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.retry_after = hit(self.key, self.num_requests, self.duration, self.timer())
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
+
+
+class AnonRateThrottle(SlidingWindowRateThrottle, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(SlidingWindowRateThrottle, throttling.UserRateThrottle):
+    pass
+
+
+class BorrowRateThrottle(UserRateThrottle):
+    """
+    Limit how many borrow requests each user may create.
+    """
+
+    scope = "borrow"
@@ -7,15 +7,24 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from lms.views import (
     AuthorListCreateView,
+    BookAvailabilityView,
     BookDetailView,
+    BookExportView,
+    BookImportView,
     BookListCreateView,
     BookReviewDetailView,
     BookReviewListCreateView,
+    BorrowClaimView,
+    BorrowExportView,
+    BorrowQueueView,
     BorrowRequestActionView,
+    BorrowRequestBulkActionView,
     BorrowRequestCreateView,
     BorrowRequestListView,
     GenreListCreateView,
     UserRegisterView,
+    WaitlistDetailView,
+    WaitlistListView,
 )
 
 schema_view = get_schema_view(
@@ -34,10 +43,33 @@ urlpatterns = [
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/books/", BookListCreateView.as_view(), name="book-list"),
     path("api/books/<int:pk>/", BookDetailView.as_view(), name="book-detail"),
+    path("api/books/import/", BookImportView.as_view(), name="book-import"),
+    path("api/books/export/", BookExportView.as_view(), name="book-export"),
+    path(
+        "api/books/availability/",
+        BookAvailabilityView.as_view(),
+        name="book-availability",
+    ),
     path("api/authors/", AuthorListCreateView.as_view(), name="author-list"),
     path("api/genres/", GenreListCreateView.as_view(), name="genre-list"),
     path("api/borrow/", BorrowRequestCreateView.as_view(), name="borrow-request"),
     path("api/borrow/me/", BorrowRequestListView.as_view(), name="borrow-list"),
+    path("api/borrow/export/", BorrowExportView.as_view(), name="borrow-export"),
+    path("api/borrow/queue/", BorrowQueueView.as_view(), name="borrow-queue"),
+    path("api/waitlist/", WaitlistListView.as_view(), name="waitlist"),
+    path(
+        "api/waitlist/<int:pk>/", WaitlistDetailView.as_view(), name="waitlist-detail"
+    ),
+    path(
+        "api/borrow/queue/claim/",
+        BorrowClaimView.as_view(),
+        name="borrow-queue-claim",
+    ),
+    path(
+        "api/borrow/bulk/",
+        BorrowRequestBulkActionView.as_view(),
+        name="borrow-bulk-action",
+    ),
     path(
         "api/borrow/<int:pk>/approve/",
         BorrowRequestActionView.as_view(),
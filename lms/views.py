@@ -1,23 +1,67 @@
+import base64
+import binascii
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db import transaction
+from django.db.models import Max, Q
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.utils import timezone
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, generics, status
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
-
-from lms.models import Author, Book, BookReview, BorrowRequest, Genre, User
+from rest_framework.utils.urls import replace_query_param
+
+from lms import (
+    caching,
+    exporter,
+    fieldsets,
+    importer,
+    inventory,
+    queue,
+    ratings,
+    routers,
+    waitlist,
+)
+from lms.filters import BookSearchFilter, BorrowQueueFilter
+from lms.models import (
+    Author,
+    Book,
+    BookReview,
+    BorrowRequest,
+    Genre,
+    User,
+    WaitlistEntry,
+)
 from lms.permissions import IsLibrarian, IsOwnerOrReadOnly, IsStudent
 from lms.serializers import (
     AuthorSerializer,
+    AvailabilityLookupSerializer,
     BookCreateSerializer,
     BookReviewSerializer,
     BookSerializer,
+    BorrowClaimSerializer,
+    BorrowExportSerializer,
+    BorrowQueueSerializer,
     BorrowRequestSerializer,
+    BulkBorrowActionSerializer,
+    CatalogImportSerializer,
+    ExportSerializer,
     GenreSerializer,
     UserSerializer,
+    WaitlistEntrySerializer,
 )
+from lms.throttling import BorrowRateThrottle, UserRateThrottle
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -29,6 +73,371 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = "page_size"
     max_page_size = 100
 
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        ``paginate_queryset`` for async views, using the async ORM.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        bottom = (number - 1) * paginator.per_page
+        results = [obj async for obj in queryset[bottom : bottom + paginator.per_page]]
+        self.page = paginator._get_page(results, number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination seeking on the ordering columns plus the pk.
+
+    Every page costs the same as the first one: no OFFSET is used and the
+    total ``count`` is only computed when ``?count=true`` is passed. The
+    ordering is taken from the ``ordering`` parameter when it names one of the
+    view's ``ordering_fields``, otherwise from the view's default ``ordering``.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    ordering_param = "ordering"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if self.count_requested(request):
+            self.count = queryset.count()
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        ``paginate_queryset`` for async views, using the async ORM.
+        """
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if self.count_requested(request):
+            self.count = await queryset.acount()
+        return self.set_page([obj async for obj in page_queryset])
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param) in ("1", "true")
+
+    def get_page_queryset(self, queryset, request, view):
+        """
+        Order and seek ``queryset``, fetching one extra row to detect more.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.count = None
+
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+        queryset = queryset.order_by(
+            *[
+                f"{'-' if desc != self.reverse else ''}{name}"
+                for name, desc in self.ordering
+            ]
+        )
+        if self.position is not None:
+            queryset = queryset.filter(self.seek_filter(self.position, self.reverse))
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        seeked = self.position is not None
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = seeked, has_more
+        else:
+            self.has_next, self.has_previous = has_more, seeked
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Return ``(field, descending)`` pairs ending with the pk tiebreaker.
+        """
+        allowed = getattr(view, "ordering_fields", None) or []
+        params = request.query_params.get(self.ordering_param)
+        if params:
+            fields = [
+                term.strip()
+                for term in params.split(",")
+                if term.strip().lstrip("-") in allowed
+            ]
+        if not params or not fields:
+            fields = list(getattr(view, "ordering", None) or [])
+        ordering = [(field.lstrip("-"), field.startswith("-")) for field in fields]
+        if not any(
+            name in ("pk", queryset.model._meta.pk.name) for name, _ in ordering
+        ):
+            descending = ordering[0][1] if ordering else False
+            ordering.append(("pk", descending))
+        return ordering
+
+    def seek_filter(self, position, reverse):
+        """
+        Build the lexicographic ``(a, b, pk) > (x, y, z)`` condition.
+        """
+        condition = Q()
+        for index, (name, desc) in enumerate(self.ordering):
+            lookup = "lt" if desc != reverse else "gt"
+            term = Q(**{f"{name}__{lookup}": position[index]})
+            for prior_index, (prior, _) in enumerate(self.ordering[:index]):
+                term &= Q(**{prior: position[prior_index]})
+            condition |= term
+        # A plain range on the leading column lets the index narrow the scan.
+        name, desc = self.ordering[0]
+        lookup = "lte" if desc != reverse else "gte"
+        return Q(**{f"{name}__{lookup}": position[0]}) & condition
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            values = data["p"]
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.get_field(model, name).to_python(value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(data.get("r"))
+
+    def get_field(self, model, name):
+        if name == "pk":
+            return model._meta.pk
+        return model._meta.get_field(name)
+
+    def encode_cursor(self, instance, reverse):
+        values = [getattr(instance, name) for name, _ in self.ordering]
+        data = {"p": values, "r": int(reverse)}
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(data, default=str).encode("ascii")
+        ).decode("ascii")
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = OrderedDict(
+            [("next", self.get_next_link()), ("previous", self.get_previous_link())]
+        )
+        if self.count is not None:
+            response["count"] = self.count
+        response["results"] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {"type": "integer"},
+                "results": schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """
+    Switch a list view to ``KeysetPagination`` when ``?cursor`` is present.
+
+    Clients opt in with an empty ``?cursor=`` and follow the returned links;
+    requests without it keep using the view's page-number ``pagination_class``.
+    """
+
+    keyset_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        query_params = getattr(self.request, "query_params", {})
+        if self.keyset_pagination_class.cursor_query_param not in query_params:
+            return super().paginator
+        if not isinstance(getattr(self, "_paginator", None), KeysetPagination):
+            self._paginator = self.keyset_pagination_class()
+        return self._paginator
+
+
+class FieldSelectionQuerysetMixin:
+    """
+    Fetch only the columns and relations the serializer renders when a
+    safe request selects fields or expansions (``?fields=``, ``?expand=``).
+
+    The ordering fields are fetched too, as the paginators read them.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in SAFE_METHODS or not fieldsets.is_selective(
+            self.request
+        ):
+            return queryset
+        ordering = [
+            *(getattr(self, "ordering_fields", None) or []),
+            *(getattr(self, "ordering", None) or []),
+        ]
+        return fieldsets.optimize(
+            queryset,
+            self.get_serializer(),
+            extra=[name.lstrip("-") for name in ordering],
+        )
+
+
+class CatalogCacheMixin:
+    """
+    Serve GET responses from the catalog cache.
+
+    Entries are keyed on the request URL and the version of every scope in
+    ``get_cache_scopes()``; catalog signals bump those versions on writes.
+    """
+
+    cache_scopes = ()
+
+    def get_cache_scopes(self):
+        return self.cache_scopes
+
+    def get(self, request, *args, **kwargs):
+        key = caching.response_key(request, self.get_cache_scopes())
+        data = caching.get_response_data(key)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            caching.set_response_data(key, response.data)
+        response["X-Cache"] = "MISS"
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Answer ``If-None-Match`` and ``If-Modified-Since`` with 304 Not Modified.
+
+    A list's ``ETag`` comes from the versions of its cache scopes, which
+    writes bump, so validating it needs no query. A detail's validators come
+    from the ``updated_at`` of its row, looked up by primary key; only
+    detail views send ``Last-Modified``.
+    """
+
+    def is_detail(self):
+        return hasattr(self, "retrieve")
+
+    def get_validator_scopes(self):
+        """
+        Return the cache scopes whose versions identify a list's contents.
+        """
+        return [*self.get_cache_scopes(), caching.REPLICA]
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.is_detail():
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        return queryset
+
+    def get_validator_aggregates(self):
+        return {"modified": Max("updated_at")}
+
+    def get_validators(self):
+        if not self.is_detail():
+            versions = caching.request_versions(
+                self.request, self.get_validator_scopes()
+            )
+            return self.build_validators((versions, routers.use_replica()))
+        values = (
+            self.get_validator_queryset()
+            .order_by()
+            .aggregate(**self.get_validator_aggregates())
+        )
+        return self.build_validators(values["modified"])
+
+    def build_validators(self, state):
+        """
+        Return the ``(etag, last_modified)`` pair for a detail's modification
+        time or a list's scope versions and replica use.
+        """
+        if self.is_detail() and state is None:
+            return None, None
+        raw = repr(
+            (
+                self.request.path,
+                sorted(self.request.query_params.lists()),
+                self.request.accepted_media_type,
+                state.isoformat() if self.is_detail() else state,
+            )
+        )
+        etag = quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+        last_modified = None
+        if self.is_detail():
+            last_modified = int(state.timestamp())
+        return etag, last_modified
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return super().get(request, *args, **kwargs)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return self.set_validators(response, etag, last_modified)
+
+    def set_validators(self, response, etag, last_modified):
+        if response.status_code not in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED,
+            status.HTTP_412_PRECONDITION_FAILED,
+        ):
+            return response
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
 
 class UserRegisterView(generics.CreateAPIView):
     """
@@ -38,25 +447,39 @@ class UserRegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
+    query_budget = {"POST": 4}
 
 
-class BookListCreateView(generics.ListCreateAPIView):
+class BookListCreateView(
+    ConditionalGetMixin,
+    CatalogCacheMixin,
+    KeysetPaginationMixin,
+    FieldSelectionQuerysetMixin,
+    generics.ListCreateAPIView,
+):
     """
     API view to list all books or create a new book (librarian only).
     """
 
-    queryset = Book.objects.all()
+    queryset = Book.objects.for_serialization()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {"GET": 7, "POST": 17}
+    cache_scopes = [caching.BOOKS]
     pagination_class = StandardResultsSetPagination
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        BookSearchFilter,
         filters.OrderingFilter,
     ]
-    filterset_fields = ["author", "genres"]
+    filterset_fields = {
+        "author": ["exact"],
+        "genres": ["exact"],
+        "average_rating": ["gte", "lte"],
+        "review_count": ["gte", "lte"],
+    }
     search_fields = ["title", "isbn"]
-    ordering_fields = ["title", "available_copies"]
+    ordering_fields = ["title", "available_copies", "average_rating", "review_count"]
 
     def get_serializer_class(self):
         if self.request.method == "POST":
@@ -69,14 +492,25 @@ class BookListCreateView(generics.ListCreateAPIView):
         return [IsAuthenticated()]
 
 
-class BookDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BookDetailView(
+    ConditionalGetMixin,
+    CatalogCacheMixin,
+    FieldSelectionQuerysetMixin,
+    generics.RetrieveUpdateDestroyAPIView,
+):
     """
     API view to retrieve, update, or delete a single book.
     """
 
-    queryset = Book.objects.all()
+    queryset = Book.objects.for_serialization()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {"GET": 9, "PUT": 19, "PATCH": 19}
+    # Deleting a book deletes its reviews, each invalidating its responses.
+    query_budget_exempt = ["DELETE"]
+
+    def get_cache_scopes(self):
+        return [caching.book_scope(self.kwargs["pk"])]
 
     def get_serializer_class(self):
         if self.request.method in ["PUT", "PATCH"]:
@@ -89,7 +523,94 @@ class BookDetailView(generics.RetrieveUpdateDestroyAPIView):
         return [IsAuthenticated()]
 
 
-class AuthorListCreateView(generics.ListCreateAPIView):
+class BookAvailabilityView(generics.GenericAPIView):
+    """
+    API view to look up the available and total copies of many books by id
+    or ISBN at once, as flat rows without nested authors and genres.
+    """
+
+    serializer_class = AvailabilityLookupSerializer
+    permission_classes = [IsAuthenticated]
+    query_budget = {"POST": 3}
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        isbns = serializer.validated_data["isbns"]
+        results = inventory.availability(ids, isbns)
+        found_ids = {row["id"] for row in results}
+        found_isbns = {row["isbn"] for row in results}
+        return Response(
+            {
+                "results": results,
+                "missing": {
+                    "ids": [pk for pk in ids if pk not in found_ids],
+                    "isbns": [isbn for isbn in isbns if isbn not in found_isbns],
+                },
+            }
+        )
+
+
+class BookImportView(generics.GenericAPIView):
+    """
+    API view to import a CSV or JSONL catalog file (librarian only).
+    """
+
+    serializer_class = CatalogImportSerializer
+    permission_classes = [IsLibrarian]
+    parser_classes = [MultiPartParser]
+    # Queries grow with the number of rows imported.
+    query_budget_exempt = ["POST"]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+        fmt = serializer.validated_data.get("format") or importer.detect_format(
+            upload.name
+        )
+        stats = importer.CatalogImporter().run(
+            importer.read_rows(importer.decode_lines(upload), fmt)
+        )
+        return Response(stats.as_dict())
+
+
+def stream_export(rows, columns, fmt, filename):
+    """
+    Stream rendered export rows as a file download.
+    """
+    response = StreamingHttpResponse(
+        exporter.render(rows, columns, fmt), content_type=exporter.CONTENT_TYPES[fmt]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+class BookExportView(generics.GenericAPIView):
+    """
+    API view to stream the whole catalog as CSV or JSON lines (librarian only).
+    """
+
+    serializer_class = ExportSerializer
+    permission_classes = [IsLibrarian]
+    # Rows are queried while the response streams, after the middleware.
+    query_budget_exempt = ["GET"]
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return stream_export(
+            exporter.book_rows(),
+            exporter.BOOK_COLUMNS,
+            serializer.validated_data["export_format"],
+            "books",
+        )
+
+
+class AuthorListCreateView(
+    ConditionalGetMixin, CatalogCacheMixin, generics.ListCreateAPIView
+):
     """
     API view to list or create authors (create allowed for librarians only).
     """
@@ -97,6 +618,9 @@ class AuthorListCreateView(generics.ListCreateAPIView):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
+    query_budget = {"GET": 6, "POST": 5}
+    cache_scopes = [caching.AUTHORS]
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -104,7 +628,9 @@ class AuthorListCreateView(generics.ListCreateAPIView):
         return [IsAuthenticated()]
 
 
-class GenreListCreateView(generics.ListCreateAPIView):
+class GenreListCreateView(
+    ConditionalGetMixin, CatalogCacheMixin, generics.ListCreateAPIView
+):
     """
     API view to list or create genres (create allowed for librarians only).
     """
@@ -112,6 +638,9 @@ class GenreListCreateView(generics.ListCreateAPIView):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
+    query_budget = {"GET": 6, "POST": 5}
+    cache_scopes = [caching.GENRES]
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -122,26 +651,130 @@ class GenreListCreateView(generics.ListCreateAPIView):
 class BorrowRequestCreateView(generics.CreateAPIView):
     """
     API view to create a borrow request (students only).
+
+    Requests for a book with no available copies put the student on its
+    waitlist instead (202), from which returned copies are lent in order.
     """
 
     queryset = BorrowRequest.objects.all()
     serializer_class = BorrowRequestSerializer
     permission_classes = [IsStudent]
+    throttle_classes = [UserRateThrottle, BorrowRateThrottle]
+    # One counter upsert per throttle scope; joining a waitlist costs one
+    # query more than creating the request.
+    query_budget = {"POST": 10}
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        book = serializer.validated_data["book"]
+        if book.available_copies:
+            self.perform_create(serializer)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        entry, borrow = waitlist.join(request.user, book.pk)
+        if borrow is not None:
+            return Response(
+                self.get_serializer(borrow).data, status=status.HTTP_201_CREATED
+            )
+        return Response(
+            WaitlistEntrySerializer(entry).data, status=status.HTTP_202_ACCEPTED
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class BorrowRequestListView(generics.ListAPIView):
+class BorrowRequestListView(
+    KeysetPaginationMixin, FieldSelectionQuerysetMixin, generics.ListAPIView
+):
     """
     API view to list borrow requests of the current user.
     """
 
     serializer_class = BorrowRequestSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {"GET": 5}
+    pagination_class = StandardResultsSetPagination
+    filterset_fields = ["status"]
+    ordering = ["-requested_at", "-id"]
+
+    def get_queryset(self):
+        return BorrowRequest.objects.filter(user=self.request.user).for_serialization()
+
+
+class WaitlistListView(generics.ListAPIView):
+    """
+    API view to list the current user's waitlist entries with their
+    positions.
+    """
+
+    serializer_class = WaitlistEntrySerializer
+    permission_classes = [IsAuthenticated]
+    query_budget = {"GET": 4}
+    pagination_class = StandardResultsSetPagination
+    ordering = ["created_at", "id"]
+
+    def get_queryset(self):
+        return waitlist.with_positions(
+            WaitlistEntry.objects.filter(user=self.request.user)
+        )
+
+
+class WaitlistDetailView(generics.RetrieveDestroyAPIView):
+    """
+    API view to get the position of, or leave, one of the current user's
+    waitlist entries.
+    """
+
+    serializer_class = WaitlistEntrySerializer
+    permission_classes = [IsAuthenticated]
+    query_budget = {"GET": 3, "DELETE": 4}
+
+    def get_queryset(self):
+        return waitlist.with_positions(
+            WaitlistEntry.objects.filter(user=self.request.user)
+        )
+
+
+class BorrowQueueView(generics.ListAPIView):
+    """
+    API view to list borrow requests for librarians, oldest first, with
+    keyset pagination (librarian only).
+    """
+
+    serializer_class = BorrowQueueSerializer
+    permission_classes = [IsLibrarian]
+    query_budget = {"GET": 4}
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = BorrowQueueFilter
+    ordering = ["requested_at"]
+    ordering_fields = ["requested_at"]
 
     def get_queryset(self):
-        return BorrowRequest.objects.filter(user=self.request.user)
+        return queue.compact()
+
+
+class BorrowClaimView(generics.GenericAPIView):
+    """
+    API view to claim a batch of the oldest unclaimed pending borrow
+    requests for the calling librarian (librarian only).
+    """
+
+    serializer_class = BorrowClaimSerializer
+    permission_classes = [IsLibrarian]
+    query_budget = {"POST": 6}
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queryset = BorrowRequest.objects.all()
+        if "book" in serializer.validated_data:
+            queryset = queryset.filter(book_id=serializer.validated_data["book"])
+        claimed = queue.claim(
+            request.user, serializer.validated_data["limit"], queryset
+        )
+        return Response({"results": BorrowQueueSerializer(claimed, many=True).data})
 
 
 class BorrowRequestActionView(generics.UpdateAPIView):
@@ -149,54 +782,136 @@ class BorrowRequestActionView(generics.UpdateAPIView):
     API view to approve, reject, or return a borrow request (librarian only).
     """
 
-    queryset = BorrowRequest.objects.all()
+    queryset = BorrowRequest.objects.for_serialization()
     serializer_class = BorrowRequestSerializer
     permission_classes = [IsLibrarian]
+    query_budget = {"PUT": 19, "PATCH": 19}
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
         action = self.request.path.split("/")[-2]
-        if action == "approve" and instance.status == "PENDING":
-            instance.status = "APPROVED"
-            instance.approved_at = timezone.now()
-            instance.book.available_copies -= 1
-            instance.book.save()
-        elif action == "reject" and instance.status == "PENDING":
-            instance.status = "REJECTED"
-        elif action == "return" and instance.status == "APPROVED":
-            instance.status = "RETURNED"
-            instance.returned_at = timezone.now()
-            instance.book.available_copies += 1
-            instance.book.save()
-        else:
+        try:
+            inventory.apply_action(instance, action)
+        except inventory.NoCopiesAvailable:
+            return Response(
+                {"detail": "No copies available"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except inventory.InvalidTransition:
             return Response(
                 {"detail": "Invalid action or status"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        instance.save()
+        instance.book.refresh_from_db(fields=["available_copies"])
         return Response(self.get_serializer(instance).data)
 
 
-class BookReviewListCreateView(generics.ListCreateAPIView):
+class BorrowRequestBulkActionView(generics.GenericAPIView):
+    """
+    API view to approve, reject, or return many borrow requests at once
+    (librarian only).
+    """
+
+    serializer_class = BulkBorrowActionSerializer
+    permission_classes = [IsLibrarian]
+    query_budget = {"POST": 17}
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = [
+            (item["id"], item["action"])
+            for item in serializer.validated_data["actions"]
+        ]
+        try:
+            results = inventory.apply_actions(items)
+        except inventory.InvalidTransition:
+            return Response(
+                {"detail": "Borrow requests changed concurrently, please retry"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response({"results": results})
+
+
+class BorrowExportView(generics.GenericAPIView):
+    """
+    API view to stream borrow history as CSV or JSON lines, filtered by
+    requested date range, status and user (librarian only).
+    """
+
+    serializer_class = BorrowExportSerializer
+    permission_classes = [IsLibrarian]
+    # Rows are queried while the response streams, after the middleware.
+    query_budget_exempt = ["GET"]
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        filters = dict(serializer.validated_data)
+        fmt = filters.pop("export_format")
+        return stream_export(
+            exporter.borrow_rows(
+                exporter.filter_borrows(BorrowRequest.objects.all(), **filters)
+            ),
+            exporter.BORROW_COLUMNS,
+            fmt,
+            "borrows",
+        )
+
+
+class BookReviewListCreateView(
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
+    FieldSelectionQuerysetMixin,
+    generics.ListCreateAPIView,
+):
     """
     API view to list or create reviews for a specific book.
     """
 
     serializer_class = BookReviewSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {"GET": 6, "POST": 12}
+    pagination_class = StandardResultsSetPagination
+    ordering = ["-created_at", "-id"]
+
+    def get_validator_scopes(self):
+        # Review signals and rating changes bump the book's scope.
+        return [caching.book_scope(self.kwargs["book_id"]), caching.REPLICA]
 
     def get_queryset(self):
-        return BookReview.objects.filter(book_id=self.kwargs["book_id"])
+        return BookReview.objects.filter(
+            book_id=self.kwargs["book_id"]
+        ).for_serialization()
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user, book_id=self.kwargs["book_id"])
+        review = serializer.save(user=self.request.user, book_id=self.kwargs["book_id"])
+        ratings.review_created(review)
 
 
-class BookReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BookReviewDetailView(
+    ConditionalGetMixin,
+    FieldSelectionQuerysetMixin,
+    generics.RetrieveUpdateDestroyAPIView,
+):
     """
     API view to retrieve, update, or delete a book review.
     """
 
-    queryset = BookReview.objects.all()
+    queryset = BookReview.objects.for_serialization()
     serializer_class = BookReviewSerializer
     permission_classes = [IsOwnerOrReadOnly]
+    query_budget = {"GET": 5, "PUT": 13, "PATCH": 13, "DELETE": 10}
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        old_book_id = serializer.instance.book_id
+        old_rating = serializer.instance.rating
+        review = serializer.save()
+        ratings.review_updated(review, old_book_id, old_rating)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+        ratings.review_deleted(instance)
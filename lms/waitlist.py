@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+
+from lms import inventory
+from lms.models import Book, WaitlistEntry
+
+
+def join(user, book_id):
+    """
+    Put ``user`` on the waitlist of a book and return ``(entry, None)``,
+    the entry annotated with its position; joining again keeps the
+    original place.
+
+    Should a copy have been freed before the entry was written, it is lent
+    right away instead and ``(None, borrow_request)`` is returned.
+    """
+    with transaction.atomic():
+        WaitlistEntry.objects.bulk_create(
+            [WaitlistEntry(book_id=book_id, user=user)], ignore_conflicts=True
+        )
+        # Locks the book against a concurrent return, which would otherwise
+        # look for waiters before this entry is committed.
+        available = (
+            Book.objects.select_for_update()
+            .filter(pk=book_id)
+            .values_list("available_copies", flat=True)
+            .get()
+        )
+        if available:
+            for borrow in inventory.promote_waitlist({book_id: available}):
+                if borrow.user_id == user.pk:
+                    return None, borrow
+    entry = with_positions(WaitlistEntry.objects.filter(book_id=book_id, user=user))
+    return entry.get(), None
+
+
+def with_positions(queryset):
+    """
+    Annotate each entry with its 1-based ``position`` in its book's queue,
+    counted on the ``(book, id)`` index.
+
+    The count reads only the index range of the entries ahead, without
+    touching the table; ranking with ``ROW_NUMBER()`` would instead number
+    the book's whole queue, behind the entry as well as ahead of it.
+    """
+    ahead = (
+        WaitlistEntry.objects.filter(
+            book_id=OuterRef("book_id"), pk__lte=OuterRef("pk")
+        )
+        .order_by()
+        .values("book_id")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return queryset.annotate(position=Subquery(ahead, output_field=IntegerField()))
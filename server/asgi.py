@@ -2,6 +2,8 @@
 ASGI config for server project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests served through it resolve against ``server.async_urls``, where the
+read-heavy API views are native async views.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -14,3 +16,12 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "server.settings")
 
 application = get_asgi_application()
+
+from django.core.handlers.asgi import ASGIRequest  # noqa: E402
+
+
+class AsyncURLConfRequest(ASGIRequest):
+    urlconf = "server.async_urls"
+
+
+application.request_class = AsyncURLConfRequest
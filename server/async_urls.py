@@ -0,0 +1,14 @@
+"""
+URL configuration used by the ASGI application.
+
+Same routes as ``server.urls``, with the read-heavy API views served by
+native async views.
+"""
+
+from django.contrib import admin
+from django.urls import include, path
+
+urlpatterns = [
+    path("admin/", admin.site.urls),
+    path("", include("lms.async_urls")),
+]
@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
+from lms import sqlite
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "lms.middleware.QueryBudgetMiddleware",
+    "lms.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -55,6 +60,13 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# QueryBudgetMiddleware logs requests over their view's query_budget; with
+# QUERY_BUDGET_STRICT it raises instead. The test runner turns it on, so every
+# request made by the tests is held to its budget.
+QUERY_BUDGET_STRICT = False
+
+TEST_RUNNER = "lms.testing.QueryBudgetTestRunner"
+
 ROOT_URLCONF = "server.urls"
 
 TEMPLATES = [
@@ -79,11 +91,71 @@ WSGI_APPLICATION = "server.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# lms.sqlite applies WAL journaling and tuned pragmas on connect and keeps
+# connections open between requests.
 DATABASES = {
+    "default": sqlite.database(
+        BASE_DIR / "db.sqlite3",
+        # A file-backed test database gives threaded tests real SQLite locking
+        # (busy timeouts) instead of shared-cache "table is locked" errors.
+        TEST={"NAME": BASE_DIR / "test_db.sqlite3"},
+    ),
+    # Throttle counters (lms.throttling), response cache versions
+    # (lms.caching) and sticky-after-write pins (lms.routers), shared by all
+    # worker processes.
+    # Create its table with ``manage.py migrate --database throttle``.
+    "throttle": sqlite.database(
+        BASE_DIR / "throttle.sqlite3",
+        TEST={"NAME": BASE_DIR / "test_throttle.sqlite3"},
+    ),
+    # Catalog and review reads of GET requests when READ_REPLICA is enabled.
+    # A copy of the default database kept fresh with
+    # ``manage.py refresh_replica --interval 10`` stands in for a replica.
+    "replica": sqlite.database(
+        BASE_DIR / "replica.sqlite3",
+        # Read-only: no need to take the write lock.
+        transaction_mode="DEFERRED",
+        TEST={"MIRROR": "default"},
+    ),
+}
+
+DATABASE_ROUTERS = ["lms.routers.ThrottleRouter", "lms.routers.ReplicaRouter"]
+
+# Serve catalog and review reads from the "replica" database (opt in with
+# LMS_READ_REPLICA=1). Reads fall back to the primary until the replica has
+# been refreshed once. The trade-off: other users' writes, including the
+# available_copies of borrowed and returned books, show up on the replica
+# only at its next refresh, so reads may be up to one refresh interval old.
+# A user's own writes are read from the primary for STICKY_SECONDS. Leave
+# it off where availability must always be current.
+READ_REPLICA = os.environ.get("LMS_READ_REPLICA", "").lower() in ("1", "true")
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Catalog read responses (lms.caching), kept per process. The
+    # local-memory backend evicts least recently used entries beyond
+    # MAX_ENTRIES; the file and database backends work as well and cull to
+    # the same bound.
+    "catalog": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "lms-catalog",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 5000, "CULL_FREQUENCY": 10},
+    },
+    # Authenticated users (lms.authentication), kept per process for a short
+    # while so the role and active flag are not read on every request.
+    "users": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "lms-users",
+        "TIMEOUT": 60,
+        "OPTIONS": {"MAX_ENTRIES": 10000, "CULL_FREQUENCY": 10},
+    },
 }
 
 
@@ -106,19 +178,29 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("lms.authentication.JWTAuthentication",),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
+    "DEFAULT_RENDERER_CLASSES": (
+        "lms.renderers.ORJSONRenderer",
+        "lms.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "lms.renderers.ORJSONParser",
+        "lms.renderers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    "DEFAULT_CONTENT_NEGOTIATION_CLASS": "lms.renderers.ContentNegotiation",
     "DEFAULT_FILTER_BACKENDS": (
         "django_filters.rest_framework.DjangoFilterBackend",
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ),
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "lms.throttling.AnonRateThrottle",
+        "lms.throttling.UserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "100/day",
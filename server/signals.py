@@ -1,19 +1,145 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
-from lms.models import BorrowRequest
-
-
-@receiver(post_save, sender=BorrowRequest)
-def update_books(sender, instance, **kwargs):
-    if instance.status == "Approved" and instance.approved_at is None:
-        instance.book.available_copies -= 1
-        instance.book.save()
-        instance.approved_at = timezone.now()
-        instance.save()
-    elif instance.status == "Returned" and instance.returned_at is None:
-        instance.book.available_copies += 1
-        instance.book.save()
-        instance.returned_at = timezone.now()
-        instance.save()
+from lms import authentication, caching, search
+from lms.models import Author, Book, BookReview, Genre, User
+
+SEARCH_INDEXED_FIELDS = {"title", "isbn", "author", "author_id"}
+
+
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, update_fields=None, raw=False, using=None, **kwargs):
+    if raw or (update_fields and not SEARCH_INDEXED_FIELDS & set(update_fields)):
+        return
+    search.index_books([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book(sender, instance, using=None, **kwargs):
+    search.remove_books([instance.pk], using=using)
+
+
+@receiver(m2m_changed, sender=Book.genres.through)
+def index_book_genres(sender, instance, action, reverse, pk_set, using=None, **kwargs):
+    if reverse and action == "pre_clear":
+        instance._affected_book_ids = list(instance.books.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove"):
+        search.index_books(pk_set if reverse else [instance.pk], using=using)
+    elif action == "post_clear":
+        book_ids = instance._affected_book_ids if reverse else [instance.pk]
+        search.index_books(book_ids, using=using)
+
+
+@receiver(post_save, sender=Author)
+def index_author_books(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw or created:
+        return
+    search.index_books(instance.books.values_list("pk", flat=True), using=using)
+
+
+@receiver(post_save, sender=Genre)
+def index_genre_books(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw or created:
+        return
+    search.index_books(instance.books.values_list("pk", flat=True), using=using)
+
+
+@receiver(pre_delete, sender=Genre)
+def remember_genre_books(sender, instance, **kwargs):
+    instance._affected_book_ids = list(instance.books.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+def index_deleted_genre_books(sender, instance, using=None, **kwargs):
+    search.index_books(getattr(instance, "_affected_book_ids", []), using=using)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    caching.invalidate_books([instance.pk], using=using)
+
+
+@receiver(m2m_changed, sender=Book.genres.through)
+def invalidate_book_genres(
+    sender, instance, action, reverse, pk_set, using=None, **kwargs
+):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        book_ids = [instance.pk]
+    elif action == "post_clear":
+        book_ids = getattr(instance, "_affected_book_ids", [])
+    else:
+        book_ids = pk_set
+    caching.invalidate_books(book_ids, using=using)
+    touch_books(book_ids, using=using)
+
+
+@receiver(post_save, sender=Author)
+def invalidate_author(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    caching.bump(caching.AUTHORS, using=using)
+    if not created:
+        book_ids = list(instance.books.values_list("pk", flat=True))
+        caching.invalidate_books(book_ids, using=using)
+        touch_books(book_ids, using=using)
+
+
+@receiver(post_delete, sender=Author)
+def invalidate_deleted_author(sender, instance, using=None, **kwargs):
+    # The author's books are deleted by cascade and invalidate themselves.
+    caching.bump(caching.AUTHORS, using=using)
+
+
+@receiver(post_save, sender=Genre)
+def invalidate_genre(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    caching.bump(caching.GENRES, using=using)
+    if not created:
+        book_ids = list(instance.books.values_list("pk", flat=True))
+        caching.invalidate_books(book_ids, using=using)
+        touch_books(book_ids, using=using)
+
+
+@receiver(post_delete, sender=Genre)
+def invalidate_deleted_genre(sender, instance, using=None, **kwargs):
+    book_ids = getattr(instance, "_affected_book_ids", [])
+    caching.bump(caching.GENRES, using=using)
+    caching.invalidate_books(book_ids, using=using)
+    touch_books(book_ids, using=using)
+
+
+@receiver(post_save, sender=BookReview)
+@receiver(post_delete, sender=BookReview)
+def invalidate_book_reviews(sender, instance, raw=False, using=None, **kwargs):
+    # Review lists are validated by their book's scope; rating changes bump
+    # it as well, but edits to the comment alone only reach it here.
+    if raw:
+        return
+    caching.bump(caching.book_scope(instance.book_id), using=using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    authentication.invalidate_user(instance.pk, using=using)
+
+
+def touch_books(book_ids, using=None):
+    """
+    Bump ``updated_at`` of books whose embedded author or genres changed, so
+    that conditional GETs on the books see the change.
+    """
+    book_ids = list(book_ids)
+    if book_ids:
+        Book.objects.using(using).filter(pk__in=book_ids).update(
+            updated_at=timezone.now()
+        )